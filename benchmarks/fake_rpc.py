@@ -0,0 +1,80 @@
+"""
+Local JSON-RPC server backed by a SyntheticChain, for end-to-end benchmarks. Supports
+single and batch requests for the methods the monitor uses; move `chain.head` forward
+to simulate new blocks.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_CHAIN_ID = 1337
+FINALITY_DEPTH = 64
+
+
+class FakeRpcServer:
+    def __init__(self, chain, host="127.0.0.1", port=0):
+        self.chain = chain
+        self.requests = 0
+        self.calls = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like a real provider
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests += 1
+                result = [server.handle(call) for call in body] if isinstance(body, list) else server.handle(body)
+                data = json.dumps(result).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def _block_number(self, tag):
+        if tag == "latest":
+            return self.chain.head
+        if tag == "finalized":
+            return self.chain.head - FINALITY_DEPTH
+        return int(tag, 16)
+
+    def handle(self, call):
+        self.calls += 1
+        method, params = call.get("method"), call.get("params") or []
+        if method == "eth_blockNumber":
+            result = hex(self.chain.head)
+        elif method == "eth_chainId":
+            result = hex(FAKE_CHAIN_ID)
+        elif method == "eth_getBlockByNumber":
+            n = self._block_number(params[0])
+            result = None
+            if n <= self.chain.head:
+                block = self.chain.block(n)
+                result = block if params[1] else dict(block, transactions=[tx["hash"] for tx in block["transactions"]])
+        elif method == "eth_getLogs":
+            query = params[0]
+            result = self.chain.logs(self._block_number(query["fromBlock"]), self._block_number(query["toBlock"]),
+                                     query.get("address"))
+        elif method == "eth_getBalance":
+            result = hex(10**18)
+        else:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": f"Method {method} not supported"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-rpc", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the detection, scoring and lookup hot paths:
+
+  analyze      analyze_transaction_for_suspicious_activity per transaction and
+               analyze_transactions_batch per block, over synthetic mainnet-like blocks
+  scoring      calculate_risk_score, generate_summary_for_finding and
+               generate_overall_summary_and_risk over the findings of those blocks
+  scam_lookup  is_address_scam / addresses_are_scam against synthetic scam lists of
+               each --scam-sizes entry (10k to 10M addresses), plus index build and load time
+  e2e          POST /api/monitoring/check-ethereum-now against a local fake JSON-RPC server
+
+Each case runs in a fresh process, so its peak RSS is its own. Reports throughput,
+p50/p99 latency and peak memory, and saves everything as JSON (default
+benchmarks/results/benchmark-<UTC time>.json); --compare prints the change against an
+earlier result file.
+
+Usage: python benchmarks/run_benchmarks.py [--cases analyze,scoring,scam_lookup,e2e]
+           [--scam-sizes 10000,100000,1000000] [--output file] [--compare previous.json]
+"""
+import sys
+import os
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+import traceback
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+CASES = ("analyze", "scoring", "scam_lookup", "e2e")
+LATENCY_SAMPLE = 20_000  # Operations timed individually for the latency percentiles
+SCAM_LOOKUP_HIT_RATE = 0.1
+SCAM_LOOKUP_BATCH_SIZE = 1000
+DETECTION_SCAM_LIST_SIZE = 10_000  # Scam list loaded for the analyze, scoring and e2e cases
+
+
+# --- Measurement helpers ---
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def measure(fn, items, latency_sample=LATENCY_SAMPLE):
+    """
+    Runs fn over every item for throughput, then times up to latency_sample calls one by
+    one for the latency percentiles (so the per-call timer does not skew throughput).
+    """
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    seconds = time.perf_counter() - started
+    latencies = []
+    for item in items[:latency_sample]:
+        call_started = time.perf_counter_ns()
+        fn(item)
+        latencies.append(time.perf_counter_ns() - call_started)
+    latencies.sort()
+    return {
+        "ops": len(items),
+        "seconds": round(seconds, 4),
+        "ops_per_second": round(len(items) / seconds, 1) if seconds else None,
+        "p50_us": round(percentile(latencies, 0.50) / 1000, 2) if latencies else None,
+        "p99_us": round(percentile(latencies, 0.99) / 1000, 2) if latencies else None,
+    }
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # ru_maxrss is in KiB on Linux
+
+
+# --- Cases (each runs in its own process; src modules are imported after the environment is set) ---
+
+def _prepare_environment(data_dir):
+    os.environ.update({
+        "SCAM_INDEX_FILE_PATH": os.path.join(data_dir, "scam_index.bin"),
+        "FINDINGS_DB_PATH": os.path.join(data_dir, "findings.db"),
+        "PIPELINE_STATS_FILE": os.path.join(data_dir, "pipeline_stats.json"),
+        "BLOCK_CACHE_ENABLED": "0",
+    })
+
+def _load_scam_list(data_dir, size, seed):
+    """Writes a synthetic scam list, builds its index and loads it. Returns (hit sample, timings)."""
+    from src.services import scam_db_service
+    from benchmarks.synthetic import write_scam_csv
+
+    scam_db_service.SCAM_DB_FILE_PATH = os.path.join(data_dir, "scam_database.csv")
+    started = time.perf_counter()
+    sample = write_scam_csv(scam_db_service.SCAM_DB_FILE_PATH, size, seed)
+    generated = time.perf_counter()
+    scam_db_service.build_scam_index()
+    built = time.perf_counter()
+    scam_db_service.load_scam_database()  # Builds and saves the Bloom filter
+    load_started = time.perf_counter()
+    scam_db_service.load_scam_database()  # Cold start with both files prebuilt
+    load_seconds = time.perf_counter() - load_started
+    return sample, {
+        "size": size,
+        "generate_seconds": round(generated - started, 3),
+        "build_index_seconds": round(built - generated, 3),
+        "load_seconds": round(load_seconds, 4),
+        "index_bytes": os.path.getsize(scam_db_service.SCAM_INDEX_FILE_PATH),
+    }
+
+def _synthetic_blocks(params, scam_sample):
+    from benchmarks.synthetic import SyntheticChain
+
+    chain = SyntheticChain(seed=params["seed"], scam_addresses=scam_sample[:1000])
+    first = chain.head - params["blocks"] + 1
+    return [chain.block(n, with_logs=True) for n in range(first, chain.head + 1)]
+
+def bench_analyze(params, data_dir):
+    sample, _ = _load_scam_list(data_dir, DETECTION_SCAM_LIST_SIZE, params["seed"])
+    from src.services.monitoring_service import analyze_transaction_for_suspicious_activity, analyze_transactions_batch
+
+    blocks = _synthetic_blocks(params, sample)
+    transactions = [tx for block in blocks for tx in block["transactions"]]
+    findings = sum(len(analyze_transactions_batch(block["transactions"], "ethereum")) for block in blocks)
+    per_transaction = measure(lambda tx: analyze_transaction_for_suspicious_activity(tx, "ethereum"), transactions)
+    per_block = measure(lambda block: analyze_transactions_batch(block["transactions"], "ethereum"), blocks)
+    per_block["transactions_per_second"] = round(len(transactions) / per_block["seconds"], 1)
+    return {"blocks": len(blocks), "transactions": len(transactions), "findings": findings,
+            "per_transaction": per_transaction, "per_block": per_block}
+
+def bench_scoring(params, data_dir):
+    sample, _ = _load_scam_list(data_dir, DETECTION_SCAM_LIST_SIZE, params["seed"])
+    from src.services.monitoring_service import analyze_transactions_batch
+    from src.services.risk_assessment_service import (
+        calculate_risk_score, generate_summary_for_finding, generate_overall_summary_and_risk)
+
+    per_block = []
+    for block in _synthetic_blocks(params, sample):
+        findings = analyze_transactions_batch(block["transactions"], "ethereum")
+        for finding in findings:
+            finding["details"]["chain"] = "ethereum"
+        if findings:
+            per_block.append(findings)
+    all_findings = [finding for findings in per_block for finding in findings]
+    return {
+        "findings": len(all_findings),
+        "finding_types": sorted({finding["type"] for finding in all_findings}),
+        "calculate_risk_score_per_block": measure(calculate_risk_score, per_block),
+        "generate_summary_for_finding": measure(generate_summary_for_finding, all_findings),
+        "generate_overall_summary_and_risk_per_block": measure(generate_overall_summary_and_risk, per_block),
+    }
+
+def bench_scam_lookup(params, data_dir):
+    sample, result = _load_scam_list(data_dir, params["scam_size"], params["seed"])
+    from src.services.scam_db_service import is_address_scam, addresses_are_scam
+    from benchmarks.synthetic import random_address
+
+    rng = random.Random(params["seed"])
+    hits = int(params["lookups"] * SCAM_LOOKUP_HIT_RATE)
+    lookups = [rng.choice(sample) for _ in range(hits)] + [random_address(rng) for _ in range(params["lookups"] - hits)]
+    rng.shuffle(lookups)
+    batches = [lookups[i:i + SCAM_LOOKUP_BATCH_SIZE] for i in range(0, len(lookups), SCAM_LOOKUP_BATCH_SIZE)]
+
+    found = sum(is_address_scam(address) for address in lookups)
+    result["hit_rate"] = round(found / len(lookups), 4)
+    result["is_address_scam"] = measure(is_address_scam, lookups)
+    batch = measure(addresses_are_scam, batches)
+    batch["lookups_per_second"] = round(len(lookups) / batch["seconds"], 1)
+    result["addresses_are_scam_batches_of_%d" % SCAM_LOOKUP_BATCH_SIZE] = batch
+    return result
+
+def bench_e2e(params, data_dir):
+    from benchmarks.fake_rpc import FakeRpcServer
+
+    server = FakeRpcServer(chain=None).start()
+    os.environ["ETH_RPC_URL"] = server.url  # Before the monitoring service reads it on import
+    sample, _ = _load_scam_list(data_dir, DETECTION_SCAM_LIST_SIZE, params["seed"])
+    from benchmarks.synthetic import SyntheticChain
+    from src.main import create_app
+    from src.routes.monitoring_routes import MAX_BLOCKS_PER_CHECK
+
+    chain = server.chain = SyntheticChain(seed=params["seed"], scam_addresses=sample[:1000])
+    client = create_app(warmup="blocking").test_client()
+    client.post("/api/monitoring/check-ethereum-now")  # Anchors the tailer at the head
+    first_block = chain.head + 1
+
+    latencies = []
+    findings = 0
+    started = time.perf_counter()
+    while chain.head < first_block + params["e2e_blocks"] - 1:
+        chain.head += min(MAX_BLOCKS_PER_CHECK, first_block + params["e2e_blocks"] - 1 - chain.head)
+        request_started = time.perf_counter_ns()
+        response = client.post("/api/monitoring/check-ethereum-now")
+        latencies.append(time.perf_counter_ns() - request_started)
+        if response.status_code != 200:
+            raise RuntimeError(f"check-ethereum-now failed: {response.get_json()}")
+        findings += len(response.get_json().get("findings", []))
+    seconds = time.perf_counter() - started
+    server.stop()
+
+    transactions = sum(len(chain.block(n)["transactions"]) for n in range(first_block, chain.head + 1))
+    latencies.sort()
+    return {
+        "blocks": params["e2e_blocks"],
+        "blocks_per_request": MAX_BLOCKS_PER_CHECK,
+        "transactions": transactions,
+        "findings": findings,
+        "seconds": round(seconds, 3),
+        "blocks_per_second": round(params["e2e_blocks"] / seconds, 1),
+        "transactions_per_second": round(transactions / seconds, 1),
+        "request_p50_ms": round(percentile(latencies, 0.50) / 1e6, 2),
+        "request_p99_ms": round(percentile(latencies, 0.99) / 1e6, 2),
+        "rpc_http_requests": server.requests,
+        "rpc_calls": server.calls,
+    }
+
+BENCHMARKS = {"analyze": bench_analyze, "scoring": bench_scoring, "scam_lookup": bench_scam_lookup, "e2e": bench_e2e}
+
+def _run_in_child(case, params, queue):
+    data_dir = tempfile.mkdtemp(prefix="crypto-bench-")
+    try:
+        _prepare_environment(data_dir)
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):  # Service logging
+            result = BENCHMARKS[case](params, data_dir)
+        result["peak_rss_mb"] = peak_rss_mb()
+        queue.put(("ok", result))
+    except BaseException:
+        queue.put(("error", traceback.format_exc()))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def run_case(case, params):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_in_child, args=(case, params, queue), name=f"bench-{case}")
+    process.start()
+    while True:
+        try:
+            status, result = queue.get(timeout=1)
+            break
+        except Exception:
+            if not process.is_alive():
+                status, result = "error", f"Benchmark process exited with code {process.exitcode}"
+                break
+    process.join()
+    if status != "ok":
+        print(f"{case} failed:\n{result}")
+        return {"error": result}
+    return result
+
+
+# --- Reporting ---
+
+def _flatten(results, prefix=""):
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{path}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+def print_results(results):
+    for path, value in _flatten(results):
+        if path.endswith(("per_second", "_us", "_ms", "_mb", "load_seconds")):
+            print(f"  {path:<85} {value:>14,.2f}")
+
+def compare(previous, current):
+    """Prints throughput, latency and memory changes between two result files' cases."""
+    before = dict(_flatten(previous["cases"]))
+    print(f"Compared with {previous.get('timestamp')} ({previous.get('git_commit') or 'unknown commit'}):")
+    for path, value in _flatten(current["cases"]):
+        old = before.get(path)
+        if not old or not path.endswith(("per_second", "_us", "_ms", "_mb")):
+            continue
+        change = value / old - 1
+        better = change > 0 if path.endswith("per_second") else change < 0
+        print(f"  {path:<85} {old:>14,.2f} -> {value:>14,.2f} {change:+8.1%} {'better' if better else 'worse'}")
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detection, scoring and lookup hot paths.")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated cases to run ({', '.join(CASES)}).")
+    parser.add_argument("--blocks", type=int, default=300, help="Synthetic blocks for the analyze and scoring cases.")
+    parser.add_argument("--scam-sizes", default="10000,100000,1000000",
+                        help="Comma-separated scam list sizes for scam_lookup (up to 10000000).")
+    parser.add_argument("--lookups", type=int, default=200_000, help="Lookups per scam list size.")
+    parser.add_argument("--e2e-blocks", type=int, default=500, help="Blocks processed through check-ethereum-now.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/benchmark-<time>.json).")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare against.")
+    args = parser.parse_args()
+
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    unknown = [case for case in cases if case not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}")
+    params = {"blocks": args.blocks, "lookups": args.lookups, "e2e_blocks": args.e2e_blocks, "seed": args.seed}
+
+    started = datetime.now(timezone.utc)
+    results = {
+        "timestamp": started.isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": vars(args),
+        "cases": {},
+    }
+    for case in cases:
+        if case == "scam_lookup":
+            for size in [int(size) for size in args.scam_sizes.split(",") if size.strip()]:
+                name = f"scam_lookup_{size}"
+                print(f"Running {name}...")
+                results["cases"][name] = run_case(case, dict(params, scam_size=size))
+                print_results(results["cases"][name])
+        else:
+            print(f"Running {case}...")
+            results["cases"][case] = run_case(case, params)
+            print_results(results["cases"][case])
+
+    output = args.output or os.path.join(RESULTS_DIR, f"benchmark-{started.strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return 1 if any("error" in result for result in results["cases"].values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Synthetic workloads for the benchmarks: deterministic, mainnet-like blocks and scam
+address lists of any size. Everything is generated from a seed, so two runs (or two
+commits) measure exactly the same data.
+"""
+import csv
+import hashlib
+import math
+import random
+
+from src.services.monitoring_service import KNOWN_MIXER_ADDRESSES
+from src.services.scam_db_service import CSV_HEADER
+from src.services.token_transfer_service import KNOWN_TOKENS, TRANSFER_EVENT_TOPIC
+
+# Mainnet-like shape: ~150 transactions per block, close to half of them contract calls
+# without ETH value, transfer values log-normal around 0.08 ETH with a heavy tail
+# (~0.2% of transfers reach the 100 ETH large-transfer threshold)
+TXS_PER_BLOCK_MEAN = 150
+TXS_PER_BLOCK_STDDEV = 60
+ZERO_VALUE_SHARE = 0.45
+VALUE_LOG_MEAN = math.log(0.08)
+VALUE_LOG_SIGMA = 2.5
+TOKEN_TRANSFER_SHARE = 0.3  # Transactions emitting a watched-token Transfer log
+# Token amounts are log-normal around 1/1000 of the token's large-transfer threshold
+# (1,000 USDT, 0.5 WETH), so ~0.3% of token transfers are large
+TOKEN_AMOUNT_LOG_MEAN = math.log(0.001)
+TOKEN_AMOUNT_LOG_SIGMA = 2.5
+SCAM_INTERACTION_SHARE = 0.002
+MIXER_INTERACTION_SHARE = 0.001
+ACTIVE_SENDERS = 50_000  # Senders are drawn from a fixed population so addresses repeat across blocks
+
+WEI_PER_ETH = 10**18
+_TOKENS = sorted(KNOWN_TOKENS.items())
+_MIXERS = sorted(KNOWN_MIXER_ADDRESSES)
+
+
+def random_address(rng):
+    return "0x" + rng.randbytes(20).hex()
+
+def _pad_topic(address):
+    return "0x" + "0" * 24 + address[2:]
+
+
+class SyntheticChain:
+    """
+    Deterministic chain whose block n is generated from (seed, n). Blocks are shaped like
+    eth_getBlockByNumber results with full transactions; Transfer logs are returned
+    separately (as eth_getLogs would) or attached to the transactions with with_logs.
+    """
+
+    def __init__(self, seed=1, scam_addresses=(), head=20_000_000):
+        self.seed = seed
+        self.head = head
+        self.scam_addresses = list(scam_addresses)
+        population = random.Random(f"senders:{seed}")
+        self.senders = [random_address(population) for _ in range(ACTIVE_SENDERS)]
+        self._cache = {}
+
+    def block_hash(self, n):
+        return "0x" + hashlib.sha256(f"{self.seed}:{n}".encode()).hexdigest()
+
+    def _generate(self, n):
+        cached = self._cache.get(n)
+        if cached is not None:
+            return cached
+        rng = random.Random(f"block:{self.seed}:{n}")
+        block_hash = self.block_hash(n)
+        tx_count = max(0, int(rng.gauss(TXS_PER_BLOCK_MEAN, TXS_PER_BLOCK_STDDEV)))
+        transactions = []
+        logs = []
+        for i in range(tx_count):
+            sender = rng.choice(self.senders)
+            recipient = random_address(rng)
+            roll = rng.random()
+            if self.scam_addresses and roll < SCAM_INTERACTION_SHARE:
+                recipient = rng.choice(self.scam_addresses)
+            elif roll < SCAM_INTERACTION_SHARE + MIXER_INTERACTION_SHARE:
+                recipient = rng.choice(_MIXERS)
+            value = 0
+            if rng.random() >= ZERO_VALUE_SHARE:
+                value = int(math.exp(rng.gauss(VALUE_LOG_MEAN, VALUE_LOG_SIGMA)) * WEI_PER_ETH)
+            tx_hash = "0x" + hashlib.sha256(f"{block_hash}:{i}".encode()).hexdigest()
+            transactions.append({
+                "hash": tx_hash, "from": sender, "to": recipient, "value": hex(value),
+                "blockNumber": hex(n), "blockHash": block_hash, "transactionIndex": hex(i),
+                "gas": hex(21000), "gasPrice": hex(30 * 10**9), "nonce": hex(rng.randrange(10_000)), "input": "0x",
+            })
+            if rng.random() < TOKEN_TRANSFER_SHARE:
+                token, (_, decimals, threshold) = rng.choice(_TOKENS)
+                amount = int(threshold * math.exp(rng.gauss(TOKEN_AMOUNT_LOG_MEAN, TOKEN_AMOUNT_LOG_SIGMA)) * 10**decimals)
+                logs.append({
+                    "address": token, "topics": [TRANSFER_EVENT_TOPIC, _pad_topic(sender), _pad_topic(random_address(rng))],
+                    "data": hex(amount), "blockNumber": hex(n), "blockHash": block_hash, "transactionHash": tx_hash,
+                    "transactionIndex": hex(i), "logIndex": hex(len(logs)), "removed": False,
+                })
+        block = {
+            "number": hex(n), "hash": block_hash, "parentHash": self.block_hash(n - 1),
+            "timestamp": hex(1_700_000_000 + 12 * n), "transactions": transactions,
+        }
+        if len(self._cache) > 4096:
+            self._cache.clear()
+        self._cache[n] = block, logs
+        return block, logs
+
+    def block(self, n, with_logs=False):
+        block, logs = self._generate(n)
+        if not with_logs:
+            return block
+        block = dict(block, transactions=[dict(tx) for tx in block["transactions"]])
+        by_hash = {tx["hash"]: tx for tx in block["transactions"]}
+        for log in logs:
+            by_hash[log["transactionHash"]].setdefault("logs", []).append(log)
+        return block
+
+    def logs(self, first, last, addresses=None):
+        wanted = {address.lower() for address in addresses} if addresses else None
+        return [log for n in range(first, last + 1) for log in self._generate(n)[1]
+                if wanted is None or log["address"] in wanted]
+
+
+def write_scam_csv(path, count, seed=1, sample_size=100_000):
+    """
+    Writes a scam database CSV with `count` random EVM addresses and returns an evenly
+    spread sample of them (for lookups that should hit).
+    """
+    rng = random.Random(f"scam-list:{seed}")  # Independent of the chain's address streams
+    step = max(1, count // sample_size)
+    sample = []
+    chunk = 100_000
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        written = 0
+        while written < count:
+            n = min(chunk, count - written)
+            raw = rng.randbytes(20 * n).hex()
+            addresses = ["0x" + raw[i:i + 40] for i in range(0, 40 * n, 40)]
+            sample.extend(addresses[(-written) % step::step])
+            f.writelines(f"{address},ethereum,phishing,synthetic,\n" for address in addresses)
+            written += n
+    return sample[:sample_size]
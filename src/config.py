@@ -0,0 +1,16 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+# --- API keys and upstream endpoints ---
+# Values come from the environment (or a local .env file when python-dotenv is installed);
+# never commit real keys here.
+import os
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+ETHERSCAN_API_KEY = os.environ.get("ETHERSCAN_API_KEY", "YOUR_ETHERSCAN_API_KEY")
+ALCHEMY_ETH_MAINNET_API_KEY = os.environ.get("ALCHEMY_ETH_MAINNET_API_KEY", "YOUR_FREE_ALCHEMY_API_KEY")
+# Overridable so reports can be pointed at another Etherscan-compatible API or a local stub
+ETHERSCAN_API_URL = os.environ.get("ETHERSCAN_API_URL", "https://api.etherscan.io/api")
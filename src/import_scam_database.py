@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+"""
+Builds the compact binary scam address index from a scam database CSV
+(columns: address, chain, category, source_url).
+
+Usage: python src/import_scam_database.py [csv_path] [--index index_path]
+"""
+import sys
+import os
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import argparse
+import time
+
+from src.services.scam_db_service import SCAM_DB_FILE_PATH, SCAM_INDEX_FILE_PATH, build_scam_index
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the binary scam address index from a CSV file.")
+    parser.add_argument("csv_path", nargs="?", default=SCAM_DB_FILE_PATH, help="Scam database CSV to import.")
+    parser.add_argument("--index", dest="index_path", default=SCAM_INDEX_FILE_PATH, help="Where to write the index.")
+    args = parser.parse_args()
+
+    started = time.time()
+    count = build_scam_index(args.csv_path, args.index_path)
+    print(f"Indexed {count} scam addresses from {args.csv_path} into {args.index_path} in {time.time() - started:.1f}s.")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 import sys
 import os
+import threading
+import time
 
 # Add project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -10,24 +12,142 @@ from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
 
 from src.routes.report_routes import report_bp
-from src.routes.monitoring_routes import monitoring_bp
+from src.routes.monitoring_routes import monitoring_bp, get_eth_tailer
+from src.services.scam_db_service import ensure_scam_database_loaded, scam_database_status
+from src.services.findings_store_service import get_findings_store
+from src.services.metrics_service import PROFILER_ENABLED, get_profiler
 
-app = Flask(__name__, static_folder='static', static_url_path='')
-CORS(app)
+# How services are initialized when the app is created:
+#   background - warm up in a thread; the app serves at once and /api/ready turns 200 when done
+#   blocking   - warm up before create_app returns
+#   off        - no warm-up; every service initializes on first use
+# Run one app per worker (e.g. gunicorn src.main:app, or "src.main:create_app()") without
+# --preload: the scam index is memory-mapped, so workers share its pages through the OS page
+# cache anyway, and warm-up costs a map of the prebuilt index regardless of the blocklist size.
+APP_WARMUP = os.environ.get("APP_WARMUP", "background")
+APP_DEBUG = os.environ.get("FLASK_DEBUG", "0").lower() not in ("0", "false", "no", "")  # Never enable in production
 
-app.config["DEBUG"] = True
 
-@app.route('/')
-def serve_index():
-    return send_from_directory(app.static_folder, 'index.html')
+def _load_scam_database():
+    if not ensure_scam_database_loaded():
+        raise RuntimeError("Scam database could not be loaded.")
+    return scam_database_status()
 
-@app.route("/api/health", methods=["GET"])
-def health_check():
-    return jsonify({"status": "healthy", "message": "Crypto Investigator API is running!"}), 200
+WARMUP_STEPS = [
+    ("scam_database", _load_scam_database),
+    ("findings_store", get_findings_store),
+    ("block_tailer", get_eth_tailer),
+]
 
-app.register_blueprint(report_bp, url_prefix='/api/reports')
-app.register_blueprint(monitoring_bp, url_prefix='/api/monitoring')
+
+class WarmUp:
+    """
+    Runs the service warm-up steps once, in order, and records each step's progress and
+    duration for the readiness endpoint. A failed step is retried on the next start().
+    """
+
+    def __init__(self, steps, mode=APP_WARMUP):
+        self.steps = steps
+        self.mode = mode
+        self.state = {name: {"status": "pending"} for name, _ in steps}
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def run(self):
+        self.started_at = time.time()
+        self.finished_at = None
+        for name, step in self.steps:
+            if self.state[name]["status"] == "ready":
+                continue
+            self.state[name] = {"status": "running"}
+            step_started = time.time()
+            try:
+                step()
+                self.state[name] = {"status": "ready"}
+            except Exception as e:
+                print(f"Warm-up step {name} failed: {e}")
+                self.state[name] = {"status": "error", "message": str(e)}
+            self.state[name]["seconds"] = round(time.time() - step_started, 3)
+        self.finished_at = time.time()
+
+    def start(self):
+        """Starts warm-up in a background thread unless it is running or already succeeded."""
+        with self._lock:
+            if (self._thread is not None and self._thread.is_alive()) or self.ready():
+                return False
+            self._thread = threading.Thread(target=self.run, name="app-warmup", daemon=True)
+            self._thread.start()
+            return True
+
+    def ready(self):
+        return self.mode == "off" or all(step["status"] == "ready" for step in self.state.values())
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "steps": self.state,
+            "seconds": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None,
+        }
+
+
+def create_app(warmup=APP_WARMUP):
+    """
+    Creates the Flask app. Creating it does no I/O beyond what `warmup` asks for; see
+    APP_WARMUP for the modes.
+    """
+    app = Flask(__name__, static_folder='static', static_url_path='')
+    CORS(app)
+
+    app.config["DEBUG"] = APP_DEBUG
+
+    app_warmup = WarmUp(WARMUP_STEPS, mode=warmup)
+    app.extensions["warmup"] = app_warmup
+
+    @app.route('/')
+    def serve_index():
+        return send_from_directory(app.static_folder, 'index.html')
+
+    @app.route("/api/health", methods=["GET"])
+    def health_check():
+        return jsonify({"status": "healthy", "message": "Crypto Investigator API is running!"}), 200
+
+    @app.route("/api/ready", methods=["GET"])
+    def readiness_check():
+        """Returns 200 once every warm-up step has succeeded, 503 while warming up or after a failed step."""
+        if app_warmup.ready():
+            return jsonify({"status": "ready", "warmup": app_warmup.status()}), 200
+        if app_warmup.finished_at is not None and warmup != "off":
+            app_warmup.start()  # Retry the failed steps
+        return jsonify({"status": "warming_up", "warmup": app_warmup.status()}), 503
+
+    app.register_blueprint(report_bp, url_prefix='/api/reports')
+    app.register_blueprint(monitoring_bp, url_prefix='/api/monitoring')
+
+    if PROFILER_ENABLED:
+        get_profiler().start()
+    if warmup == "blocking":
+        app_warmup.run()
+    elif warmup == "background":
+        app_warmup.start()
+    return app
+
+_app_lock = threading.Lock()
+
+def __getattr__(name):
+    """
+    Module-level `app` for gunicorn src.main:app and flask run, created on first access so
+    that importing this module stays free of side effects.
+    """
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    global app
+    with _app_lock:
+        if "app" not in globals():
+            app = create_app()
+    return app
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
-    app.run(host="0.0.0.0", port=port)
+    create_app().run(host="0.0.0.0", port=port)
@@ -1,65 +1,359 @@
 #!/home/ubuntu/crypto_investigator_app/venv/bin/python
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 import os
+import json
+import threading
+import time
 
 # Assuming monitoring_service.py is in src.services
 # Adjust the import path if your structure is different
-from src.services.monitoring_service import fetch_ethereum_latest_block_transactions, analyze_transaction_for_suspicious_activity
+from src.services.block_tailer_service import BlockTailer
+from src.services.chain_adapter_service import CHAIN_DEFAULTS, MONITORED_CHAINS, get_chain_adapter
+from src.services.ingestion_pipeline_service import PIPELINE_STATS_FILE
+from src.services.alert_service import get_alert_dispatcher, queue_block_alerts
+from src.services.risk_assessment_service import RISK_SCORER, MAX_RISK_SCORE, generate_summary_for_finding
+from src.services.findings_store_service import get_findings_store
+from src.services.range_scan_service import start_range_scan, get_range_scan
+from src.services.transaction_graph_service import TAINT_MAX_HOPS, TAINT_QUERY_MAX_NODES
+from src.services.metrics_service import render_prometheus, get_profiler
 
 monitoring_bp = Blueprint("monitoring_bp", __name__)
 
-# --- Store last processed block to avoid reprocessing (in-memory for now, consider persistence) ---
-last_processed_block_eth = None
+# Upper bound on blocks backfilled by a single manual check (the background tailer has no such limit)
+MAX_BLOCKS_PER_CHECK = int(os.environ.get("MAX_BLOCKS_PER_CHECK", 50))
+MAX_TAINT_QUERY_HOPS = 6  # Upper bound on ?hops= for taint traces
+
+# --- Tracks the last processed block so blocks mined between checks are backfilled, not skipped ---
+# Findings are queued for background alerting so alert delivery never slows the monitor.
+# The checkpoint and findings live in the findings store, so restarts and other workers resume from it.
+# Created on first use (or during app warm-up) so importing the routes opens no database.
+# One tailer per chain; address activity and taint tracking follow the chain adapter.
+_CHAIN_TAILERS = {}
+_CHAIN_TAILERS_LOCK = threading.Lock()
+CHAIN_DISPLAY_NAMES = {"ethereum": "Ethereum", "bsc": "BSC", "polygon": "Polygon", "bitcoin": "Bitcoin"}
+
+def get_chain_tailer(chain):
+    """Returns the process-wide BlockTailer for chain, creating it on first use. Raises ValueError for unsupported chains."""
+    with _CHAIN_TAILERS_LOCK:
+        tailer = _CHAIN_TAILERS.get(chain)
+        if tailer is None:
+            adapter = get_chain_adapter(chain)
+            tailer = _CHAIN_TAILERS[chain] = BlockTailer(chain, on_findings=queue_block_alerts, store=get_findings_store(),
+                                                         track_activity=adapter.track_state, track_taint=adapter.track_state,
+                                                         adapter=adapter)
+        return tailer
+
+def get_eth_tailer():
+    """Returns the process-wide Ethereum BlockTailer, creating it on first use."""
+    return get_chain_tailer("ethereum")
+
+def _tailer_from_args():
+    """The tailer for ?chain= (default: ethereum), or an error response for unsupported chains."""
+    try:
+        return get_chain_tailer(request.args.get("chain", "ethereum").lower()), None
+    except ValueError as e:
+        return None, (jsonify({"status": "error", "message": str(e)}), 400)
+
+def _check_message(result, chain="ethereum"):
+    """Builds the human-readable message for a completed check."""
+    name = CHAIN_DISPLAY_NAMES.get(chain, chain)
+    if result["from_block"] == result["to_block"]:
+        block_range = f"{name} block {result['to_block']}"
+    else:
+        block_range = f"{name} blocks {result['from_block']}-{result['to_block']}"
+    message = f"Analyzed {result['transactions_analyzed']} transactions in {block_range}."
+    if result["to_block"] < result["head_block"]:
+        message += f" {result['head_block'] - result['to_block']} blocks behind the head remain."
+    if result["status"] == "partial":
+        message += f" Stopped early: {result['message']}"
+    return message
+
+def _wants_stream():
+    return request.args.get("stream") in ("1", "true", "ndjson") or \
+        request.accept_mimetypes.best == "application/x-ndjson"
+
+def _int_arg(name):
+    """Parses an optional integer query parameter (decimal or 0x-prefixed hex)."""
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    return int(value, 0)
 
 @monitoring_bp.route("/check-ethereum-now", methods=["POST"])
 def check_ethereum_realtime():
-    """Endpoint to manually trigger a check of the latest Ethereum block for suspicious activity."""
-    global last_processed_block_eth
+    """
+    Endpoint to manually trigger a check of Ethereum blocks mined since the last check for suspicious activity.
+    With ?stream=1 (or Accept: application/x-ndjson) findings are streamed as NDJSON while blocks are analyzed.
+    """
+    if _wants_stream():
+        return stream_ethereum_check()
 
-    result = fetch_ethereum_latest_block_transactions()
-    
-    if result["status"] != "success":
+    result = get_eth_tailer().poll_once(max_blocks=MAX_BLOCKS_PER_CHECK)
+
+    if result["status"] == "error":
         return jsonify({"status": "error", "message": result["message"], "source": result.get("source")}), 502
 
-    block_number_hex = result.get("block_number")
-    if block_number_hex is None:
-        return jsonify({"status": "error", "message": "Could not retrieve block number from Alchemy response."}), 500
-    
-    try:
-        current_block_number = int(block_number_hex, 16)
-    except ValueError:
-        return jsonify({"status": "error", "message": f"Invalid block number format received: {block_number_hex}"}), 500
-
-    # Basic check to avoid reprocessing the same block if called rapidly
-    # A more robust solution would involve persistent storage of last_processed_block_eth
-    if last_processed_block_eth == current_block_number:
-        return jsonify({"status": "success", "message": f"Block {current_block_number} already processed. No new transactions to analyze.", "findings": []}), 200
-
-    transactions = result["data"]
-    all_findings = []
-    processed_tx_hashes = set() # To avoid double-counting if a tx appears multiple times in a block (rare)
-
-    for tx in transactions:
-        tx_hash = tx.get("hash")
-        if tx_hash and tx_hash not in processed_tx_hashes:
-            findings = analyze_transaction_for_suspicious_activity(tx, "ethereum")
-            if findings:
-                all_findings.extend(findings)
-            processed_tx_hashes.add(tx_hash)
-    
-    last_processed_block_eth = current_block_number
+    if result["blocks_processed"] == 0:
+        return jsonify({"status": "success", "message": f"Block {result['to_block']} already processed. No new transactions to analyze.", "findings": []}), 200
 
+    message = _check_message(result)
+    all_findings = result["findings"]
     if not all_findings:
-        return jsonify({"status": "success", "message": f"Analyzed {len(transactions)} transactions in Ethereum block {current_block_number}. No suspicious activity detected by current rules.", "block_number": current_block_number, "source": result.get("source")}), 200
+        return jsonify({"status": "success", "message": f"{message} No suspicious activity detected by current rules.", "block_number": result["to_block"], "source": result.get("source")}), 200
     
     return jsonify({
         "status": "success", 
-        "message": f"Analyzed {len(transactions)} transactions in Ethereum block {current_block_number}. Suspicious activities found.",
-        "block_number": current_block_number,
+        "message": f"{message} Suspicious activities found.",
+        "block_number": result["to_block"],
         "findings": all_findings,
         "source": result.get("source")
     }), 200
 
-# Future: Add endpoints for starting/stopping continuous monitoring (if implemented)
-# Future: Add endpoints for other chains
+def stream_ethereum_check():
+    """
+    Streams a check as NDJSON: one {"type": "finding"} line per finding (with its summary)
+    as soon as its block is analyzed, then a final {"type": "result"} line. Memory use stays
+    flat no matter how many findings the checked blocks produce.
+    """
+    tailer = get_eth_tailer()
+
+    def generate():
+        summary = {}
+        total_score = 0
+        for block_number, _, findings in tailer.iter_poll(summary, max_blocks=MAX_BLOCKS_PER_CHECK):
+            for finding in findings:
+                total_score += RISK_SCORER.finding_score(finding)
+                line = {"type": "finding", "block_number": block_number, "finding": finding,
+                        "summary": generate_summary_for_finding(finding)}
+                yield json.dumps(line) + "\n"
+
+        if summary.get("status") == "error":
+            result = {"status": "error", "message": summary["message"], "source": summary.get("source")}
+        elif summary["blocks_processed"] == 0:
+            result = {"status": "success", "message": f"Block {summary['to_block']} already processed. No new transactions to analyze."}
+        else:
+            result = dict(summary, message=_check_message(summary), block_number=summary["to_block"],
+                          risk_score=min(int(total_score), MAX_RISK_SCORE))
+        yield json.dumps(dict(result, type="result")) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@monitoring_bp.route("/tailer/start", methods=["POST"])
+def start_tailer():
+    """Starts continuous background monitoring of new blocks of ?chain= (default: ethereum)."""
+    tailer, error = _tailer_from_args()
+    if error:
+        return error
+    name = CHAIN_DISPLAY_NAMES.get(tailer.chain, tailer.chain)
+    started = tailer.start()
+    message = f"{name} block tailer started." if started else f"{name} block tailer is already running."
+    return jsonify({"status": "success", "message": message, "tailer": tailer.status()}), 200
+
+@monitoring_bp.route("/tailer/stop", methods=["POST"])
+def stop_tailer():
+    """Stops the background block tailer of ?chain= (default: ethereum)."""
+    tailer, error = _tailer_from_args()
+    if error:
+        return error
+    name = CHAIN_DISPLAY_NAMES.get(tailer.chain, tailer.chain)
+    stopped = tailer.stop(timeout=30)
+    message = f"{name} block tailer stopped." if stopped else f"{name} block tailer is not running."
+    return jsonify({"status": "success", "message": message, "tailer": tailer.status()}), 200
+
+@monitoring_bp.route("/tailer/status", methods=["GET"])
+def tailer_status():
+    """Reports the tailer checkpoint, chain head and lag of ?chain= (default: ethereum)."""
+    tailer, error = _tailer_from_args()
+    if error:
+        return error
+    return jsonify({"status": "success", "tailer": tailer.status()}), 200
+
+@monitoring_bp.route("/chains", methods=["GET"])
+def list_chains():
+    """Lists the supported chains with their adapter settings and, once created, their tailer status."""
+    chains = []
+    for chain in CHAIN_DEFAULTS:
+        tailer = _CHAIN_TAILERS.get(chain)
+        chains.append({
+            **get_chain_adapter(chain).status(),
+            "monitored_by_worker": chain in MONITORED_CHAINS,
+            "tailer": tailer.status() if tailer is not None else None,
+        })
+    return jsonify({"status": "success", "chains": chains}), 200
+
+@monitoring_bp.route("/chains/<chain>/check", methods=["POST"])
+def check_chain_now(chain):
+    """Checks the blocks of any supported chain mined since the last check, like /check-ethereum-now."""
+    try:
+        tailer = get_chain_tailer(chain.lower())
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    result = tailer.poll_once(max_blocks=MAX_BLOCKS_PER_CHECK)
+    if result["status"] == "error":
+        return jsonify({"status": "error", "message": result["message"], "source": result.get("source")}), 502
+    if result["blocks_processed"] == 0:
+        return jsonify({"status": "success", "message": f"Block {result['to_block']} already processed. No new transactions to analyze.",
+                        "chain": tailer.chain, "findings": []}), 200
+    message = _check_message(result, tailer.chain)
+    if result["findings"]:
+        message += " Suspicious activities found."
+    else:
+        message += " No suspicious activity detected by current rules."
+    return jsonify({"status": "success", "message": message, "chain": tailer.chain, "block_number": result["to_block"],
+                    "findings": result["findings"], "source": result.get("source")}), 200
+
+@monitoring_bp.route("/address-activity/<address>", methods=["GET"])
+def address_activity(address):
+    """Reports the tailer's rolling-window statistics (outflow, tx count, counterparties) for an address."""
+    tailer = get_eth_tailer()
+    stats = tailer.activity.stats(address) if tailer.activity is not None else None
+    if stats is None:
+        return jsonify({"status": "error", "message": f"No recent activity tracked for {address}."}), 404
+    return jsonify({"status": "success", "address": address.lower(), "activity": stats}), 200
+
+@monitoring_bp.route("/taint/<address>", methods=["GET"])
+def trace_taint(address):
+    """
+    Traces funds from an address through the tailer's transaction graph: addresses reached
+    within ?hops= (default TAINT_MAX_HOPS) and the value that flowed to them.
+    """
+    tailer = get_eth_tailer()
+    if tailer.taint is None:
+        return jsonify({"status": "error", "message": "Taint tracking is disabled."}), 404
+    try:
+        hops = min(_int_arg("hops") or TAINT_MAX_HOPS, MAX_TAINT_QUERY_HOPS)
+        max_nodes = min(_int_arg("limit") or TAINT_QUERY_MAX_NODES, TAINT_QUERY_MAX_NODES)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid query parameter: {e}"}), 400
+    trace = tailer.taint.graph.trace_taint(address, hops, max_nodes)
+    return jsonify({"status": "success", "hops": hops, **trace}), 200
+
+@monitoring_bp.route("/pipeline/stats", methods=["GET"])
+def pipeline_stats():
+    """Reports queue depth and throughput per stage of the standalone ingestion worker (src/worker.py)."""
+    try:
+        with open(PIPELINE_STATS_FILE) as f:
+            stats = json.load(f)
+    except FileNotFoundError:
+        return jsonify({"status": "error", "message": "No pipeline statistics found. Is the ingestion worker running?"}), 404
+    except (OSError, ValueError) as e:
+        return jsonify({"status": "error", "message": f"Could not read pipeline statistics: {e}"}), 500
+    stats["age_seconds"] = round(time.time() - stats.get("updated_at", 0), 1)
+    return jsonify({"status": "success", "pipeline": stats}), 200
+
+@monitoring_bp.route("/alerts/status", methods=["GET"])
+def alerts_status():
+    """Reports alert dispatcher queue depth and per-channel delivery counters."""
+    return jsonify({"status": "success", "alerts": get_alert_dispatcher().status()}), 200
+
+@monitoring_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Exposes counters, latency histograms and block lag in the Prometheus text format."""
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@monitoring_bp.route("/profiler/start", methods=["POST"])
+def start_profiler():
+    """Starts the sampling profiler; ?reset=1 discards the samples collected so far."""
+    profiler = get_profiler()
+    if request.args.get("reset") in ("1", "true"):
+        profiler.reset()
+    if profiler.start():
+        return jsonify({"status": "success", "message": "Profiler started.", "profiler": profiler.status()}), 200
+    return jsonify({"status": "info", "message": "Profiler is already running.", "profiler": profiler.status()}), 200
+
+@monitoring_bp.route("/profiler/stop", methods=["POST"])
+def stop_profiler():
+    profiler = get_profiler()
+    if profiler.stop():
+        return jsonify({"status": "success", "message": "Profiler stopped.", "profiler": profiler.status()}), 200
+    return jsonify({"status": "info", "message": "Profiler is not running.", "profiler": profiler.status()}), 200
+
+@monitoring_bp.route("/profiler", methods=["GET"])
+def profiler_report():
+    """
+    Returns the profile collected so far: ?format=folded gives collapsed stacks for flame
+    graph tools, otherwise the functions most often on CPU as JSON. ?limit bounds the rows.
+    """
+    profiler = get_profiler()
+    try:
+        limit = _int_arg("limit")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid query parameter: {e}"}), 400
+    if request.args.get("format") == "folded":
+        return Response(profiler.folded(limit), mimetype="text/plain")
+    return jsonify({"status": "success", "profiler": profiler.status(),
+                    "top_functions": profiler.top_functions(limit or 25)}), 200
+
+@monitoring_bp.route("/findings", methods=["GET"])
+def query_findings():
+    """
+    Queries stored findings, newest first. Filters: chain, address, tx_hash, block,
+    from_block, to_block, type. Paginate with limit and before_id.
+    """
+    try:
+        findings = get_findings_store().query_findings(
+            chain=request.args.get("chain"),
+            address=request.args.get("address"),
+            tx_hash=request.args.get("tx_hash"),
+            block_number=_int_arg("block"),
+            from_block=_int_arg("from_block"),
+            to_block=_int_arg("to_block"),
+            finding_type=request.args.get("type"),
+            before_id=_int_arg("before_id"),
+            limit=_int_arg("limit") or 100,
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid query parameter: {e}"}), 400
+    next_before_id = findings[-1]["id"] if findings else None
+    return jsonify({"status": "success", "findings": findings, "count": len(findings), "next_before_id": next_before_id}), 200
+
+@monitoring_bp.route("/blocks/<int:block_number>", methods=["GET"])
+def processed_block(block_number):
+    """Returns a processed block with its stored findings."""
+    chain = request.args.get("chain", "ethereum")
+    store = get_findings_store()
+    block = store.get_block(chain, block_number)
+    if block is None:
+        return jsonify({"status": "error", "message": f"Block {block_number} has not been processed for {chain}."}), 404
+    block["findings"] = store.query_findings(chain=chain, block_number=block_number, limit=block["findings_count"] or 1)
+    return jsonify({"status": "success", "block": block}), 200
+
+@monitoring_bp.route("/checkpoints", methods=["GET"])
+def checkpoints():
+    """Reports the stored last processed block per chain."""
+    return jsonify({"status": "success", "checkpoints": get_findings_store().list_checkpoints()}), 200
+
+@monitoring_bp.route("/range-scan", methods=["POST"])
+def create_range_scan():
+    """
+    Starts a background scan of a historical block range: {"start_block": ..., "end_block": ...}.
+    Findings are written to the findings store; follow progress at /range-scan/<id> and
+    query results with /findings?from_block=...&to_block=...
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        start_block = int(str(data["start_block"]), 0)
+        end_block = int(str(data["end_block"]), 0)
+        job = start_range_scan(start_block, end_block, chain="ethereum", store=get_findings_store())
+    except KeyError:
+        return jsonify({"status": "error", "message": "start_block and end_block are required."}), 400
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "message": f"Range scan of blocks {start_block}-{end_block} started.", "scan": job.status()}), 202
+
+@monitoring_bp.route("/range-scan/<job_id>", methods=["GET"])
+def range_scan_status(job_id):
+    """Reports progress of a range scan."""
+    job = get_range_scan(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Range scan {job_id} not found."}), 404
+    return jsonify({"status": "success", "scan": job.status()}), 200
 
+@monitoring_bp.route("/range-scan/<job_id>/cancel", methods=["POST"])
+def cancel_range_scan(job_id):
+    """Stops a running range scan after the chunk currently being merged."""
+    job = get_range_scan(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Range scan {job_id} not found."}), 404
+    job.cancel()
+    return jsonify({"status": "success", "message": "Range scan cancellation requested.", "scan": job.status()}), 200
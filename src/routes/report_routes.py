@@ -4,14 +4,36 @@ import json
 import requests
 from datetime import datetime
 
-# Import API keys from config.py instead of environment variables
-from src.config import ETHERSCAN_API_KEY, ALCHEMY_ETH_MAINNET_API_KEY
+from src.services.report_service import get_wallet_report, REPORT_CACHE, SUPPORTED_REPORT_CHAINS
 
 # Create blueprint
 report_bp = Blueprint('reports', __name__)
 
-# Debug print statements to verify API keys are loaded
-print(f"DEBUG_REPORT_ROUTES: ETHERSCAN_API_KEY from config: {ETHERSCAN_API_KEY}")
-print(f"DEBUG_REPORT_ROUTES: ALCHEMY_ETH_MAINNET_API_KEY from config: {ALCHEMY_ETH_MAINNET_API_KEY}")
+@report_bp.route("/on-demand", methods=["POST"])
+def on_demand_report():
+    """
+    Builds a risk report for a wallet address. Reports are cached per address for
+    REPORT_CACHE_TTL_SECONDS and concurrent requests for the same address share one build.
+    """
+    data = request.get_json(silent=True) or {}
+    identifier = (data.get("identifier") or "").strip()
+    chain = (data.get("chain") or "ethereum").lower()
+    report_type = (data.get("type") or "wallet").lower()
 
-# Keep the rest of the file unchanged
+    if not identifier:
+        return jsonify({"status": "error", "message": "An address or transaction hash is required.", "source": "Validation"}), 400
+    if chain not in SUPPORTED_REPORT_CHAINS:
+        return jsonify({"status": "error", "message": f"On-demand reports are not available for {chain} yet.", "source": "Validation"}), 400
+    if report_type != "wallet":
+        return jsonify({"status": "error", "message": "Only wallet reports are supported at the moment.", "source": "Validation"}), 400
+    if not (identifier.startswith("0x") and len(identifier) == 42):
+        return jsonify({"status": "error", "message": f"Invalid {chain} address: {identifier}", "source": "Validation"}), 400
+
+    report = get_wallet_report(identifier, chain)
+    if report["status"] == "error":
+        return jsonify(report), 502
+    return jsonify(report), 200
+
+@report_bp.route("/cache", methods=["GET"])
+def report_cache_status():
+    return jsonify({"status": "success", "cache": REPORT_CACHE.status()}), 200
@@ -0,0 +1,279 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import os
+from array import array
+from collections import deque
+
+# --- Configuration for address behaviour tracking ---
+ADDRESS_WINDOW_BLOCKS = int(os.environ.get("ADDRESS_WINDOW_BLOCKS", 300))  # Rolling window (~1 hour of mainnet blocks)
+ADDRESS_ACTIVITY_MEMORY_BYTES = int(os.environ.get("ADDRESS_ACTIVITY_MEMORY_BYTES", 256 * 1024**2))
+# Approximate cost of one tracked address: interning dict entry and key string plus the per-address arrays
+BYTES_PER_TRACKED_ADDRESS = 200
+ADDRESS_EVICTION_FRACTION = 0.1  # Share of addresses evicted at once when the budget is exhausted
+
+# Drained wallet: a large outflow spread over several transactions to very few counterparties
+DRAINED_WALLET_MIN_OUTFLOW_ETH = float(os.environ.get("DRAINED_WALLET_MIN_OUTFLOW_ETH", 50))
+DRAINED_WALLET_MIN_TXS = int(os.environ.get("DRAINED_WALLET_MIN_TXS", 3))
+DRAINED_WALLET_MAX_COUNTERPARTIES = int(os.environ.get("DRAINED_WALLET_MAX_COUNTERPARTIES", 2))
+# Unusual pattern: bursts of transactions or fan-out to many distinct counterparties
+UNUSUAL_PATTERN_MIN_TXS = int(os.environ.get("UNUSUAL_PATTERN_MIN_TXS", 200))
+UNUSUAL_PATTERN_MIN_COUNTERPARTIES = int(os.environ.get("UNUSUAL_PATTERN_MIN_COUNTERPARTIES", 100))
+
+WEI_PER_ETH = 10**18
+
+
+def _counterparty_id(address):
+    """An integer that identifies the address exactly: its 160-bit value for EVM addresses, else its bytes."""
+    try:
+        return int(address, 16) << 1
+    except ValueError:
+        return (int.from_bytes(address.encode("utf-8"), "big") << 1) | 1
+
+
+class _BlockEvents:
+    """The outgoing transfers of one block, as parallel compact arrays."""
+
+    __slots__ = ("block_number", "slots", "generations", "values", "pairs")
+
+    def __init__(self, block_number):
+        self.block_number = block_number
+        self.slots = array("I")
+        self.generations = array("I")
+        self.values = array("d")  # ETH
+        self.pairs = []  # (counterparty id << 64) | (generation << 32) | slot
+
+
+class AddressActivityAggregator:
+    """
+    Rolling-window statistics per sending address over the last `window_blocks` blocks:
+    outflow sum, transaction count and number of distinct counterparties.
+
+    Addresses are interned to integer slots; per-slot totals live in flat arrays and are
+    updated incrementally as each block enters the window and the oldest one leaves it, so
+    the cost per block is proportional to its transactions, not to the tracked addresses.
+    Distinct counterparties are counted exactly from the (sender, counterparty) pairs in
+    the window. Addresses with no activity left in the window are evicted first when the
+    memory budget is reached; otherwise the least recently active ones are. A slot's
+    generation is bumped on eviction so the window events of an evicted address never
+    count towards the address that reuses its slot.
+
+    Blocks must be observed in order; a block at or below the last observed one is ignored.
+    After a reorg, unwind(fork_block) takes the replaced blocks back out of the window so
+    the canonical ones can be observed in their place.
+    """
+
+    def __init__(self, window_blocks=ADDRESS_WINDOW_BLOCKS, memory_bytes=ADDRESS_ACTIVITY_MEMORY_BYTES):
+        self.window_blocks = max(1, int(window_blocks))
+        self.max_addresses = max(1024, memory_bytes // BYTES_PER_TRACKED_ADDRESS)
+        self.slot_of = {}  # address -> slot
+        self.addresses = []  # slot -> address ("" for a free slot)
+        self.outflow = array("d")
+        self.tx_count = array("I")
+        self.counterparties = array("I")
+        self.last_seen = array("q")
+        self.generation = array("I")
+        self.drained_flagged_at = array("q")
+        self.pattern_flagged_at = array("q")
+        self.free_slots = []
+        self.pair_counts = {}
+        self.blocks = deque()
+        self.last_block = None
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    # --- Slots ---
+
+    def _slot(self, address, block_number):
+        slot = self.slot_of.get(address)
+        if slot is not None:
+            return slot
+        if not self.free_slots and len(self.addresses) >= self.max_addresses:
+            self._evict(block_number)
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.addresses[slot] = address
+        else:
+            slot = len(self.addresses)
+            self.addresses.append(address)
+            for column in (self.outflow, self.tx_count, self.counterparties, self.generation):
+                column.append(0)
+            for column in (self.last_seen, self.drained_flagged_at, self.pattern_flagged_at):
+                column.append(-1)
+        self.slot_of[address] = slot
+        return slot
+
+    def _release(self, slot):
+        del self.slot_of[self.addresses[slot]]
+        self.addresses[slot] = ""
+        self.outflow[slot] = 0
+        self.tx_count[slot] = 0
+        self.counterparties[slot] = 0
+        self.last_seen[slot] = -1
+        self.drained_flagged_at[slot] = -1
+        self.pattern_flagged_at[slot] = -1
+        self.generation[slot] = (self.generation[slot] + 1) & 0xFFFFFFFF
+        self.free_slots.append(slot)
+
+    def _evict(self, block_number):
+        """Frees slots: addresses idle for the whole window first, else the least recently active."""
+        cutoff = block_number - self.window_blocks
+        idle = [slot for slot, seen in enumerate(self.last_seen) if 0 <= seen <= cutoff]
+        if not idle:
+            target = max(1, int(len(self.slot_of) * ADDRESS_EVICTION_FRACTION))
+            live = [slot for slot, seen in enumerate(self.last_seen) if seen >= 0]
+            idle = sorted(live, key=self.last_seen.__getitem__)[:target]
+        for slot in idle:
+            self._release(slot)
+        self.evictions += len(idle)
+
+    # --- Window maintenance ---
+
+    def _remove_events(self, events):
+        """Subtracts a block's events from the per-slot totals; returns the slots still holding their address."""
+        pair_counts = self.pair_counts
+        current_slots = set()
+        for slot, generation, value, pair in zip(events.slots, events.generations, events.values, events.pairs):
+            current = self.generation[slot] == generation  # False once the address was evicted
+            remaining = pair_counts[pair] - 1
+            if remaining:
+                pair_counts[pair] = remaining
+            else:
+                del pair_counts[pair]
+                if current:
+                    self.counterparties[slot] -= 1
+            if current:
+                self.outflow[slot] = max(0.0, self.outflow[slot] - value)
+                self.tx_count[slot] -= 1
+                current_slots.add(slot)
+        return current_slots
+
+    def _expire(self, block_number):
+        cutoff = block_number - self.window_blocks
+        while self.blocks and self.blocks[0].block_number <= cutoff:
+            self._remove_events(self.blocks.popleft())
+
+    def unwind(self, fork_block):
+        """
+        Removes the blocks after fork_block (replaced by a reorg) from the window and clears
+        the drained-wallet and unusual-pattern flags raised in them, so the canonical blocks
+        are observed next and their findings can be raised again. Blocks that already left
+        the window are not restored. Returns the number of blocks removed.
+        """
+        removed = 0
+        touched = set()
+        while self.blocks and self.blocks[-1].block_number > fork_block:
+            touched |= self._remove_events(self.blocks.pop())
+            removed += 1
+        for slot in touched:
+            if self.drained_flagged_at[slot] > fork_block:
+                self.drained_flagged_at[slot] = -1
+            if self.pattern_flagged_at[slot] > fork_block:
+                self.pattern_flagged_at[slot] = -1
+            if self.last_seen[slot] > fork_block:
+                self.last_seen[slot] = fork_block
+        if self.last_block is not None and self.last_block > fork_block:
+            self.last_block = fork_block
+        return removed
+
+    def observe_block(self, block_number, batch):
+        """
+        Adds a block's transactions (a TransactionBatch) to the window and returns findings for
+        senders that crossed the drained-wallet or unusual-pattern thresholds in this block.
+        """
+        if self.last_block is not None and block_number <= self.last_block:
+            return []  # Already observed
+        self.last_block = block_number
+        self._expire(block_number)
+
+        events = _BlockEvents(block_number)
+        touched = {}
+        pair_counts = self.pair_counts
+        from_addresses, to_addresses, values_wei = batch.from_addresses, batch.to_addresses, batch.values_wei
+        for row in batch.rows_with("from"):
+            sender = from_addresses[row]
+            slot = self._slot(sender, block_number)
+            value = values_wei[row] / WEI_PER_ETH
+            pair = (_counterparty_id(to_addresses[row]) << 64) | (self.generation[slot] << 32) | slot
+            self.outflow[slot] += value
+            self.tx_count[slot] += 1
+            count = pair_counts.get(pair, 0)
+            if not count:
+                self.counterparties[slot] += 1
+            pair_counts[pair] = count + 1
+            self.last_seen[slot] = block_number
+            events.slots.append(slot)
+            events.generations.append(self.generation[slot])
+            events.values.append(value)
+            events.pairs.append(pair)
+            touched[slot] = row  # Last transaction of the sender in this block
+        self.blocks.append(events)
+        return self._check_thresholds(block_number, batch, touched)
+
+    # --- Detection ---
+
+    def stats(self, address):
+        """Window statistics of an address, or None if it is not tracked."""
+        slot = self.slot_of.get(address.lower())
+        if slot is None:
+            return None
+        return {
+            "outflow_eth": self.outflow[slot],
+            "tx_count": self.tx_count[slot],
+            "distinct_counterparties": self.counterparties[slot],
+            "last_seen_block": self.last_seen[slot],
+            "window_blocks": self.window_blocks,
+        }
+
+    def _finding(self, finding_type, message, slot, batch, row, block_number):
+        return {
+            "type": finding_type,
+            "message": message,
+            "details": {
+                "hash": batch.hashes[row],
+                "address": self.addresses[slot],
+                "from": batch.transactions[row].get("from"),
+                "to": batch.transactions[row].get("to"),
+                "outflow_eth": round(self.outflow[slot], 6),
+                "tx_count": self.tx_count[slot],
+                "distinct_counterparties": self.counterparties[slot],
+                "window_blocks": self.window_blocks,
+                "block_number": block_number,
+            }
+        }
+
+    def _check_thresholds(self, block_number, batch, touched):
+        findings = []
+        window = self.window_blocks
+        for slot, row in touched.items():
+            outflow, tx_count, counterparties = self.outflow[slot], self.tx_count[slot], self.counterparties[slot]
+            # Each kind of finding is raised at most once per window for an address
+            if (outflow >= DRAINED_WALLET_MIN_OUTFLOW_ETH and tx_count >= DRAINED_WALLET_MIN_TXS
+                    and counterparties <= DRAINED_WALLET_MAX_COUNTERPARTIES
+                    and (self.drained_flagged_at[slot] < 0 or block_number - self.drained_flagged_at[slot] >= window)):
+                self.drained_flagged_at[slot] = block_number
+                findings.append(self._finding(
+                    "drained_wallet_activity",
+                    f"Possible wallet drain: {outflow:.2f} ETH sent in {tx_count} transactions to "
+                    f"{counterparties} address(es) within {window} blocks",
+                    slot, batch, row, block_number))
+            if ((tx_count >= UNUSUAL_PATTERN_MIN_TXS or counterparties >= UNUSUAL_PATTERN_MIN_COUNTERPARTIES)
+                    and (self.pattern_flagged_at[slot] < 0 or block_number - self.pattern_flagged_at[slot] >= window)):
+                self.pattern_flagged_at[slot] = block_number
+                findings.append(self._finding(
+                    "unusual_transaction_pattern",
+                    f"Unusual activity: {tx_count} transactions to {counterparties} distinct addresses "
+                    f"within {window} blocks",
+                    slot, batch, row, block_number))
+        return findings
+
+    def status(self):
+        return {
+            "tracked_addresses": len(self.slot_of),
+            "max_addresses": self.max_addresses,
+            "window_blocks": self.window_blocks,
+            "blocks_in_window": len(self.blocks),
+            "counterparty_pairs": len(self.pair_counts),
+            "last_block": self.last_block,
+            "evictions": self.evictions,
+        }
@@ -1,7 +1,14 @@
 #!/home/ubuntu/crypto_investigator_app/venv/bin/python
 import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
 import requests # For Discord Webhooks and potentially other HTTP-based alerts
 
+from src.services.metrics_service import counter, histogram, register_collector
+
 # --- Configuration for Alerting Services (using environment variables is best practice) ---
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "YOUR_TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "YOUR_TELEGRAM_CHAT_ID")
@@ -9,6 +16,25 @@ DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL", "YOUR_DISCORD_WEBHOO
 SENDGRID_API_KEY = os.environ.get("SENDGRID_API_KEY", "YOUR_SENDGRID_API_KEY")
 ALERT_EMAIL_FROM = os.environ.get("ALERT_EMAIL_FROM", "alerts@example.com")
 ALERT_EMAIL_TO = os.environ.get("ALERT_EMAIL_TO", "user@example.com")
+TELEGRAM_API_BASE_URL = os.environ.get("TELEGRAM_API_BASE_URL", "https://api.telegram.org")
+
+# --- Background dispatcher settings ---
+ALERT_COALESCE_SECONDS = float(os.environ.get("ALERT_COALESCE_SECONDS", 2))  # Window for grouping findings into digests
+ALERT_DIGEST_MAX_FINDINGS = int(os.environ.get("ALERT_DIGEST_MAX_FINDINGS", 25))  # Findings per digest message
+ALERT_QUEUE_SIZE = int(os.environ.get("ALERT_QUEUE_SIZE", 10000))
+ALERT_MAX_RETRIES = int(os.environ.get("ALERT_MAX_RETRIES", 5))
+ALERT_RETRY_BACKOFF_SECONDS = float(os.environ.get("ALERT_RETRY_BACKOFF_SECONDS", 1))
+ALERT_HTTP_TIMEOUT_SECONDS = float(os.environ.get("ALERT_HTTP_TIMEOUT_SECONDS", 10))
+TELEGRAM_RATE_PER_SECOND = float(os.environ.get("TELEGRAM_RATE_PER_SECOND", 1))  # Telegram allows ~1 msg/s per chat
+DISCORD_RATE_PER_SECOND = float(os.environ.get("DISCORD_RATE_PER_SECOND", 2.5))  # Discord webhooks allow 5 per 2s
+
+# --- Alert deduplication ---
+ALERT_DEDUP_MAX_ENTRIES = int(os.environ.get("ALERT_DEDUP_MAX_ENTRIES", 100000))
+ALERT_DEDUP_TX_TTL_SECONDS = float(os.environ.get("ALERT_DEDUP_TX_TTL_SECONDS", 24 * 3600))  # Same finding on the same tx (e.g. re-orgs)
+ALERT_DEDUP_ADDRESS_TTL_SECONDS = float(os.environ.get("ALERT_DEDUP_ADDRESS_TTL_SECONDS", 600))  # Same finding type for the same address
+
+ALERT_SENDS = counter("alert_sends_total", "Alert messages sent through a channel, by outcome after retries.", ("channel", "result"))
+ALERT_SEND_SECONDS = histogram("alert_send_duration_seconds", "Time to deliver one alert message, including rate-limit waits and retries.", ("channel",))
 
 def send_telegram_alert(message):
     """Sends an alert message via Telegram Bot."""
@@ -17,7 +43,7 @@ def send_telegram_alert(message):
         print("Telegram bot token or chat ID not configured. Skipping Telegram alert.")
         return False
     
-    api_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    api_url = f"{TELEGRAM_API_BASE_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
         "text": message,
@@ -85,26 +111,107 @@ def send_email_alert(subject, body_html):
     print("Actual email sending with SendGrid needs the `sendgrid` library and proper setup.")
     return True # Simulate success for now
 
-def dispatch_alert(finding_type, details):
-    """
-    Dispatches an alert through configured channels based on the finding.
-    `details` should be a dictionary containing information about the suspicious activity.
-    """
+def format_alert_message(finding_type, details):
+    """Formats the alert message for a single finding."""
     message = f"🚨 Suspicious Activity Detected! 🚨\nType: {finding_type}\n"
     
     if "hash" in details:
-        message += f"Transaction Hash: {details["hash"]}\n"
+        message += f"Transaction Hash: {details['hash']}\n"
     if "address" in details:
-        message += f"Address: {details["address"]}\n"
+        message += f"Address: {details['address']}\n"
     if "from" in details and "to" in details and "value_eth" in details:
-        message += f"From: {details["from"]}\nTo: {details["to"]}\nValue: {details["value_eth"]:.2f} ETH\n"
+        message += f"From: {details['from']}\nTo: {details['to']}\nValue: {details['value_eth']:.2f} {details.get('currency', 'ETH')}\n"
     if "reason" in details:
-        message += f"Reason: {details["reason"]}\n"
+        message += f"Reason: {details['reason']}\n"
     if "chain" in details:
-        message += f"Chain: {details["chain"].upper()}\n"
+        message += f"Chain: {details['chain'].upper()}\n"
 
     # Add more details to the message as needed
     message += f"\nDetails: {str(details)}"
+    return message
+
+class AlertDedupCache:
+    """
+    Bounded LRU cache of recently alerted keys, each with its own expiry. A hit does not
+    extend the expiry, so an address that keeps triggering is alerted again once per TTL.
+    """
+
+    def __init__(self, max_entries=ALERT_DEDUP_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> expiry (time.monotonic()), least recently used first
+        self._lock = threading.Lock()
+        self.stats = {"passed": 0, "suppressed": 0, "evicted": 0}
+
+    def check_and_add(self, keys_with_ttl):
+        """
+        Returns True (suppress) if any key is still cached. Otherwise records every key with
+        its TTL and returns False.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key, _ in keys_with_ttl:
+                expiry = self._entries.get(key)
+                if expiry is not None:
+                    if expiry > now:
+                        self._entries.move_to_end(key)
+                        self.stats["suppressed"] += 1
+                        return True
+                    del self._entries[key]
+            for key, ttl in keys_with_ttl:
+                self._entries[key] = now + ttl
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+            self.stats["passed"] += 1
+            return False
+
+    def discard(self, keys):
+        """Forgets keys recorded by check_and_add, e.g. when the alert could not be queued after all."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def status(self):
+        return dict(self.stats, entries=len(self._entries))
+
+
+ALERT_DEDUP_CACHE = AlertDedupCache()
+
+def alert_dedup_keys(finding_type, details):
+    """Dedup keys for a finding: its transaction and the address it is about, each with a TTL."""
+    keys = []
+    tx_hash = details.get("hash") or details.get("transaction_hash")
+    if tx_hash:
+        keys.append(((finding_type, "tx", tx_hash.lower()), ALERT_DEDUP_TX_TTL_SECONDS))
+    address = details.get("address") or details.get("interacting_address") or details.get("from")
+    if address and ALERT_DEDUP_ADDRESS_TTL_SECONDS > 0:
+        keys.append(((finding_type, "address", address.lower()), ALERT_DEDUP_ADDRESS_TTL_SECONDS))
+    return keys
+
+def is_duplicate_alert(finding_type, details):
+    """True if an equivalent alert was sent recently; otherwise remembers this one."""
+    keys = alert_dedup_keys(finding_type, details)
+    return bool(keys) and ALERT_DEDUP_CACHE.check_and_add(keys)
+
+def forget_alert(finding_type, details):
+    """Undoes is_duplicate_alert for an alert that was dropped, so an equivalent one is not suppressed."""
+    ALERT_DEDUP_CACHE.discard([key for key, _ in alert_dedup_keys(finding_type, details)])
+
+def dispatch_alert(finding_type, details):
+    """
+    Dispatches an alert through configured channels based on the finding.
+    `details` should be a dictionary containing information about the suspicious activity.
+    """
+    if is_duplicate_alert(finding_type, details):
+        print(f"Suppressed duplicate {finding_type} alert.")
+        return
+
+    message = format_alert_message(finding_type, details)
 
     # Send to preferred channels (e.g., Telegram first)
     telegram_sent = send_telegram_alert(message)
@@ -120,6 +227,331 @@ def dispatch_alert(finding_type, details):
     else:
         print("Failed to dispatch alert to any channel.")
 
+# --- Background alert dispatcher ---
+# The monitoring path only enqueues findings. A dispatcher thread coalesces them per block
+# into digest messages and hands each digest to every channel; each channel has its own
+# sender thread and pooled session, so a slow or rate-limited channel never holds up
+# the others or the monitor.
+
+def _format_digest_line(finding_type, details):
+    line = f"- {finding_type}"
+    if "value_eth" in details:
+        line += f": {details['value_eth']:.2f} {details.get('currency', 'ETH')}"
+    if "from" in details and "to" in details:
+        line += f" {details['from']} -> {details['to']}"
+    elif "address" in details:
+        line += f" {details['address']}"
+    if "hash" in details:
+        line += f" (tx {details['hash']})"
+    return line
+
+def format_alert_digest(findings, chain=None, block_number=None):
+    """Formats a list of (finding_type, details) pairs as one digest message."""
+    if len(findings) == 1:
+        return format_alert_message(*findings[0])
+    location = (chain or "unknown chain").upper()
+    if block_number is not None:
+        location += f" block {block_number}"
+    header = f"🚨 {len(findings)} suspicious activities detected in {location} 🚨"
+    return "\n".join([header] + [_format_digest_line(finding_type, details) for finding_type, details in findings])
+
+def split_message(message, max_length):
+    """Splits a message on line boundaries into chunks of at most max_length characters."""
+    if len(message) <= max_length:
+        return [message]
+    chunks, current = [], ""
+    for line in message.split("\n"):
+        while len(line) > max_length:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:max_length])
+            line = line[max_length:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > max_length:
+            chunks.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class AlertChannel:
+    """
+    One outbound alert channel with its own queue, sender thread and pooled session.
+    Sends are spaced to the channel's rate limit, 429 responses pause the channel for the
+    advertised Retry-After, and failures are retried with exponential backoff.
+    """
+
+    def __init__(self, name, url, build_payload, max_message_length, rate_per_second,
+                 max_retries=None, backoff_seconds=None, queue_size=None, timeout=None):
+        self.name = name
+        self.url = url
+        self.build_payload = build_payload  # message -> keyword arguments for session.post
+        self.max_message_length = max_message_length
+        self.min_interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.max_retries = ALERT_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = ALERT_RETRY_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+        self.timeout = ALERT_HTTP_TIMEOUT_SECONDS if timeout is None else timeout
+        self.queue = queue.Queue(maxsize=queue_size or ALERT_QUEUE_SIZE)
+        self.session = requests.Session()
+        self.next_send_time = 0.0
+        self.stats = {"sent": 0, "failed": 0, "retries": 0, "rate_limited": 0, "dropped": 0}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._sent_metric = ALERT_SENDS.labels(name, "sent")
+        self._failed_metric = ALERT_SENDS.labels(name, "failed")
+        self._send_seconds = ALERT_SEND_SECONDS.labels(name)
+
+    def enqueue(self, message):
+        for chunk in split_message(message, self.max_message_length):
+            try:
+                self.queue.put_nowait(chunk)
+            except queue.Full:
+                self.stats["dropped"] += 1
+                print(f"{self.name} alert queue full; dropping message.")
+
+    def _wait(self, seconds):
+        if seconds > 0:
+            self._stop_event.wait(seconds)
+
+    def _retry_after(self, response):
+        header = response.headers.get("Retry-After")
+        if header:
+            try:
+                return float(header)
+            except ValueError:
+                pass
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        # Telegram: {"parameters": {"retry_after": 5}}, Discord: {"retry_after": 1.5}
+        retry_after = body.get("retry_after") or body.get("parameters", {}).get("retry_after")
+        return float(retry_after) if retry_after is not None else None
+
+    def send(self, message):
+        """Sends one message, retrying on 429, 5xx and connection errors. Returns True on success."""
+        with self._send_seconds.time():
+            sent = self._send_with_retries(message)
+        (self._sent_metric if sent else self._failed_metric).inc()
+        return sent
+
+    def _send_with_retries(self, message):
+        for attempt in range(self.max_retries + 1):
+            self._wait(self.next_send_time - time.monotonic())
+            self.next_send_time = time.monotonic() + self.min_interval
+            delay = min(self.backoff_seconds * (2 ** attempt), 60) * random.uniform(0.8, 1.2)
+            try:
+                response = self.session.post(self.url, timeout=self.timeout, **self.build_payload(message))
+                if response.status_code == 429:
+                    self.stats["rate_limited"] += 1
+                    retry_after = self._retry_after(response)
+                    if retry_after is not None:
+                        delay = retry_after
+                        self.next_send_time = time.monotonic() + retry_after
+                    print(f"{self.name} rate limited; retrying in {delay:.1f}s.")
+                elif response.status_code >= 500:
+                    print(f"{self.name} returned {response.status_code}; retrying in {delay:.1f}s.")
+                else:
+                    response.raise_for_status()
+                    self.stats["sent"] += 1
+                    return True
+            except requests.exceptions.HTTPError as e:
+                print(f"Error sending {self.name} alert (not retried): {e}")
+                break
+            except requests.exceptions.RequestException as e:
+                print(f"Error sending {self.name} alert: {e}; retrying in {delay:.1f}s.")
+            if attempt == self.max_retries or self._stop_event.is_set():
+                break
+            self.stats["retries"] += 1
+            self._wait(delay)
+        self.stats["failed"] += 1
+        return False
+
+    def _run(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                self.queue.task_done()
+                break
+            try:
+                self.send(message)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"An unexpected error occurred while sending {self.name} alert: {e}")
+            self.queue.task_done()
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"alert-{self.name.lower()}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Sends what is queued and stops the thread. Once stopping, messages are tried once
+        each without waiting for rate spacing, backoff or Retry-After.
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()  # Wakes a sender sleeping in a backoff
+        self.queue.put(None)
+        self._thread.join(timeout)
+        self.session.close()
+
+    def status(self):
+        return dict(self.stats, queue_depth=self.queue.qsize())
+
+
+def _telegram_payload(message):
+    return {"data": {"chat_id": TELEGRAM_CHAT_ID, "text": message}}
+
+def _discord_payload(message):
+    return {"json": {"content": message}}
+
+def configured_alert_channels():
+    """Builds an AlertChannel for every configured outbound channel."""
+    channels = []
+    if TELEGRAM_BOT_TOKEN and TELEGRAM_BOT_TOKEN != "YOUR_TELEGRAM_BOT_TOKEN" and \
+       TELEGRAM_CHAT_ID and TELEGRAM_CHAT_ID != "YOUR_TELEGRAM_CHAT_ID":
+        channels.append(AlertChannel("Telegram", f"{TELEGRAM_API_BASE_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
+                                     _telegram_payload, 4096, TELEGRAM_RATE_PER_SECOND))
+    if DISCORD_WEBHOOK_URL and DISCORD_WEBHOOK_URL != "YOUR_DISCORD_WEBHOOK_URL":
+        channels.append(AlertChannel("Discord", DISCORD_WEBHOOK_URL, _discord_payload, 2000, DISCORD_RATE_PER_SECOND))
+    return channels
+
+
+class AlertDispatcher:
+    """
+    Background alert queue. Findings submitted within ALERT_COALESCE_SECONDS of each other
+    are grouped per (chain, block) into one digest message per group.
+    """
+
+    def __init__(self, channels=None, coalesce_seconds=None, queue_size=None, max_digest_findings=None):
+        self.channels = configured_alert_channels() if channels is None else channels
+        self.coalesce_seconds = ALERT_COALESCE_SECONDS if coalesce_seconds is None else coalesce_seconds
+        self.max_digest_findings = max_digest_findings or ALERT_DIGEST_MAX_FINDINGS
+        self.queue = queue.Queue(maxsize=queue_size or ALERT_QUEUE_SIZE)
+        self.stats = {"findings_queued": 0, "findings_dropped": 0, "findings_suppressed": 0, "digests_sent": 0}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, finding_type, details, block_number=None):
+        """Queues one finding without blocking. Returns False if it was a duplicate or the queue is full."""
+        if is_duplicate_alert(finding_type, details):
+            self.stats["findings_suppressed"] += 1
+            return False
+        self.start()
+        if block_number is None:
+            block_number = details.get("block_number")
+        try:
+            self.queue.put_nowait((details.get("chain"), block_number, finding_type, details))
+            self.stats["findings_queued"] += 1
+            return True
+        except queue.Full:
+            forget_alert(finding_type, details)  # Dropped, not alerted: a later equivalent finding may still go out
+            self.stats["findings_dropped"] += 1
+            return False
+
+    def submit_findings(self, findings, block_number=None):
+        for finding in findings:
+            self.submit(finding.get("type"), finding.get("details", {}), block_number)
+
+    def _collect_batch(self):
+        """Waits for a finding, then gathers whatever arrives within the coalescing window."""
+        item = self.queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.coalesce_seconds
+        while len(batch) < self.max_digest_findings * 4:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self.queue.put(None)  # Leave the stop marker for the outer loop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+            groups = {}
+            for chain, block_number, finding_type, details in batch:
+                groups.setdefault((chain, block_number), []).append((finding_type, details))
+            for (chain, block_number), findings in groups.items():
+                for i in range(0, len(findings), self.max_digest_findings):
+                    message = format_alert_digest(findings[i:i + self.max_digest_findings], chain, block_number)
+                    for channel in self.channels:
+                        channel.enqueue(message)
+                    self.stats["digests_sent"] += 1
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            for channel in self.channels:
+                channel.start()
+            self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=30):
+        """Flushes queued findings to the channels, then stops all threads."""
+        with self._lock:
+            if self._thread is None:
+                return
+            self.queue.put(None)
+            self._thread.join(timeout)
+            for channel in self.channels:
+                channel.stop(timeout)
+            self._thread = None
+
+    def status(self):
+        return dict(self.stats, queue_depth=self.queue.qsize(), dedup=ALERT_DEDUP_CACHE.status(),
+                    channels={channel.name: channel.status() for channel in self.channels})
+
+
+_ALERT_DISPATCHER = None
+_ALERT_DISPATCHER_LOCK = threading.Lock()
+
+@register_collector
+def _alert_dispatcher_metrics():
+    dispatcher = _ALERT_DISPATCHER  # Only reported once something has been queued; never created here
+    if dispatcher is None:
+        return
+    yield "alert_dispatcher_queue_depth", "gauge", "Findings waiting to be grouped into digests.", [({}, dispatcher.queue.qsize())]
+    yield "alert_findings_total", "counter", "Findings handed to the alert dispatcher, by outcome.", [
+        ({"result": key[len("findings_"):]}, value) for key, value in dispatcher.stats.items() if key.startswith("findings_")]
+    yield "alert_channel_queue_depth", "gauge", "Messages waiting in a channel's send queue.", [
+        ({"channel": channel.name}, channel.queue.qsize()) for channel in dispatcher.channels]
+    yield "alert_channel_events_total", "counter", "Channel retries, rate-limit responses and dropped messages.", [
+        ({"channel": channel.name, "event": event}, channel.stats[event])
+        for channel in dispatcher.channels for event in ("retries", "rate_limited", "dropped")]
+
+def get_alert_dispatcher():
+    """Returns the process-wide AlertDispatcher, creating it on first use."""
+    global _ALERT_DISPATCHER
+    with _ALERT_DISPATCHER_LOCK:
+        if _ALERT_DISPATCHER is None:
+            _ALERT_DISPATCHER = AlertDispatcher()
+        return _ALERT_DISPATCHER
+
+def queue_alert(finding_type, details):
+    """Non-blocking counterpart of dispatch_alert: hands the finding to the background dispatcher."""
+    return get_alert_dispatcher().submit(finding_type, details)
+
+def queue_block_alerts(block_number, findings):
+    """Queues all findings of a block; they are sent as one digest per channel."""
+    get_alert_dispatcher().submit_findings(findings, block_number)
+
 # Example Usage (can be called from monitoring_service.py when a finding occurs):
 # if __name__ == "__main__":
 #     # Mock finding for testing
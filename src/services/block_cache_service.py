@@ -0,0 +1,194 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import os
+import json
+import shutil
+import threading
+import zlib
+
+from src.services.metrics_service import register_collector
+
+# --- Configuration for the on-disk block cache ---
+BLOCK_CACHE_ENABLED = os.environ.get("BLOCK_CACHE_ENABLED", "1") not in ("0", "false", "no")
+BLOCK_CACHE_DIR = os.environ.get("BLOCK_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", "data", "block_cache"))
+BLOCK_CACHE_MAX_BYTES = int(os.environ.get("BLOCK_CACHE_MAX_BYTES", 2 * 1024**3))  # Evicts oldest segments beyond this
+BLOCK_CACHE_SEGMENT_SIZE = int(os.environ.get("BLOCK_CACHE_SEGMENT_SIZE", 1000))  # Blocks per segment directory
+BLOCK_CACHE_COMPRESSION_LEVEL = 6
+BLOCK_CACHE_EVICT_TARGET = 0.9  # Eviction frees space down to this fraction of the budget
+BLOCK_FILE_SUFFIX = ".json.z"
+
+
+class BlockCache:
+    """
+    Cache of finalized blocks on local disk. Each block is stored zlib-compressed in a
+    file named after its number and hash, inside one directory per range of `segment_size`
+    blocks. A file is only returned if it decompresses to a block whose "hash" field matches
+    the hash in its name, so a truncated, corrupt or misnamed file is treated as a miss; the
+    block header is not re-hashed, so the contents are trusted as written. When the cache
+    grows past `max_bytes`, whole segments are evicted, least recently written first.
+
+    Only blocks are cached. Token-transfer logs are not: a rescan of a cached range still
+    calls eth_getLogs on the provider when token transfer tracking is enabled.
+    """
+
+    def __init__(self, root=BLOCK_CACHE_DIR, max_bytes=BLOCK_CACHE_MAX_BYTES, segment_size=BLOCK_CACHE_SEGMENT_SIZE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.segment_size = max(1, int(segment_size))
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted_segments = 0
+        self._size_bytes = None  # Computed from disk on first write
+        self._lock = threading.Lock()
+
+    def _segment_dir(self, namespace, block_number):
+        return os.path.join(self.root, namespace, str(block_number // self.segment_size))
+
+    def _list_segment(self, segment_dir):
+        """Maps block number -> file name for one segment directory."""
+        try:
+            entries = os.scandir(segment_dir)
+        except FileNotFoundError:
+            return {}
+        files = {}
+        with entries:
+            for entry in entries:
+                if entry.name.endswith(BLOCK_FILE_SUFFIX):
+                    number, _, _ = entry.name.partition("-")
+                    if number.isdigit():
+                        files[int(number)] = entry.name
+        return files
+
+    def _read(self, path, block_hash):
+        try:
+            with open(path, "rb") as f:
+                block = json.loads(zlib.decompress(f.read()))
+        except (OSError, ValueError, zlib.error):
+            return None
+        if not isinstance(block, dict) or block.get("hash") != block_hash:
+            return None
+        return block
+
+    def get_many(self, namespace, block_numbers):
+        """Returns {block_number: block} for the blocks found in the cache."""
+        found = {}
+        listings = {}
+        for block_number in block_numbers:
+            segment_dir = self._segment_dir(namespace, block_number)
+            listing = listings.get(segment_dir)
+            if listing is None:
+                listing = listings[segment_dir] = self._list_segment(segment_dir)
+            name = listing.get(block_number)
+            block = None
+            if name is not None:
+                block = self._read(os.path.join(segment_dir, name), name[name.index("-") + 1:-len(BLOCK_FILE_SUFFIX)])
+            if block is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                found[block_number] = block
+        return found
+
+    def put_many(self, namespace, blocks):
+        """Stores finalized blocks (eth_getBlockByNumber results with full transactions)."""
+        written = 0
+        for block in blocks:
+            try:
+                block_number = int(block["number"], 16)
+                block_hash = block["hash"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            segment_dir = self._segment_dir(namespace, block_number)
+            os.makedirs(segment_dir, exist_ok=True)
+            path = os.path.join(segment_dir, f"{block_number}-{block_hash}{BLOCK_FILE_SUFFIX}")
+            data = zlib.compress(json.dumps(block, separators=(",", ":")).encode(), BLOCK_CACHE_COMPRESSION_LEVEL)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Could not write block {block_number} to the block cache: {e}")
+                continue
+            written += len(data)
+            self.writes += 1
+        if written:
+            self._account(written)
+
+    # --- Eviction ---
+
+    def _segments(self):
+        """Returns (mtime, path, size_bytes) for every segment directory."""
+        segments = []
+        try:
+            namespaces = [entry.path for entry in os.scandir(self.root) if entry.is_dir()]
+        except FileNotFoundError:
+            return segments
+        for namespace_dir in namespaces:
+            for segment in os.scandir(namespace_dir):
+                if not segment.is_dir():
+                    continue
+                size = 0
+                try:
+                    for entry in os.scandir(segment.path):
+                        size += entry.stat().st_size
+                    segments.append((segment.stat().st_mtime, segment.path, size))
+                except FileNotFoundError:
+                    continue  # Evicted by another process meanwhile
+        return segments
+
+    def _account(self, written):
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = sum(size for _, _, size in self._segments())
+            else:
+                self._size_bytes += written
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Re-measure from disk: other processes (e.g. range scan workers) share the cache
+        segments = sorted(self._segments())
+        total = sum(size for _, _, size in segments)
+        target = self.max_bytes * BLOCK_CACHE_EVICT_TARGET
+        for _, path, size in segments:
+            if total <= target:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            self.evicted_segments += 1
+        self._size_bytes = total
+
+    def status(self):
+        return {
+            "root": os.path.abspath(self.root),
+            "max_bytes": self.max_bytes,
+            "size_bytes": self._size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evicted_segments": self.evicted_segments,
+        }
+
+
+_BLOCK_CACHE = None
+_BLOCK_CACHE_LOCK = threading.Lock()
+
+@register_collector
+def _block_cache_metrics():
+    cache = _BLOCK_CACHE
+    if cache is None:
+        return
+    yield "block_cache_lookups_total", "counter", "Block cache lookups.", [({"result": "hit"}, cache.hits), ({"result": "miss"}, cache.misses)]
+    yield "block_cache_writes_total", "counter", "Blocks written to the block cache.", [({}, cache.writes)]
+    yield "block_cache_size_bytes", "gauge", "Size of the on-disk block cache.", [({}, cache._size_bytes)]
+
+def get_block_cache():
+    """Returns the process-wide BlockCache, or None when BLOCK_CACHE_ENABLED is off."""
+    global _BLOCK_CACHE
+    if not BLOCK_CACHE_ENABLED:
+        return None
+    with _BLOCK_CACHE_LOCK:
+        if _BLOCK_CACHE is None:
+            _BLOCK_CACHE = BlockCache()
+        return _BLOCK_CACHE
@@ -0,0 +1,346 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import os
+import threading
+import time
+from collections import deque
+
+from src.services.monitoring_service import analyze_batch, TransactionBatch
+from src.services.chain_adapter_service import get_chain_adapter
+from src.services.address_activity_service import AddressActivityAggregator
+from src.services.metrics_service import BlockLagTracker
+from src.services.transaction_graph_service import TaintMonitor
+from src.services.reorg_service import ReorgDetector, REORG_BUFFER_SIZE
+
+# --- Configuration for the block tailer ---
+# Seconds between head checks; defaults to the chain adapter's interval (a third of the block time)
+TAILER_POLL_INTERVAL = float(os.environ["TAILER_POLL_INTERVAL"]) if os.environ.get("TAILER_POLL_INTERVAL") else None
+TAILER_BATCH_SIZE = int(os.environ.get("TAILER_BATCH_SIZE", 100))  # Blocks fetched per step when backfilling a gap (split into RPC batches)
+# Optional first Ethereum block to process (other chains: <CHAIN>_START_BLOCK); defaults to the current head
+TAILER_START_BLOCK = os.environ.get("TAILER_START_BLOCK")
+RECENT_FINDINGS_LIMIT = 500
+
+
+class BlockTailer:
+    """
+    Follows the chain head block by block. The last processed block number is tracked so
+    that every block mined between two polls (or during downtime) is fetched in order and
+    fed through the detection rules. With a FindingsStore, processed blocks and findings are
+    persisted and the checkpoint is read back from the store, so restarts (and other workers
+    sharing the database) resume where processing stopped.
+
+    The hashes of recently processed blocks are kept in a ring buffer. When a new block's
+    parent hash does not match, the chain was reorganized: the tailer walks back to the
+    last block still on the canonical chain, retracts the findings of the replaced blocks
+    and processes the new ones.
+
+    Blocks are fetched through the chain's adapter (see chain_adapter_service), so the
+    same tailer follows any supported chain.
+    """
+
+    def __init__(self, chain="ethereum", rpc_url=None, start_block=None, batch_size=TAILER_BATCH_SIZE,
+                 poll_interval=TAILER_POLL_INTERVAL, on_findings=None, store=None, track_activity=True, track_taint=True,
+                 adapter=None):
+        self.adapter = adapter or get_chain_adapter(chain, rpc_url)
+        self.chain = self.adapter.chain
+        self.rpc_url = self.adapter.rpc_url
+        self.batch_size = max(1, int(batch_size))
+        self.poll_interval = poll_interval or self.adapter.poll_interval
+        self.on_findings = on_findings  # Optional callback(block_number, findings)
+        self.store = store  # Optional FindingsStore
+        # Rolling per-address statistics for drained-wallet and unusual-pattern detection
+        self.activity = AddressActivityAggregator() if track_activity else None
+        # Transaction graph following funds out of known scam addresses
+        self.taint = TaintMonitor() if track_taint else None
+
+        if start_block is None:
+            configured = TAILER_START_BLOCK if self.chain == "ethereum" else os.environ.get(f"{self.chain.upper()}_START_BLOCK")
+            if configured:
+                start_block = int(configured, 0)
+        # last_processed_block is None until the first poll anchors it to start_block or the head
+        self.last_processed_block = start_block - 1 if start_block is not None else None
+        self.head_block = None
+        self.recent_findings = deque(maxlen=RECENT_FINDINGS_LIMIT)
+        self.blocks_processed = 0
+        self.transactions_analyzed = 0
+        self.last_error = None
+        self.reorg_detector = ReorgDetector(self.adapter)  # Hashes of recently processed blocks
+        self.reorgs_detected = 0
+        self.last_reorg = None
+        self.lag = BlockLagTracker(chain, "tailer")
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # --- Block processing ---
+
+    def fetch_block(self, block_number):
+        return self.adapter.fetch_blocks([block_number])[0]
+
+    def fetch_head(self):
+        return self.adapter.fetch_head()
+
+    def analyze_block(self, transactions, block_number=None):
+        """
+        Runs the detection rules over a block's transactions, skipping duplicate hashes, and
+        (given the block number) feeds the block to the address activity aggregator and the
+        taint monitor.
+        """
+        batch = TransactionBatch(transactions)
+        findings = analyze_batch(batch, self.chain)
+        if block_number is not None:
+            if self.activity is not None:
+                findings.extend(self.activity.observe_block(block_number, batch))
+            if self.taint is not None:
+                findings.extend(self.taint.observe_block(block_number, batch))
+        return findings
+
+    def _sync_checkpoint(self):
+        """Moves the checkpoint forward to the stored one (set by a previous run or another worker)."""
+        if self.store is None:
+            return
+        stored_block = self.store.get_checkpoint(self.chain)
+        if stored_block is not None and (self.last_processed_block is None or stored_block > self.last_processed_block):
+            self.last_processed_block = stored_block
+            self.reorg_detector.reset(self.store.recent_block_hashes(self.chain, REORG_BUFFER_SIZE))
+
+    # --- Reorg handling ---
+
+    def _unwind_to_fork(self):
+        """Retracts the blocks replaced by a reorg and moves the checkpoint back to the fork block."""
+        fork_block, fork_hash = self.reorg_detector.find_fork_block()
+        replaced = self.last_processed_block - fork_block
+        self.reorg_detector.rewind(fork_block)
+        retracted = [f for f in self.recent_findings if f.get("details", {}).get("block_number", -1) > fork_block]
+        if retracted:
+            kept = [f for f in self.recent_findings if f.get("details", {}).get("block_number", -1) <= fork_block]
+            self.recent_findings.clear()
+            self.recent_findings.extend(kept)
+        if self.store is not None:
+            retracted_count = self.store.retract_blocks(self.chain, fork_block, fork_hash)
+        else:
+            retracted_count = len(retracted)
+        self._rollback_detectors(fork_block)
+        self.last_processed_block = fork_block
+        self.reorgs_detected += 1
+        self.last_reorg = {"fork_block": fork_block, "replaced_blocks": replaced,
+                           "retracted_findings": retracted_count, "detected_at": time.time()}
+        print(f"Block tailer ({self.chain}): reorg detected, {replaced} blocks after {fork_block} replaced, "
+              f"{retracted_count} findings retracted.")
+        return fork_block
+
+    def _rollback_detectors(self, last_block):
+        """Forgets whatever the stateful detectors observed after last_block."""
+        if self.activity is not None:
+            self.activity.unwind(last_block)
+        if self.taint is not None:
+            self.taint.unwind(last_block)
+
+    def _process_fetched_block(self, block_number, result):
+        """
+        Analyzes and records one block, then moves the checkpoint to it. If analysis or the
+        store write raises, the detectors are rolled back and the exception propagates with
+        the checkpoint still before the block, so it is retried.
+        """
+        transactions = result["data"]
+        try:
+            findings = self.analyze_block(transactions, block_number)
+            for finding in findings:
+                details = finding.setdefault("details", {})
+                details.setdefault("block_number", block_number)
+                details.setdefault("chain", self.chain)
+            newly_recorded = True
+            if self.store is not None:
+                # Persisted before the checkpoint moves, so a failed write retries the block
+                newly_recorded = self.store.record_block(self.chain, block_number, findings, len(transactions),
+                                                         result.get("block_hash"), result.get("parent_hash"))
+        except Exception:
+            self._rollback_detectors(block_number - 1)
+            raise
+        self.last_processed_block = block_number
+        self.reorg_detector.record(block_number, result.get("block_hash"))
+        self.blocks_processed += 1
+        self.transactions_analyzed += len(transactions)
+        self.lag.processed(block_number, result.get("timestamp"))
+        if findings:
+            self.recent_findings.extend(findings)
+            if self.on_findings and newly_recorded:  # Blocks already stored were alerted by whoever stored them
+                try:
+                    self.on_findings(block_number, findings)
+                except Exception as e:
+                    print(f"Error in findings callback for block {block_number}: {e}")
+        return len(transactions), findings
+
+    def fetch_range(self, start_block, end_block):
+        """Fetches blocks [start_block, end_block] in one batched request. Returns (block_number, result) pairs."""
+        block_numbers = list(range(start_block, end_block + 1))
+        return list(zip(block_numbers, self.adapter.fetch_blocks(block_numbers)))
+
+    def _poll_batch(self, end_block, summary):
+        """
+        Fetches and processes the next batch of blocks up to end_block (with the lock held).
+        Returns the (block_number, transaction_count, findings) of the processed blocks and
+        whether the poll has to stop (a fetch, analysis or store write failed, or a reorg
+        could not be resolved).
+        """
+        processed = []
+        batch_start = self.last_processed_block + 1
+        batch_end = min(batch_start + self.batch_size - 1, end_block)
+        for block_number, result in self.fetch_range(batch_start, batch_end):
+            if result["status"] != "success":
+                # Stop at the first failing block so nothing after it is skipped
+                self.last_error = result["message"]
+                summary.update({"status": "error" if summary["blocks_processed"] == 0 else "partial",
+                                "message": result["message"], "source": result.get("source")})
+                return processed, True
+            if self.reorg_detector.is_reorg(block_number, result):
+                # Re-fetch from the fork; the replaced blocks are processed again on the next pass
+                try:
+                    fork_block = self._unwind_to_fork()
+                except RuntimeError as e:
+                    self.last_error = str(e)
+                    summary.update({"status": "error" if summary["blocks_processed"] == 0 else "partial",
+                                    "message": str(e)})
+                    return processed, True
+                summary["reorgs"] += 1
+                summary["from_block"] = min(summary["from_block"], fork_block + 1)
+                summary["to_block"] = min(summary["to_block"], fork_block)
+                break
+            try:
+                tx_count, findings = self._process_fetched_block(block_number, result)
+            except Exception as e:
+                # Not recorded; the next poll retries the block
+                self.last_error = f"Processing block {block_number} failed: {e}"
+                print(f"Block tailer ({self.chain}): {self.last_error}")
+                summary.update({"status": "error" if summary["blocks_processed"] == 0 else "partial",
+                                "message": self.last_error})
+                return processed, True
+            summary["blocks_processed"] += 1
+            summary["transactions_analyzed"] += tx_count
+            summary["findings_count"] += len(findings)
+            summary["to_block"] = block_number
+            processed.append((block_number, tx_count, findings))
+        return processed, False
+
+    def iter_poll(self, summary, max_blocks=None):
+        """
+        Processes every block between the last processed block and the current head,
+        in order, fetching the gap in batches of `batch_size` blocks, and yields
+        (block_number, transaction_count, findings) as each block is analyzed.
+        `summary` (a dict) is filled with the poll status and totals as blocks complete.
+        `max_blocks` bounds the work done by a single call (None = catch up fully).
+
+        The lock is held while a batch is processed but released before its blocks are
+        yielded, so a slow consumer (e.g. a streaming HTTP client) never blocks other polls.
+        """
+        with self._lock:
+            head = self.fetch_head()
+            if head["status"] != "success":
+                self.last_error = head["message"]
+                summary.update({"status": "error", "message": head["message"], "source": head.get("source")})
+                return
+            head_block = head["block_number"]
+            self.head_block = head_block
+            self.lag.head(head_block)
+
+            self._sync_checkpoint()
+            if self.last_processed_block is None:
+                self.last_processed_block = head_block - 1
+
+            start_block = self.last_processed_block + 1
+            end_block = head_block
+            if max_blocks is not None:
+                end_block = min(end_block, start_block + max_blocks - 1)
+
+            summary.update({
+                "status": "success",
+                "from_block": start_block,
+                "to_block": self.last_processed_block,
+                "head_block": head_block,
+                "blocks_processed": 0,
+                "transactions_analyzed": 0,
+                "findings_count": 0,
+                "reorgs": 0,
+                "source": head.get("source"),
+            })
+
+        while True:
+            with self._lock:
+                if self.last_processed_block >= end_block:
+                    self.last_error = None
+                    return
+                processed, stop = self._poll_batch(end_block, summary)
+            yield from processed
+            if stop:
+                return
+
+    def poll_once(self, max_blocks=None):
+        """Runs iter_poll to completion and returns its summary with all findings collected."""
+        summary = {}
+        findings = []
+        for _, _, block_findings in self.iter_poll(summary, max_blocks):
+            findings.extend(block_findings)
+        summary["findings"] = findings
+        return summary
+
+    # --- Background loop ---
+
+    def _run(self):
+        print(f"Block tailer for {self.chain} started.")
+        while not self._stop_event.is_set():
+            try:
+                summary = self.poll_once(max_blocks=self.batch_size)
+                if summary["status"] != "success":
+                    print(f"Block tailer ({self.chain}) error: {summary.get('message')}")
+                elif summary["blocks_processed"] and summary["findings"]:
+                    print(f"Block tailer ({self.chain}): {len(summary['findings'])} findings in blocks "
+                          f"{summary['from_block']}-{summary['to_block']}")
+                # Keep going without sleeping while behind the head so downtime is caught up quickly
+                caught_up = summary["status"] != "success" or self.last_processed_block >= (self.head_block or 0)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Unexpected error in block tailer ({self.chain}): {e}")
+                caught_up = True
+            if caught_up:
+                self._stop_event.wait(self.poll_interval)
+        print(f"Block tailer for {self.chain} stopped.")
+
+    def start(self):
+        if self.is_running():
+            return False
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"block-tailer-{self.chain}", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=None):
+        if not self.is_running():
+            return False
+        self._stop_event.set()
+        self._thread.join(timeout)
+        return True
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self):
+        lag = None
+        if self.head_block is not None and self.last_processed_block is not None:
+            lag = max(0, self.head_block - self.last_processed_block)
+        return {
+            "chain": self.chain,
+            "running": self.is_running(),
+            "last_processed_block": self.last_processed_block,
+            "head_block": self.head_block,
+            "lag_blocks": lag,
+            "blocks_processed": self.blocks_processed,
+            "transactions_analyzed": self.transactions_analyzed,
+            "recent_findings_count": len(self.recent_findings),
+            "reorgs_detected": self.reorgs_detected,
+            "last_reorg": self.last_reorg,
+            "address_activity": self.activity.status() if self.activity is not None else None,
+            "taint": self.taint.status() if self.taint is not None else None,
+            "adapter": self.adapter.status(),
+            "last_error": self.last_error,
+            "checked_at": time.time(),
+        }
@@ -0,0 +1,243 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+# --- Chain adapters ---
+# An adapter hides how one chain's blocks are fetched and turns its transactions into the
+# compact records the rule engine, block tailer and ingestion pipeline work on:
+#   {"hash", "from", "to", "value"}  value: hex quantity in the chain's smallest unit
+# plus "logs" (EVM, watched token transfers) or "inputs"/"outputs" (Bitcoin addresses).
+# Each chain has its own endpoint, block time (which sets its poll interval), RPC rate
+# budget and fetch batch size, all overridable per chain, e.g. BSC_RPC_URL,
+# BSC_RATE_PER_SECOND, BSC_BLOCK_TIME, BSC_POLL_INTERVAL, BSC_FETCH_BATCH_SIZE.
+import os
+import threading
+
+from src.services.metrics_service import register_collector
+from src.services.monitoring_service import (
+    EVM_CHAINS,
+    NATIVE_CURRENCIES,
+    get_ethereum_rpc_url,
+    get_rpc_client,
+    fetch_ethereum_block_number,
+    fetch_ethereum_blocks_transactions,
+    fetch_ethereum_block_hashes,
+)
+from src.services.token_transfer_service import token_transfers_enabled
+
+# Chains monitored together by the ingestion worker (comma-separated)
+MONITORED_CHAINS = [chain.strip() for chain in os.environ.get("MONITORED_CHAINS", "ethereum").split(",") if chain.strip()]
+# Defaults per chain: average block time (seconds), RPC calls per second, blocks per fetch step.
+# BSC's 3s and Polygon's 2s blocks need several calls per second each just to keep up.
+CHAIN_DEFAULTS = {
+    "ethereum": {"block_time": 12, "rate_per_second": 25, "fetch_batch_size": 100},
+    "bsc": {"block_time": 3, "rate_per_second": 25, "fetch_batch_size": 100},
+    "polygon": {"block_time": 2, "rate_per_second": 25, "fetch_batch_size": 100},
+    "bitcoin": {"block_time": 600, "rate_per_second": 10, "fetch_batch_size": 10},
+}
+MAX_POLL_INTERVAL_SECONDS = 30  # Slow chains are still checked this often (Bitcoin blocks come irregularly)
+SATOSHIS_PER_BTC = 10**8
+
+
+def _chain_setting(chain, name, default, cast=float):
+    value = os.environ.get(f"{chain.upper()}_{name}")
+    return cast(value) if value else default
+
+
+class ChainAdapter:
+    """
+    Fetches blocks of one chain. Results use the monitoring result format
+    ({"status", "data", "block_number", "block_hash", "parent_hash", "timestamp", "source"})
+    with compact transaction records as "data".
+    """
+
+    def __init__(self, chain, rpc_url=None, block_time=None, rate_per_second=None, poll_interval=None,
+                 fetch_batch_size=None):
+        defaults = CHAIN_DEFAULTS.get(chain, CHAIN_DEFAULTS["ethereum"])
+        self.chain = chain
+        self.rpc_url = rpc_url or os.environ.get(f"{chain.upper()}_RPC_URL")
+        self.block_time = block_time or _chain_setting(chain, "BLOCK_TIME", defaults["block_time"])
+        self.rate_per_second = rate_per_second or _chain_setting(chain, "RATE_PER_SECOND", defaults["rate_per_second"])
+        # About three head checks per block, so a new block is picked up within a third of the block time
+        self.poll_interval = poll_interval or _chain_setting(
+            chain, "POLL_INTERVAL", min(max(self.block_time / 3, 0.5), MAX_POLL_INTERVAL_SECONDS))
+        self.fetch_batch_size = fetch_batch_size or _chain_setting(chain, "FETCH_BATCH_SIZE", defaults["fetch_batch_size"], int)
+        self.currency = NATIVE_CURRENCIES.get(chain, ("", 0))[0]
+        # Address activity and taint thresholds are in ETH, so those detectors only run on Ethereum
+        self.track_state = chain == "ethereum"
+
+    def client(self):
+        """The endpoint's shared RpcClient, with this chain's rate budget (None if not configured)."""
+        return get_rpc_client(self.rpc_url, self.rate_per_second) if self.rpc_url else None
+
+    def is_configured(self):
+        return bool(self.rpc_url)
+
+    def _not_configured(self):
+        return {"status": "error", "message": f"No RPC endpoint configured for {self.chain} (set {self.chain.upper()}_RPC_URL).",
+                "source": "Configuration Error"}
+
+    def fetch_head(self):
+        """Returns {"status": "success", "block_number": int, "source"} for the chain head."""
+        raise NotImplementedError
+
+    def fetch_blocks(self, block_numbers):
+        """Fetches the blocks (ints) in one batched round trip; one result per block, in order."""
+        raise NotImplementedError
+
+    def fetch_block_hashes(self, block_numbers):
+        """Canonical hash of each block (None where unavailable), in order."""
+        raise NotImplementedError
+
+    def status(self):
+        client = self.client()
+        limiter = client.rate_limiter if client is not None else None
+        return {
+            "chain": self.chain,
+            "configured": self.is_configured(),
+            "block_time_seconds": self.block_time,
+            "poll_interval_seconds": self.poll_interval,
+            "rate_per_second": self.rate_per_second,
+            "fetch_batch_size": self.fetch_batch_size,
+            "throttled_seconds": round(limiter.throttled_seconds, 3) if limiter is not None else 0.0,
+        }
+
+
+def compact_evm_transaction(tx):
+    """Keeps the fields the detectors read; full transactions also carry input data, signatures and gas fields."""
+    record = {"hash": tx.get("hash"), "from": tx.get("from"), "to": tx.get("to"), "value": tx.get("value")}
+    if "logs" in tx:
+        record["logs"] = tx["logs"]
+    return record
+
+
+class EvmChainAdapter(ChainAdapter):
+    """Ethereum-compatible chains over JSON-RPC, sharing the batched block fetching and block cache of RpcClient."""
+
+    def __init__(self, chain, rpc_url=None, token_transfers=False, **settings):
+        if chain == "ethereum":
+            rpc_url = rpc_url or get_ethereum_rpc_url()
+        super().__init__(chain, rpc_url, **settings)
+        self.token_transfers = token_transfers  # Watched tokens are Ethereum mainnet contracts
+
+    def fetch_head(self):
+        if self.client() is None:
+            return self._not_configured()
+        return fetch_ethereum_block_number(self.rpc_url)
+
+    def fetch_blocks(self, block_numbers):
+        if self.client() is None:
+            return [self._not_configured() for _ in block_numbers]
+        results = fetch_ethereum_blocks_transactions(block_numbers, self.rpc_url, token_transfers=self.token_transfers)
+        for result in results:
+            if result["status"] == "success":
+                result["data"] = [compact_evm_transaction(tx) for tx in result["data"]]
+        return results
+
+    def fetch_block_hashes(self, block_numbers):
+        if self.client() is None:
+            return [None for _ in block_numbers]
+        return fetch_ethereum_block_hashes(block_numbers, self.rpc_url)
+
+
+def compact_bitcoin_transaction(tx):
+    """
+    Compact record of a Bitcoin transaction from getblock verbosity 3 (which includes the
+    spent outputs). "from" is the first input's address, "to" the largest output's and
+    "value" the total output in satoshis; every address is listed in "inputs"/"outputs".
+    """
+    inputs = []
+    for vin in tx.get("vin") or ():
+        address = ((vin.get("prevout") or {}).get("scriptPubKey") or {}).get("address")
+        if address:
+            inputs.append(address)
+    outputs = []
+    total = 0
+    largest = (-1, "")
+    for vout in tx.get("vout") or ():
+        value = round((vout.get("value") or 0) * SATOSHIS_PER_BTC)
+        total += value
+        address = (vout.get("scriptPubKey") or {}).get("address")
+        if address:  # OP_RETURN and bare scripts have none
+            outputs.append(address)
+            largest = max(largest, (value, address))
+    return {"hash": tx.get("txid"), "from": inputs[0] if inputs else "", "to": largest[1], "value": hex(total),
+            "inputs": inputs, "outputs": outputs}
+
+
+class BitcoinAdapter(ChainAdapter):
+    """Bitcoin Core JSON-RPC (getblockcount, getblockhash, getblock). Credentials go in the URL."""
+
+    def __init__(self, rpc_url=None, **settings):
+        super().__init__("bitcoin", rpc_url, **settings)
+
+    def fetch_head(self):
+        client = self.client()
+        if client is None:
+            return self._not_configured()
+        result = client.call("getblockcount", [])
+        if result["status"] != "success":
+            return result
+        return {"status": "success", "block_number": int(result["data"]), "source": result["source"]}
+
+    def fetch_block_hashes(self, block_numbers):
+        client = self.client()
+        if client is None:
+            return [None for _ in block_numbers]
+        return [result["data"] if result["status"] == "success" else None
+                for result in client.batch_call([("getblockhash", [n]) for n in block_numbers])]
+
+    def fetch_blocks(self, block_numbers):
+        client = self.client()
+        if client is None:
+            return [self._not_configured() for _ in block_numbers]
+        hashes = client.batch_call([("getblockhash", [n]) for n in block_numbers])
+        wanted = [result["data"] for result in hashes if result["status"] == "success"]
+        blocks = iter(client.batch_call([("getblock", [block_hash, 3]) for block_hash in wanted]))
+        results = []
+        for hash_result in hashes:
+            if hash_result["status"] != "success":
+                results.append(hash_result)
+                continue
+            result = next(blocks)
+            block = result.get("data")
+            if result["status"] != "success":
+                results.append(result)
+            elif not block or "tx" not in block:
+                results.append({"status": "error", "message": "Unexpected getblock response.", "source": result["source"]})
+            else:
+                results.append({
+                    "status": "success",
+                    "data": [compact_bitcoin_transaction(tx) for tx in block["tx"]],
+                    "block_number": block.get("height"),
+                    "block_hash": block.get("hash"),
+                    "parent_hash": block.get("previousblockhash"),
+                    "timestamp": block.get("time"),
+                    "source": result["source"],
+                })
+        return results
+
+
+def create_chain_adapter(chain, rpc_url=None, **settings):
+    """Builds the adapter for a chain name; raises ValueError for unsupported chains."""
+    if chain in EVM_CHAINS:
+        return EvmChainAdapter(chain, rpc_url, token_transfers=token_transfers_enabled(chain), **settings)
+    if chain == "bitcoin":
+        return BitcoinAdapter(rpc_url, **settings)
+    raise ValueError(f"Unsupported chain: {chain}. Supported chains: {', '.join(CHAIN_DEFAULTS)}.")
+
+
+# One adapter per (chain, endpoint), shared by the tailers and the pipeline
+_CHAIN_ADAPTERS = {}
+_CHAIN_ADAPTERS_LOCK = threading.Lock()
+
+def get_chain_adapter(chain, rpc_url=None):
+    """Returns the shared adapter for chain (and rpc_url, default: the chain's configured endpoint)."""
+    with _CHAIN_ADAPTERS_LOCK:
+        adapter = _CHAIN_ADAPTERS.get((chain, rpc_url))
+        if adapter is None:
+            adapter = _CHAIN_ADAPTERS[(chain, rpc_url)] = create_chain_adapter(chain, rpc_url)
+        return adapter
+
+@register_collector
+def _chain_adapter_metrics():
+    adapters = list(_CHAIN_ADAPTERS.values())
+    yield "rpc_throttled_seconds_total", "counter", "Time RPC calls waited for a chain's rate budget.", [
+        ({"chain": adapter.chain}, adapter.status()["throttled_seconds"]) for adapter in adapters if adapter.is_configured()]
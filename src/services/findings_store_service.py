@@ -0,0 +1,249 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import os
+import json
+import sqlite3
+import threading
+import time
+
+from src.services.risk_assessment_service import RISK_SCORER
+
+# Embedded SQLite store (WAL mode) shared by the API, the tailer and the ingestion worker
+FINDINGS_DB_PATH = os.environ.get("FINDINGS_DB_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "findings.db"))
+FINDINGS_QUERY_MAX_LIMIT = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    chain TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL,
+    block_hash TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS processed_blocks (
+    chain TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT,
+    parent_hash TEXT,
+    tx_count INTEGER NOT NULL,
+    findings_count INTEGER NOT NULL,
+    processed_at REAL NOT NULL,
+    rescan INTEGER NOT NULL DEFAULT 0,  -- 1 while only a historical rescan has recorded the block
+    PRIMARY KEY (chain, block_number)
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    chain TEXT NOT NULL,
+    block_number INTEGER,
+    tx_hash TEXT,
+    finding_type TEXT NOT NULL,
+    risk_score REAL NOT NULL,
+    message TEXT,
+    details TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS finding_addresses (
+    address TEXT NOT NULL,
+    finding_id INTEGER NOT NULL REFERENCES findings(id) ON DELETE CASCADE,
+    PRIMARY KEY (address, finding_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_findings_block ON findings (chain, block_number);
+CREATE INDEX IF NOT EXISTS idx_findings_tx_hash ON findings (tx_hash);
+CREATE INDEX IF NOT EXISTS idx_findings_type ON findings (finding_type, id);
+CREATE INDEX IF NOT EXISTS idx_finding_addresses_finding ON finding_addresses (finding_id);
+"""
+
+def _finding_addresses(details):
+    return {address.lower() for address in (details.get("address"), details.get("interacting_address"),
+                                            details.get("from"), details.get("to")) if address}
+
+
+class FindingsStore:
+    """
+    Persistent store for processed blocks, findings and their risk scores, plus a per-chain
+    checkpoint so monitors resume where they (or another worker) left off. Each thread gets
+    its own connection; WAL mode lets API workers read while a monitor writes.
+    """
+
+    def __init__(self, path=FINDINGS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(processed_blocks)")}
+            if "rescan" not in columns:  # Stores created before rescans were tracked
+                conn.execute("ALTER TABLE processed_blocks ADD COLUMN rescan INTEGER NOT NULL DEFAULT 0")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # --- Writes ---
+
+    def record_block(self, chain, block_number, findings, tx_count=0, block_hash=None, parent_hash=None,
+                     advance_checkpoint=True, replace=False, keep_types=()):
+        """
+        Stores a processed block with all its findings in one transaction and advances the
+        chain checkpoint. Returns False (and stores nothing but the checkpoint) if the block was
+        already recorded, e.g. by another worker or before a restart. With replace=True
+        (historical rescans) a recorded block's findings are replaced instead, except those of
+        keep_types; advance_checkpoint=False leaves the live checkpoint alone.
+
+        A block recorded only by a rescan is marked as such, and a live recording (without
+        replace) takes it over: the live findings, which include the stateful detectors',
+        replace the rescan's and the block counts as newly recorded.
+        """
+        now = time.time()
+        conn = self._connection()
+        kept = 0
+        with conn:
+            if replace:
+                kept_filter = f" AND finding_type NOT IN ({', '.join('?' * len(keep_types))})" if keep_types else ""
+                conn.execute(f"DELETE FROM findings WHERE chain = ? AND block_number = ?{kept_filter}",
+                             (chain, block_number, *keep_types))
+                if keep_types:
+                    kept = conn.execute("SELECT COUNT(*) FROM findings WHERE chain = ? AND block_number = ?",
+                                        (chain, block_number)).fetchone()[0]
+                upsert = ("ON CONFLICT(chain, block_number) DO UPDATE SET block_hash = excluded.block_hash, "
+                          "parent_hash = excluded.parent_hash, tx_count = excluded.tx_count, "
+                          "findings_count = excluded.findings_count, processed_at = excluded.processed_at")
+            else:
+                conn.execute("DELETE FROM findings WHERE chain = ? AND block_number = ? AND EXISTS (SELECT 1 FROM "
+                             "processed_blocks WHERE chain = ? AND block_number = ? AND rescan = 1)",
+                             (chain, block_number, chain, block_number))
+                upsert = ("ON CONFLICT(chain, block_number) DO UPDATE SET block_hash = excluded.block_hash, "
+                          "parent_hash = excluded.parent_hash, tx_count = excluded.tx_count, "
+                          "findings_count = excluded.findings_count, processed_at = excluded.processed_at, "
+                          "rescan = 0 WHERE processed_blocks.rescan = 1")
+            cursor = conn.execute(
+                "INSERT INTO processed_blocks "
+                "(chain, block_number, block_hash, parent_hash, tx_count, findings_count, processed_at, rescan) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?, ?) {upsert}",
+                (chain, block_number, block_hash, parent_hash, tx_count, len(findings) + kept, now, int(replace)))
+            newly_recorded = cursor.rowcount > 0
+            if newly_recorded:
+                self._insert_findings(conn, chain, block_number, findings, now)
+            if advance_checkpoint:
+                conn.execute(
+                    "INSERT INTO checkpoints (chain, last_block, block_hash, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(chain) DO UPDATE SET last_block = excluded.last_block, block_hash = excluded.block_hash, "
+                    "updated_at = excluded.updated_at WHERE excluded.last_block >= checkpoints.last_block",
+                    (chain, block_number, block_hash, now))
+        return newly_recorded
+
+    def retract_blocks(self, chain, fork_block, fork_block_hash=None):
+        """
+        Removes every block after fork_block (replaced by a chain reorganization) together with
+        its findings, and moves the checkpoint back to fork_block. Returns the number of
+        findings removed.
+        """
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM findings WHERE chain = ? AND block_number > ?", (chain, fork_block))
+            removed = cursor.rowcount
+            conn.execute("DELETE FROM processed_blocks WHERE chain = ? AND block_number > ?", (chain, fork_block))
+            conn.execute("UPDATE checkpoints SET last_block = ?, block_hash = ?, updated_at = ? WHERE chain = ? AND last_block > ?",
+                         (fork_block, fork_block_hash, time.time(), chain, fork_block))
+        return removed
+
+    def _insert_findings(self, conn, chain, block_number, findings, now):
+        for finding in findings:
+            details = finding.get("details", {})
+            cursor = conn.execute(
+                "INSERT INTO findings (chain, block_number, tx_hash, finding_type, risk_score, message, details, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chain, block_number, details.get("hash") or details.get("transaction_hash"), finding.get("type"),
+                 RISK_SCORER.finding_score(finding), finding.get("message"), json.dumps(details, default=str), now))
+            finding_id = cursor.lastrowid
+            conn.executemany("INSERT OR IGNORE INTO finding_addresses (address, finding_id) VALUES (?, ?)",
+                             [(address, finding_id) for address in _finding_addresses(details)])
+
+    # --- Reads ---
+
+    def get_checkpoint(self, chain):
+        """Last block recorded for the chain, or None."""
+        row = self._connection().execute("SELECT last_block FROM checkpoints WHERE chain = ?", (chain,)).fetchone()
+        return row["last_block"] if row else None
+
+    def list_checkpoints(self):
+        rows = self._connection().execute("SELECT chain, last_block, block_hash, updated_at FROM checkpoints ORDER BY chain")
+        return [dict(row) for row in rows]
+
+    def recent_block_hashes(self, chain, limit):
+        """
+        Returns (block_number, block_hash) for the last `limit` blocks processed by a live
+        monitor, oldest first. Rescanned blocks are left out: they may lie past the checkpoint.
+        """
+        rows = self._connection().execute(
+            "SELECT block_number, block_hash FROM processed_blocks WHERE chain = ? AND rescan = 0 "
+            "ORDER BY block_number DESC LIMIT ?",
+            (chain, limit)).fetchall()
+        return [(row["block_number"], row["block_hash"]) for row in reversed(rows)]
+
+    def get_block(self, chain, block_number):
+        row = self._connection().execute(
+            "SELECT * FROM processed_blocks WHERE chain = ? AND block_number = ?", (chain, block_number)).fetchone()
+        return dict(row) if row else None
+
+    def query_findings(self, chain=None, address=None, tx_hash=None, block_number=None, from_block=None,
+                       to_block=None, finding_type=None, before_id=None, limit=100):
+        """
+        Returns findings matching every given filter, newest first. Page with before_id
+        (the smallest id of the previous page).
+        """
+        clauses, params = [], []
+        table = "findings f"
+        if address:
+            table = "finding_addresses a JOIN findings f ON f.id = a.finding_id"
+            clauses.append("a.address = ?")
+            params.append(address.lower())
+        for column, value in (("f.chain", chain), ("f.tx_hash", tx_hash), ("f.block_number", block_number),
+                              ("f.finding_type", finding_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if from_block is not None:
+            clauses.append("f.block_number >= ?")
+            params.append(from_block)
+        if to_block is not None:
+            clauses.append("f.block_number <= ?")
+            params.append(to_block)
+        if before_id is not None:
+            clauses.append("f.id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(max(1, min(int(limit), FINDINGS_QUERY_MAX_LIMIT)))
+        rows = self._connection().execute(
+            f"SELECT f.* FROM {table} {where} ORDER BY f.id DESC LIMIT ?", params).fetchall()
+        return [self._row_to_finding(row) for row in rows]
+
+    def _row_to_finding(self, row):
+        return {
+            "id": row["id"],
+            "type": row["finding_type"],
+            "message": row["message"],
+            "chain": row["chain"],
+            "block_number": row["block_number"],
+            "risk_score": row["risk_score"],
+            "details": json.loads(row["details"]),
+            "created_at": row["created_at"],
+        }
+
+
+_FINDINGS_STORE = None
+_FINDINGS_STORE_LOCK = threading.Lock()
+
+def get_findings_store():
+    """Returns the process-wide FindingsStore, opening it on first use."""
+    global _FINDINGS_STORE
+    with _FINDINGS_STORE_LOCK:
+        if _FINDINGS_STORE is None:
+            _FINDINGS_STORE = FindingsStore()
+        return _FINDINGS_STORE
@@ -0,0 +1,354 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.monitoring_service import analyze_batch, TransactionBatch
+from src.services.chain_adapter_service import ChainAdapter, get_chain_adapter
+from src.services.alert_service import queue_alert
+from src.services.address_activity_service import AddressActivityAggregator
+from src.services.metrics_service import BlockLagTracker
+from src.services.transaction_graph_service import TaintMonitor
+from src.services.reorg_service import ReorgDetector, REORG_BUFFER_SIZE
+
+# --- Configuration for the ingestion pipeline ---
+PIPELINE_BLOCK_QUEUE_SIZE = int(os.environ.get("PIPELINE_BLOCK_QUEUE_SIZE", 200))  # Fetched blocks (of all chains) waiting for analysis
+PIPELINE_ALERT_QUEUE_SIZE = int(os.environ.get("PIPELINE_ALERT_QUEUE_SIZE", 1000))  # Findings waiting to be alerted
+# Blocks requested per fetch step and seconds between head checks when caught up. Unset, each
+# chain uses its adapter's settings (e.g. BSC_FETCH_BATCH_SIZE, BSC_POLL_INTERVAL).
+PIPELINE_FETCH_BATCH_SIZE = int(os.environ["PIPELINE_FETCH_BATCH_SIZE"]) if os.environ.get("PIPELINE_FETCH_BATCH_SIZE") else None
+PIPELINE_POLL_INTERVAL = float(os.environ["PIPELINE_POLL_INTERVAL"]) if os.environ.get("PIPELINE_POLL_INTERVAL") else None
+PIPELINE_ALERT_WORKERS = int(os.environ.get("PIPELINE_ALERT_WORKERS", 2))  # Concurrent alert senders
+# Written periodically by the standalone worker (src/worker.py), read by the API
+PIPELINE_STATS_FILE = os.environ.get("PIPELINE_STATS_FILE", os.path.join(os.path.dirname(__file__), "..", "data", "pipeline_stats.json"))
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage."""
+
+    def __init__(self, name, queue=None):
+        self.name = name
+        self.queue = queue  # Input queue of the stage, if any
+        self.items_processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.time()
+
+    def record(self, items, busy_seconds):
+        self.items_processed += items
+        self.busy_seconds += busy_seconds
+
+    def snapshot(self):
+        uptime = max(time.time() - self.started_at, 1e-9)
+        snapshot = {
+            "items_processed": self.items_processed,
+            "errors": self.errors,
+            "throughput_per_second": round(self.items_processed / uptime, 3),
+            # Fraction of wall time the stage spent working; close to 1.0 means it is the bottleneck
+            "utilization": round(min(self.busy_seconds / uptime, 1.0), 3),
+        }
+        if self.queue is not None:
+            snapshot["queue_depth"] = self.queue.qsize()
+            snapshot["queue_capacity"] = self.queue.maxsize
+        return snapshot
+
+
+class ChainFeed:
+    """One chain followed by the pipeline: its adapter, fetch progress, lag and stateful detectors."""
+
+    def __init__(self, adapter, start_block=None, fetch_batch_size=None, poll_interval=None):
+        self.adapter = adapter
+        self.chain = adapter.chain
+        self.fetch_batch_size = max(1, int(fetch_batch_size or adapter.fetch_batch_size))
+        self.poll_interval = poll_interval or adapter.poll_interval
+        # Stateful detectors; a chain's blocks reach the analyze stage in order
+        self.activity = AddressActivityAggregator() if adapter.track_state else None
+        self.taint = TaintMonitor() if adapter.track_state else None
+        self.reorg_detector = ReorgDetector(adapter)  # Hashes of recently fetched blocks
+        self.reorgs_detected = 0
+        self.last_reorg = None
+
+        self.last_fetched_block = start_block - 1 if start_block is not None else None
+        self.last_analyzed_block = None
+        # First block that could not be analyzed or stored. While set, the stored checkpoint is
+        # not advanced past it, so a restart resumes from that block instead of skipping it.
+        self.first_failed_block = None
+        self.failed_blocks = 0
+        self.head_block = None
+        self.lag = BlockLagTracker(self.chain, "pipeline")
+        self.fetch_stats = StageStats("fetch")
+
+    def stats(self):
+        lag = None
+        if self.head_block is not None and self.last_analyzed_block is not None:
+            lag = max(0, self.head_block - self.last_analyzed_block)
+        return {
+            "head_block": self.head_block,
+            "last_fetched_block": self.last_fetched_block,
+            "last_analyzed_block": self.last_analyzed_block,
+            "lag_blocks": lag,
+            "first_failed_block": self.first_failed_block,
+            "failed_blocks": self.failed_blocks,
+            "reorgs_detected": self.reorgs_detected,
+            "last_reorg": self.last_reorg,
+            "fetch": self.fetch_stats.snapshot(),
+            "adapter": self.adapter.status(),
+            "address_activity": self.activity.status() if self.activity is not None else None,
+            "taint": self.taint.status() if self.taint is not None else None,
+        }
+
+
+class IngestionPipeline:
+    """
+    fetch -> analyze -> alert pipeline. Stages run as asyncio tasks connected by bounded
+    queues, so a slow RPC provider or a slow alert channel applies backpressure upstream
+    instead of blocking the whole monitor. Blocking I/O (RPC, webhooks) runs in threads.
+
+    Several chains are monitored at once: each gets its own fetch task, paced by its block
+    time and rate budget and resuming from its own checkpoint, and all of them feed the
+    same analyze and alert stages.
+    """
+
+    def __init__(self, chains="ethereum", start_blocks=None,
+                 block_queue_size=PIPELINE_BLOCK_QUEUE_SIZE, alert_queue_size=PIPELINE_ALERT_QUEUE_SIZE,
+                 fetch_batch_size=PIPELINE_FETCH_BATCH_SIZE, poll_interval=PIPELINE_POLL_INTERVAL,
+                 alert_workers=PIPELINE_ALERT_WORKERS, alert_handler=queue_alert, store=None):
+        # chains: a chain name or a list of chain names and/or ChainAdapters
+        if isinstance(chains, (str, ChainAdapter)):
+            chains = [chains]
+        start_blocks = start_blocks or {}  # {chain: first block}; others resume from the store's checkpoint or the head
+        self.feeds = []
+        for chain in chains:
+            adapter = chain if isinstance(chain, ChainAdapter) else get_chain_adapter(chain)
+            self.feeds.append(ChainFeed(adapter, start_blocks.get(adapter.chain), fetch_batch_size, poll_interval))
+        if len({feed.chain for feed in self.feeds}) != len(self.feeds):
+            raise ValueError("Each chain can only be monitored once per pipeline.")
+        self.alert_workers = max(1, int(alert_workers))
+        self.alert_handler = alert_handler  # Called as alert_handler(finding_type, details)
+        self.block_queue_size = block_queue_size
+        self.alert_queue_size = alert_queue_size
+        self.store = store  # Optional FindingsStore; its checkpoints are used for chains without a start block
+
+        self.block_queue = None
+        self.alert_queue = None
+        self.analyze_stats = None
+        self.alert_stats = None
+        self._stopping = None
+        self._executor = None
+
+    def _in_thread(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(func, *args))
+
+    # --- Stages ---
+
+    async def _fetch_stage(self, feed):
+        while not self._stopping.is_set():
+            started = time.perf_counter()
+            head = await self._in_thread(feed.adapter.fetch_head)
+            if head["status"] != "success":
+                feed.fetch_stats.errors += 1
+                print(f"Pipeline fetch error ({feed.chain}): {head['message']}")
+                await self._sleep(feed.poll_interval)
+                continue
+            feed.head_block = head["block_number"]
+            feed.lag.head(feed.head_block)
+            if feed.last_fetched_block is None:
+                feed.last_fetched_block = feed.head_block - 1
+
+            start_block = feed.last_fetched_block + 1
+            end_block = min(feed.head_block, start_block + feed.fetch_batch_size - 1)
+            if start_block > end_block:
+                feed.fetch_stats.record(0, time.perf_counter() - started)
+                await self._sleep(feed.poll_interval)
+                continue
+
+            block_numbers = list(range(start_block, end_block + 1))
+            results = await self._in_thread(feed.adapter.fetch_blocks, block_numbers)
+            fetched = 0
+            fork = None
+            for block_number, result in zip(block_numbers, results):
+                if result["status"] != "success":
+                    # Retry from the failed block on the next round so no block is skipped
+                    feed.fetch_stats.errors += 1
+                    print(f"Pipeline fetch error ({feed.chain}) at block {block_number}: {result['message']}")
+                    break
+                if feed.reorg_detector.is_reorg(block_number, result):
+                    try:
+                        fork = await self._in_thread(feed.reorg_detector.find_fork_block)
+                    except Exception as e:
+                        feed.fetch_stats.errors += 1
+                        print(f"Pipeline reorg error ({feed.chain}) at block {block_number}: {e}")
+                    break
+                fetched += 1
+                feed.last_fetched_block = block_number
+                feed.reorg_detector.record(block_number, result.get("block_hash"))
+            feed.fetch_stats.record(fetched, time.perf_counter() - started)
+
+            for block_number, result in zip(block_numbers[:fetched], results):
+                await self.block_queue.put((feed, block_number, result))  # Blocks here when analysis falls behind
+            if fork is not None:
+                # Queued behind the blocks above, so the analyze stage unwinds after it has seen them
+                fork_block, fork_hash = fork
+                feed.reorg_detector.rewind(fork_block)
+                feed.last_fetched_block = fork_block
+                await self.block_queue.put((feed, fork_block, {"status": "reorg", "block_hash": fork_hash}))
+            elif fetched < len(block_numbers):
+                await self._sleep(feed.poll_interval)
+
+    async def _analyze_stage(self):
+        while True:
+            feed, block_number, result = await self.block_queue.get()
+            if result["status"] == "reorg":
+                await self._unwind_to_fork(feed, block_number, result["block_hash"])
+                self.block_queue.task_done()
+                continue
+            chain = feed.chain
+            transactions = result["data"]
+            started = time.perf_counter()
+            try:
+                batch = TransactionBatch(transactions)
+                findings = analyze_batch(batch, chain)
+                if feed.activity is not None:
+                    findings.extend(feed.activity.observe_block(block_number, batch))
+                if feed.taint is not None:
+                    findings.extend(feed.taint.observe_block(block_number, batch))
+            except Exception as e:
+                # Not recorded as a clean block: the checkpoint stays before it and a restart retries it
+                self.analyze_stats.errors += 1
+                self._block_failed(feed, block_number)
+                self._rollback_detectors(feed, block_number - 1)
+                print(f"Pipeline analysis error ({chain}) in block {block_number}: {e}")
+                self.analyze_stats.record(len(transactions), time.perf_counter() - started)
+                self.block_queue.task_done()
+                continue
+            for finding in findings:
+                details = finding.setdefault("details", {})
+                details.setdefault("block_number", block_number)
+                details.setdefault("chain", chain)
+            newly_recorded = True
+            if self.store is not None:
+                try:
+                    newly_recorded = await self._in_thread(self.store.record_block, chain, block_number, findings,
+                                                           len(transactions), result.get("block_hash"), result.get("parent_hash"),
+                                                           feed.first_failed_block is None)
+                except Exception as e:
+                    self.analyze_stats.errors += 1
+                    self._block_failed(feed, block_number)
+                    print(f"Pipeline store error ({chain}) in block {block_number}: {e}")
+            feed.last_analyzed_block = block_number
+            feed.lag.processed(block_number, result.get("timestamp"))
+            self.analyze_stats.record(len(transactions), time.perf_counter() - started)
+
+            if newly_recorded:  # Blocks already stored were alerted by whoever stored them
+                for finding in findings:
+                    await self.alert_queue.put(finding)  # Blocks here when alerting falls behind
+            self.block_queue.task_done()
+
+    def _block_failed(self, feed, block_number):
+        feed.failed_blocks += 1
+        if feed.first_failed_block is None or block_number < feed.first_failed_block:
+            feed.first_failed_block = block_number
+
+    def _rollback_detectors(self, feed, last_block):
+        """Forgets whatever the chain's stateful detectors observed after last_block."""
+        if feed.activity is not None:
+            feed.activity.unwind(last_block)
+        if feed.taint is not None:
+            feed.taint.unwind(last_block)
+
+    async def _unwind_to_fork(self, feed, fork_block, fork_hash):
+        """Retracts what was analyzed after the fork block of a reorg; its replacement blocks are fetched next."""
+        replaced = max(0, (feed.last_analyzed_block or fork_block) - fork_block)
+        retracted = 0
+        if self.store is not None:
+            try:
+                retracted = await self._in_thread(self.store.retract_blocks, feed.chain, fork_block, fork_hash)
+            except Exception as e:
+                self.analyze_stats.errors += 1
+                print(f"Pipeline store error ({feed.chain}) retracting blocks after {fork_block}: {e}")
+        self._rollback_detectors(feed, fork_block)
+        if feed.last_analyzed_block is not None and feed.last_analyzed_block > fork_block:
+            feed.last_analyzed_block = fork_block
+        if feed.first_failed_block is not None and feed.first_failed_block > fork_block:
+            feed.first_failed_block = None  # The failed block was orphaned; its replacement is analyzed anew
+        feed.reorgs_detected += 1
+        feed.last_reorg = {"fork_block": fork_block, "replaced_blocks": replaced,
+                           "retracted_findings": retracted, "detected_at": time.time()}
+        print(f"Pipeline ({feed.chain}): reorg detected, {replaced} blocks after {fork_block} replaced, "
+              f"{retracted} findings retracted.")
+
+    async def _alert_stage(self):
+        while True:
+            finding = await self.alert_queue.get()
+            started = time.perf_counter()
+            try:
+                await self._in_thread(self.alert_handler, finding.get("type"), finding.get("details", {}))
+            except Exception as e:
+                self.alert_stats.errors += 1
+                print(f"Pipeline alert error ({finding.get('details', {}).get('chain')}): {e}")
+            self.alert_stats.record(1, time.perf_counter() - started)
+            self.alert_queue.task_done()
+
+    async def _sleep(self, seconds):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    # --- Lifecycle ---
+
+    async def run(self):
+        """Runs the pipeline until stop() is called, then drains queued blocks and findings."""
+        self._stopping = asyncio.Event()
+        # One thread per fetch task and alert worker, plus the analyze stage's store writes,
+        # so a chain waiting on its rate budget never holds up the others
+        self._executor = ThreadPoolExecutor(max_workers=len(self.feeds) + self.alert_workers + 2,
+                                            thread_name_prefix="pipeline-io")
+        chains = ", ".join(feed.chain for feed in self.feeds)
+        try:
+            for feed in self.feeds:
+                if feed.last_fetched_block is None and self.store is not None:
+                    feed.last_fetched_block = await self._in_thread(self.store.get_checkpoint, feed.chain)
+                    if feed.last_fetched_block is not None:
+                        feed.reorg_detector.reset(await self._in_thread(self.store.recent_block_hashes,
+                                                                        feed.chain, REORG_BUFFER_SIZE))
+                feed.fetch_stats = StageStats("fetch")
+            self.block_queue = asyncio.Queue(maxsize=self.block_queue_size)
+            self.alert_queue = asyncio.Queue(maxsize=self.alert_queue_size)
+            self.analyze_stats = StageStats("analyze", self.block_queue)
+            self.alert_stats = StageStats("alert", self.alert_queue)
+
+            fetch_tasks = [asyncio.create_task(self._fetch_stage(feed), name=f"pipeline-fetch-{feed.chain}")
+                           for feed in self.feeds]
+            consumers = [asyncio.create_task(self._analyze_stage(), name="pipeline-analyze")]
+            consumers += [asyncio.create_task(self._alert_stage(), name=f"pipeline-alert-{i}")
+                          for i in range(self.alert_workers)]
+            print(f"Ingestion pipeline for {chains} started.")
+            try:
+                await asyncio.gather(*fetch_tasks)
+                await self.block_queue.join()
+                await self.alert_queue.join()
+            finally:
+                for task in fetch_tasks + consumers:
+                    task.cancel()
+                await asyncio.gather(*fetch_tasks, *consumers, return_exceptions=True)
+                print(f"Ingestion pipeline for {chains} stopped.")
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+    def stats(self):
+        stages = {}
+        if self.analyze_stats is not None:
+            stages["analyze"] = self.analyze_stats.snapshot()
+            stages["alert"] = self.alert_stats.snapshot()
+        return {
+            "chains": {feed.chain: feed.stats() for feed in self.feeds},
+            "stages": stages,
+            "updated_at": time.time(),
+        }
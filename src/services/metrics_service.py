@@ -0,0 +1,381 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# --- Configuration for metrics and profiling ---
+METRICS_PREFIX = "crypto_investigator_"
+# Upper bounds (seconds) of the latency histogram buckets; a +Inf bucket is always added
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Block processing delay behind the block's own timestamp (seconds)
+BLOCK_DELAY_BUCKETS = (1, 2, 5, 12, 30, 60, 120, 300, 600, 1800, 3600)
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "0") in ("1", "true", "yes")  # Start the profiler with the app
+PROFILER_INTERVAL_SECONDS = float(os.environ.get("PROFILER_INTERVAL_SECONDS", 0.01))
+PROFILER_MAX_DEPTH = 48  # Frames kept per sampled stack (innermost ones)
+PROFILER_MAX_STACKS = 20_000  # Distinct stacks kept; further new stacks are counted as "(other)"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# Metric children are updated without locks, like the stats counters elsewhere in the
+# services: an update is a few bytecodes under the GIL, and a lock would double the cost of
+# instrumenting lookups that themselves take a few microseconds.
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = None  # Not exported until first set
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value = (self.value or 0) + amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Per bucket (not cumulative); the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    """Context manager observing the elapsed time of its block into a histogram child."""
+
+    __slots__ = ("child", "started")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class Metric:
+    """
+    A named metric family. Each distinct combination of label values is a child created on
+    first use by labels(*values); hot paths keep the child instead of looking it up per call.
+    """
+
+    type_name = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = METRICS_PREFIX + name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self):
+        """Yields (suffix, label names, label values, extra label, value) for the exposition."""
+        for values, child in list(self._children.items()):
+            if child.value is not None:
+                yield "", self.label_names, values, None, child.value
+
+
+class CounterMetric(Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class GaugeMetric(Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class HistogramMetric(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", self.label_names, values, f'le="{_format_value(float(bound))}"', cumulative
+            yield "_sum", self.label_names, values, None, total
+            yield "_count", self.label_names, values, None, cumulative
+
+
+# --- Registry ---
+
+METRICS = {}  # name -> Metric
+COLLECTORS = []  # Callables yielding (name, type, help, [(label dict, value), ...]) at scrape time
+_REGISTRY_LOCK = threading.Lock()
+
+def _register(metric_class, name, help_text, label_names, **kwargs):
+    with _REGISTRY_LOCK:
+        metric = METRICS.get(METRICS_PREFIX + name)
+        if metric is None:
+            metric = METRICS[METRICS_PREFIX + name] = metric_class(name, help_text, label_names, **kwargs)
+        return metric
+
+def counter(name, help_text, label_names=()):
+    """Returns the counter registered under name, creating it on first use."""
+    return _register(CounterMetric, name, help_text, label_names)
+
+def gauge(name, help_text, label_names=()):
+    return _register(GaugeMetric, name, help_text, label_names)
+
+def histogram(name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+    return _register(HistogramMetric, name, help_text, label_names, buckets=buckets)
+
+def register_collector(collector):
+    """
+    Registers a callable run at every scrape for values that already live elsewhere (queue
+    depths, cache statistics). It yields (name, type, help, [(labels dict, value), ...]).
+    """
+    with _REGISTRY_LOCK:
+        if collector not in COLLECTORS:
+            COLLECTORS.append(collector)
+    return collector
+
+def render_prometheus():
+    """Renders every metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in sorted(METRICS.values(), key=lambda metric: metric.name):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        for suffix, names, values, extra, value in metric.samples():
+            lines.append(f"{metric.name}{suffix}{_format_labels(names, values, extra)} {_format_value(value)}")
+    for collector in list(COLLECTORS):
+        try:
+            families = list(collector())
+        except Exception as e:
+            print(f"Error collecting metrics from {getattr(collector, '__name__', collector)}: {e}")
+            continue
+        for name, type_name, help_text, samples in families:
+            name = METRICS_PREFIX + name
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for labels, value in samples:
+                if value is not None:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Block processing lag ---
+
+CHAIN_HEAD_BLOCK = gauge("chain_head_block", "Latest chain head seen by a block processor.", ("chain", "component"))
+LAST_PROCESSED_BLOCK = gauge("last_processed_block", "Last block fully analyzed by a block processor.", ("chain", "component"))
+BLOCK_LAG_BLOCKS = gauge("block_lag_blocks", "Blocks between the chain head and the last processed block.", ("chain", "component"))
+BLOCK_PROCESSING_DELAY_SECONDS = histogram(
+    "block_processing_delay_seconds", "Time from a block's timestamp to the end of its analysis.",
+    ("chain", "component"), buckets=BLOCK_DELAY_BUCKETS)
+
+
+class BlockLagTracker:
+    """
+    Keeps the lag gauges of one block processor (the tailer or the pipeline of one chain)
+    up to date: call head() when the head is polled and processed() after each block.
+    """
+
+    def __init__(self, chain, component):
+        labels = (chain, component)
+        self.head_block = None
+        self._head = CHAIN_HEAD_BLOCK.labels(*labels)
+        self._processed = LAST_PROCESSED_BLOCK.labels(*labels)
+        self._lag = BLOCK_LAG_BLOCKS.labels(*labels)
+        self._delay = BLOCK_PROCESSING_DELAY_SECONDS.labels(*labels)
+
+    def head(self, block_number):
+        self.head_block = block_number
+        self._head.set(block_number)
+        if self._processed.value is not None:
+            self._lag.set(max(0, block_number - self._processed.value))
+
+    def processed(self, block_number, timestamp=None):
+        """Records a processed block; timestamp is the block's own (int or hex quantity)."""
+        self._processed.set(block_number)
+        if self.head_block is not None:
+            self._lag.set(max(0, self.head_block - block_number))
+        if timestamp is not None:
+            try:
+                block_time = int(timestamp, 16) if isinstance(timestamp, str) else int(timestamp)
+            except ValueError:
+                return
+            self._delay.observe(max(0.0, time.time() - block_time))
+
+
+# --- Sampling profiler ---
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler. A background thread snapshots every thread's stack with
+    sys._current_frames() each `interval` seconds and counts identical stacks, so the cost
+    is a few microseconds per sample regardless of what the monitored code does. Results
+    are available in the collapsed ("folded") format used by flame graph tools and as the
+    functions most often on top of the stack.
+    """
+
+    def __init__(self, interval=PROFILER_INTERVAL_SECONDS, max_depth=PROFILER_MAX_DEPTH, max_stacks=PROFILER_MAX_STACKS):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self._frame_names = {}  # code object -> display name
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _frame_name(self, code):
+        name = self._frame_names.get(code)
+        if name is None:
+            name = self._frame_names[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return name
+
+    def _sample(self):
+        own_ident = threading.get_ident()
+        threads = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                names.append(self._frame_name(frame.f_code))
+                frame = frame.f_back
+            names.append(threads.get(ident, "thread"))
+            stack = ";".join(reversed(names))
+            if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                stack = "(other)"
+            self.stacks[stack] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            with self._lock:
+                self._sample()
+
+    def start(self):
+        if self.running:
+            return False
+        self._stop_event.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        if not self.running:
+            return False
+        self._stop_event.set()
+        self._thread.join()
+        return True
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+
+    def folded(self, limit=None):
+        """Collapsed stacks, one "outer;...;inner count" line each, most frequent first."""
+        with self._lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common(limit)) + "\n"
+
+    def top_functions(self, limit=25):
+        """Functions by the share of samples in which they were the innermost frame."""
+        with self._lock:
+            leaves = Counter()
+            for stack, count in self.stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            total = sum(leaves.values()) or 1
+        return [{"function": name, "samples": count, "share": round(count / total, 4)}
+                for name, count in leaves.most_common(limit)]
+
+    def status(self):
+        return {"running": self.running, "interval_seconds": self.interval, "samples": self.samples,
+                "distinct_stacks": len(self.stacks), "started_at": self.started_at}
+
+
+_PROFILER = None
+_PROFILER_LOCK = threading.Lock()
+
+def get_profiler():
+    """Returns the process-wide SamplingProfiler (not started)."""
+    global _PROFILER
+    with _PROFILER_LOCK:
+        if _PROFILER is None:
+            _PROFILER = SamplingProfiler()
+        return _PROFILER
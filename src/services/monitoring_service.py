@@ -1,40 +1,381 @@
 
 #!/home/ubuntu/crypto_investigator_app/venv/bin/python
 import os
+import hashlib
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+from src.services.rule_engine_service import register_rule, evaluate_rules
+from src.services.scam_db_service import addresses_are_scam, addresses_may_be_scam
+from src.services.block_cache_service import get_block_cache
+from src.services.metrics_service import counter, histogram
+from src.services.token_transfer_service import TOKEN_REGISTRY, TOKEN_TRANSFER_LOGS_ENABLED, TRANSFER_EVENT_TOPIC, fetch_transfer_logs
 
 ALCHEMY_ETH_MAINNET_API_KEY = os.environ.get("ALCHEMY_ETH_MAINNET_API_KEY", "YOUR_FREE_ALCHEMY_API_KEY")
 
 # --- Configuration for Detection Rules ---
 ETH_LARGE_TRANSFER_THRESHOLD = 100  # Example: 100 ETH
+EVM_CHAINS = ("ethereum", "bsc", "polygon")
+# chain -> (native currency, decimals of its smallest unit)
+NATIVE_CURRENCIES = {
+    "ethereum": ("ETH", 18),
+    "bsc": ("BNB", 18),
+    "polygon": ("POL", 18),
+    "bitcoin": ("BTC", 8),
+}
+# Large native transfers, in whole coins of each chain's currency
+LARGE_TRANSFER_THRESHOLDS = {
+    "ethereum": ETH_LARGE_TRANSFER_THRESHOLD,
+    "bsc": float(os.environ.get("BSC_LARGE_TRANSFER_THRESHOLD", 500)),
+    "polygon": float(os.environ.get("POLYGON_LARGE_TRANSFER_THRESHOLD", 500_000)),
+    "bitcoin": float(os.environ.get("BITCOIN_LARGE_TRANSFER_THRESHOLD", 50)),
+}
+# Known mixer contracts (lowercase) -> display name
+KNOWN_MIXER_ADDRESSES = {
+    "0x722122df12d4e14e13ac3b6895a86e84145b6967": "Tornado Cash Proxy",
+    "0xd90e2f925da726b50c4ed8d0fb90ad053324f31b": "Tornado Cash Router",
+    "0x12d66f87a04a9e220743712ce6d9bb1b5616b8fc": "Tornado Cash 0.1 ETH",
+    "0x47ce0c6ed5b0ce3d3a51fdb1c52dc66a7c3c2936": "Tornado Cash 1 ETH",
+    "0x910cbd523d972eb0a6f4cae4618ad62622b39dbf": "Tornado Cash 10 ETH",
+    "0xa160cdab225685da1d56aa342ad8841c3b53f291": "Tornado Cash 100 ETH",
+}
 
-def fetch_ethereum_latest_block_transactions():
-    """Fetches transactions from the latest Ethereum block using Alchemy."""
+# Optional override so the monitor can be pointed at another provider or a local node
+ETH_RPC_URL = os.environ.get("ETH_RPC_URL")
+RPC_TIMEOUT_SECONDS = float(os.environ.get("RPC_TIMEOUT_SECONDS", 15))
+RPC_BATCH_SIZE = int(os.environ.get("RPC_BATCH_SIZE", 50))  # JSON-RPC calls per HTTP POST
+RPC_CONCURRENCY = int(os.environ.get("RPC_CONCURRENCY", 4))  # Batches in flight at once
+# Blocks this far behind the head count as final when the provider has no "finalized" block tag
+BLOCK_FINALITY_DEPTH = int(os.environ.get("BLOCK_FINALITY_DEPTH", 64))
+FINALIZED_BLOCK_TTL_SECONDS = 12  # How long a looked-up finalized block number is reused
+
+RPC_CALLS = counter("rpc_calls_total", "JSON-RPC calls made, batched calls counted individually.", ("method",))
+RPC_ERRORS = counter("rpc_errors_total", "JSON-RPC calls that returned an error or failed in transport.", ("method",))
+RPC_REQUEST_SECONDS = histogram("rpc_request_duration_seconds", "Duration of JSON-RPC HTTP requests.", ("kind",))
+_RPC_SINGLE_SECONDS = RPC_REQUEST_SECONDS.labels("single")
+_RPC_BATCH_SECONDS = RPC_REQUEST_SECONDS.labels("batch")
+BLOCK_ANALYSIS_SECONDS = histogram("block_analysis_duration_seconds", "Time to evaluate every rule over one analyzed batch.", ("chain",))
+TRANSACTIONS_ANALYZED = counter("transactions_analyzed_total", "Transactions evaluated by the rule engine.", ("chain",))
+
+def get_ethereum_rpc_url():
+    """Returns the Ethereum JSON-RPC endpoint, or None if no provider is configured."""
+    if ETH_RPC_URL:
+        return ETH_RPC_URL
     if not ALCHEMY_ETH_MAINNET_API_KEY or ALCHEMY_ETH_MAINNET_API_KEY == "YOUR_FREE_ALCHEMY_API_KEY":
-        return {"status": "error", "message": "Alchemy API key not configured for Ethereum monitoring.", "source": "Configuration Error"}
-
-    api_url = f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_ETH_MAINNET_API_KEY}"
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "eth_getBlockByNumber",
-        "params": ["latest", True]  # True to get full transaction objects
-    }
-    try:
-        response = requests.post(api_url, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        if "result" in data and data["result"] and "transactions" in data["result"]:
-            return {"status": "success", "data": data["result"]["transactions"], "block_number": data["result"].get("number"), "source": "Alchemy"}
-        elif "error" in data:
-            return {"status": "error", "message": data["error"].get("message", "Failed to fetch latest block from Alchemy."), "source": "Alchemy"}
+        return None
+    return f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_ETH_MAINNET_API_KEY}"
+
+def _rpc_source(rpc_url):
+    return "Alchemy" if "alchemy.com" in rpc_url else "JSON-RPC"
+
+
+class RateLimiter:
+    """
+    Token bucket bounding the JSON-RPC calls sent to one endpoint to `rate_per_second` on
+    average, with bursts of up to one second's worth. Each call in a batch costs a token,
+    as providers meter them. Callers reserve their tokens and sleep until they are due,
+    so threads sharing a client are served in order.
+    """
+
+    def __init__(self, rate_per_second):
+        self.rate = float(rate_per_second)
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, cost=1):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate) - cost
+            self.updated_at = now
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.throttled_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RpcClient:
+    """
+    Reusable JSON-RPC client. Keeps a pooled requests.Session so connections (and TLS
+    sessions) are reused, and packs many calls into JSON-RPC batch requests which are
+    sent `concurrency` at a time. With a BlockCache, finalized blocks are served from local
+    disk and only blocks missing from it are requested from the provider (logs are always
+    requested from the provider).
+    """
+
+    def __init__(self, rpc_url, batch_size=RPC_BATCH_SIZE, concurrency=RPC_CONCURRENCY, timeout=RPC_TIMEOUT_SECONDS,
+                 block_cache=None, rate_limiter=None):
+        self.rpc_url = rpc_url
+        self.source = _rpc_source(rpc_url)
+        self.batch_size = max(1, int(batch_size))
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.block_cache = block_cache
+        self.rate_limiter = rate_limiter  # Optional RateLimiter for the endpoint's request budget
+        self._cache_namespace = None
+        self._finalized_block = None
+        self._finalized_checked_at = 0
+
+    def _error(self, message):
+        return {"status": "error", "message": message, "source": self.source}
+
+    def _post(self, payload, timer):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(len(payload) if isinstance(payload, list) else 1)
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.rpc_url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        finally:
+            timer.observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _count(methods, results):
+        for method, result in zip(methods, results):
+            RPC_CALLS.labels(method).inc()
+            if result["status"] != "success":
+                RPC_ERRORS.labels(method).inc()
+        return results
+
+    def _entry_result(self, method, entry):
+        if entry is None:
+            return self._error(f"No response for {method} in batch.")
+        if entry.get("error") is not None:  # Bitcoin Core answers every call with an "error" member
+            return self._error(entry["error"].get("message", f"{method} failed."))
+        return {"status": "success", "data": entry.get("result"), "source": self.source}
+
+    def call(self, method, params):
+        """Performs a single JSON-RPC call."""
+        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        try:
+            result = self._entry_result(method, self._post(payload, _RPC_SINGLE_SECONDS))
+        except requests.exceptions.RequestException as e:
+            result = self._error(str(e))
+        except Exception as e:
+            result = self._error(f"An unexpected error occurred with {self.source}: {str(e)}")
+        return self._count((method,), (result,))[0]
+
+    def _send_batch(self, calls):
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                   for i, (method, params) in enumerate(calls)]
+        try:
+            data = self._post(payload, _RPC_BATCH_SECONDS)
+        except requests.exceptions.RequestException as e:
+            return [self._error(str(e))] * len(calls)
+        except Exception as e:
+            return [self._error(f"An unexpected error occurred with {self.source}: {str(e)}")] * len(calls)
+
+        if isinstance(data, dict):
+            # Some providers answer a rejected batch with a single error object
+            message = data.get("error", {}).get("message", "Unexpected response to batch request.")
+            return [self._error(message)] * len(calls)
+        # Responses may come back in any order; match them up by id
+        by_id = {entry.get("id"): entry for entry in data if isinstance(entry, dict)}
+        return [self._entry_result(method, by_id.get(i)) for i, (method, _) in enumerate(calls)]
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="rpc-batch")
+            return self._executor
+
+    def batch_call(self, calls):
+        """
+        Performs many calls given as (method, params) pairs and returns their results in the
+        same order. Calls are split into batches of `batch_size` sent concurrently.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+        chunks = [calls[i:i + self.batch_size] for i in range(0, len(calls), self.batch_size)]
+        if len(chunks) == 1 or self.concurrency == 1:
+            chunk_results = [self._send_batch(chunk) for chunk in chunks]
         else:
-            return {"status": "error", "message": "No transactions found in the latest block or unexpected response.", "source": "Alchemy"}
-    except requests.exceptions.RequestException as e:
-        return {"status": "error", "message": str(e), "source": "Alchemy"}
-    except Exception as e:
-        return {"status": "error", "message": f"An unexpected error occurred with Alchemy: {str(e)}", "source": "Alchemy"}
+            chunk_results = list(self._get_executor().map(self._send_batch, chunks))
+        return self._count([method for method, _ in calls], [result for chunk in chunk_results for result in chunk])
+
+    def get_blocks(self, block_numbers, full_transactions=True):
+        """Fetches eth_getBlockByNumber for each block number (ints), in order."""
+        if self.block_cache is None or not full_transactions:
+            return self.batch_call(("eth_getBlockByNumber", [hex(n), full_transactions]) for n in block_numbers)
+
+        block_numbers = list(block_numbers)
+        namespace = self.cache_namespace()
+        cached = self.block_cache.get_many(namespace, block_numbers)
+        missing = [n for n in block_numbers if n not in cached]
+        fetched = dict(zip(missing, self.batch_call(("eth_getBlockByNumber", [hex(n), True]) for n in missing)))
+        if fetched:
+            finalized = self.finalized_block_number()
+            if finalized is not None:
+                self.block_cache.put_many(namespace, [
+                    result["data"] for n, result in fetched.items()
+                    if n <= finalized and result["status"] == "success" and result["data"]
+                ])
+        return [fetched[n] if n in fetched else {"status": "success", "data": cached[n], "source": "Block cache"}
+                for n in block_numbers]
+
+    def cache_namespace(self):
+        """Cache directory for this endpoint's chain: the chain id, or a hash of the URL if unavailable."""
+        if self._cache_namespace is None:
+            result = self.call("eth_chainId", [])
+            try:
+                self._cache_namespace = f"chain-{int(result['data'], 16)}"
+            except (KeyError, TypeError, ValueError):
+                self._cache_namespace = f"url-{hashlib.sha1(self.rpc_url.encode()).hexdigest()[:16]}"
+        return self._cache_namespace
+
+    def finalized_block_number(self):
+        """
+        Returns the latest finalized block number, or None if it cannot be determined. Uses the
+        "finalized" block tag, falling back to BLOCK_FINALITY_DEPTH blocks behind the head.
+        """
+        now = time.time()
+        if self._finalized_block is not None and now - self._finalized_checked_at < FINALIZED_BLOCK_TTL_SECONDS:
+            return self._finalized_block
+        finalized = None
+        result = self.call("eth_getBlockByNumber", ["finalized", False])
+        if result["status"] == "success" and result["data"]:
+            finalized = int(result["data"]["number"], 16)
+        else:
+            head = self.call("eth_blockNumber", [])
+            if head["status"] == "success":
+                finalized = int(head["data"], 16) - BLOCK_FINALITY_DEPTH
+        if finalized is not None:
+            self._finalized_block = finalized
+            self._finalized_checked_at = now
+        return finalized
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+# One pooled client per endpoint, shared by all callers in the process
+_RPC_CLIENTS = {}
+_RPC_CLIENTS_LOCK = threading.Lock()
+
+def get_rpc_client(rpc_url=None, rate_per_second=None):
+    """
+    Returns the shared RpcClient for rpc_url (default: the configured Ethereum provider), or
+    None. A rate_per_second budget is applied to the endpoint's client if it has none yet.
+    """
+    rpc_url = rpc_url or get_ethereum_rpc_url()
+    if not rpc_url:
+        return None
+    with _RPC_CLIENTS_LOCK:
+        client = _RPC_CLIENTS.get(rpc_url)
+        if client is None:
+            client = _RPC_CLIENTS[rpc_url] = RpcClient(rpc_url, block_cache=get_block_cache())
+        if rate_per_second and client.rate_limiter is None:
+            client.rate_limiter = RateLimiter(rate_per_second)
+        return client
+
+def _not_configured():
+    return {"status": "error", "message": "Alchemy API key not configured for Ethereum monitoring.", "source": "Configuration Error"}
+
+def eth_rpc_call(method, params, rpc_url=None):
+    """Performs a single JSON-RPC call against the Ethereum provider."""
+    client = get_rpc_client(rpc_url)
+    if client is None:
+        return _not_configured()
+    return client.call(method, params)
+
+def _block_result(result, block):
+    """Converts an eth_getBlockByNumber response into the monitoring result format."""
+    if result["status"] != "success":
+        return result
+    if block and "transactions" in block:
+        return {
+            "status": "success",
+            "data": block["transactions"],
+            "block_number": block.get("number"),
+            "block_hash": block.get("hash"),
+            "parent_hash": block.get("parentHash"),
+            "timestamp": block.get("timestamp"),
+            "source": result["source"]
+        }
+    return {"status": "error", "message": "No transactions found in the requested block or unexpected response.", "source": result["source"]}
+
+def fetch_ethereum_latest_block_transactions(rpc_url=None):
+    """Fetches transactions from the latest Ethereum block using Alchemy."""
+    result = eth_rpc_call("eth_getBlockByNumber", ["latest", True], rpc_url)  # True to get full transaction objects
+    return _block_result(result, result.get("data"))
+
+def fetch_ethereum_block_transactions(block_number, rpc_url=None):
+    """Fetches the transactions of a specific Ethereum block (block_number is an int)."""
+    return fetch_ethereum_blocks_transactions([block_number], rpc_url)[0]
+
+def fetch_ethereum_blocks_transactions(block_numbers, rpc_url=None, token_transfers=TOKEN_TRANSFER_LOGS_ENABLED):
+    """
+    Fetches many Ethereum blocks with batched JSON-RPC. Returns one result per block, in order.
+    With token_transfers (only for Ethereum endpoints, see token_transfers_enabled), the
+    watched tokens' Transfer logs are fetched with one eth_getLogs call per block range and
+    attached to their transactions as "logs". A block whose logs could not be fetched is
+    returned as an error, like a block that could not be fetched, so callers retry it instead
+    of checkpointing it with its token transfers unchecked.
+    """
+    client = get_rpc_client(rpc_url)
+    if client is None:
+        return [_not_configured() for _ in block_numbers]
+    results = [_block_result(result, result.get("data")) for result in client.get_blocks(block_numbers)]
+    if token_transfers:
+        _attach_transfer_logs(client, block_numbers, results)
+    return results
+
+def _attach_transfer_logs(client, block_numbers, results):
+    positions = {n: i for i, (n, result) in enumerate(zip(block_numbers, results)) if result["status"] == "success"}
+    if not positions:
+        return
+    logs_by_block, failed = fetch_transfer_logs(client, list(positions))
+    for first, last in failed:
+        for n in range(first, last + 1):
+            i = positions.pop(n, None)
+            if i is not None:
+                results[i] = {"status": "error", "message": f"Token transfer logs of block {n} could not be fetched.",
+                              "source": results[i]["source"]}
+    fetched = {n: results[i] for n, i in positions.items()}
+    for n, logs in logs_by_block.items():
+        result = fetched.get(n)
+        if result is None:
+            continue
+        by_hash = {tx.get("hash"): tx for tx in result["data"]}
+        for log in logs:
+            if log.get("removed") or log.get("blockHash", result["block_hash"]) != result["block_hash"]:
+                continue  # From a block that was reorged out between the two requests
+            tx = by_hash.get(log.get("transactionHash"))
+            if tx is not None:
+                tx.setdefault("logs", []).append(log)
+
+def fetch_ethereum_block_hashes(block_numbers, rpc_url=None):
+    """Returns the canonical hash of each block (None where unavailable), in order. Fetches headers only."""
+    client = get_rpc_client(rpc_url)
+    if client is None:
+        return [None for _ in block_numbers]
+    return [(result.get("data") or {}).get("hash") if result["status"] == "success" else None
+            for result in client.get_blocks(block_numbers, full_transactions=False)]
+
+def fetch_ethereum_block_number(rpc_url=None):
+    """Returns the current head block number of the chain as an int."""
+    result = eth_rpc_call("eth_blockNumber", [], rpc_url)
+    if result["status"] != "success":
+        return result
+    try:
+        return {"status": "success", "block_number": int(result["data"], 16), "source": result["source"]}
+    except (TypeError, ValueError):
+        return {"status": "error", "message": f"Invalid block number format received: {result['data']}", "source": result["source"]}
 
 def detect_large_transfer_ethereum(transaction):
     """Detects if an Ethereum transaction is a large transfer."""
@@ -58,40 +399,338 @@ def detect_large_transfer_ethereum(transaction):
     return None
 
 
-def analyze_transaction_for_suspicious_activity(transaction, chain):
-    """Analyzes a single transaction for various suspicious activities based on the chain."""
+# --- Batch (columnar) analysis ---
+# Decoding every field once per batch and running each rule as a single pass over the
+# columns avoids the per-transaction call and parsing overhead on blocks with hundreds
+# of transactions and on large backfills.
+
+WEI_PER_ETH = 10**18
+
+def _decode_hex_quantities(values):
+    """Decodes hex quantities to ints, falling back to per-item decoding (invalid -> 0) on bad input."""
+    try:
+        return list(map(int, values, repeat(16)))
+    except (TypeError, ValueError):
+        decoded = []
+        for v in values:
+            try:
+                decoded.append(int(v, 16))
+            except (TypeError, ValueError):
+                print(f"Error decoding transaction value {v!r}; treating it as 0.")
+                decoded.append(0)
+        return decoded
+
+
+class TokenTransferBatch:
+    """
+    Columnar decoding of ERC-20 Transfer logs. Only logs with the Transfer signature and
+    both addresses indexed (three topics) are kept; ERC-721 transfers, which also index
+    the token id, are skipped. `rows` maps each kept transfer back to its position in the
+    input list, `amounts` holds raw integer token units.
+    """
+
+    __slots__ = ("logs", "rows", "tokens", "from_addresses", "to_addresses", "amounts")
+
+    def __init__(self, logs):
+        self.logs = logs
+        self.rows = [i for i, log in enumerate(logs)
+                     if len(log.get("topics") or ()) == 3 and log["topics"][0].lower() == TRANSFER_EVENT_TOPIC]
+        kept = [logs[i] for i in self.rows]
+        self.tokens = [(log.get("address") or "").lower() for log in kept]
+        # Indexed addresses are left-padded to 32 bytes; the address is the last 20
+        self.from_addresses = ["0x" + log["topics"][1][-40:].lower() for log in kept]
+        self.to_addresses = ["0x" + log["topics"][2][-40:].lower() for log in kept]
+        self.amounts = _decode_hex_quantities([log.get("data") if len(log.get("data") or "") > 2 else "0x0" for log in kept])
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class TransactionBatch:
+    """
+    Columnar view of many transactions. Each column is decoded once, on first use, so
+    rules compare whole columns instead of re-parsing every dict: `values_wei` holds
+    exact integer wei, `from_addresses`/`to_addresses` are lowercased ("" when missing).
+    Unless dedupe is False, transactions without a hash or with a repeated hash are dropped.
+    `chain` is set by analyze_batch for rules whose units or thresholds depend on the chain.
+    """
+
+    __slots__ = ("transactions", "hashes", "block_numbers", "chain", "_values_wei", "_from_addresses", "_to_addresses", "_rows_with")
+
+    def __init__(self, transactions, block_numbers=None, dedupe=True):
+        hashes = [tx.get("hash") for tx in transactions]
+        if dedupe and (None in hashes or len(set(hashes)) != len(hashes)):
+            keep = []
+            seen = set()
+            for i, tx_hash in enumerate(hashes):
+                if tx_hash and tx_hash not in seen:
+                    seen.add(tx_hash)
+                    keep.append(i)
+            transactions = [transactions[i] for i in keep]
+            hashes = [hashes[i] for i in keep]
+            if block_numbers is not None:
+                block_numbers = [block_numbers[i] for i in keep]
+
+        self.transactions = transactions
+        self.hashes = hashes
+        self.block_numbers = block_numbers
+        self.chain = None
+        self._values_wei = None
+        self._from_addresses = None
+        self._to_addresses = None
+        self._rows_with = {}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @property
+    def values_wei(self):
+        if self._values_wei is None:
+            self._values_wei = _decode_hex_quantities([tx.get("value") or "0x0" for tx in self.transactions])
+        return self._values_wei
+
+    @property
+    def from_addresses(self):
+        if self._from_addresses is None:
+            self._from_addresses = [(tx.get("from") or "").lower() for tx in self.transactions]
+        return self._from_addresses
+
+    @property
+    def to_addresses(self):
+        if self._to_addresses is None:
+            self._to_addresses = [(tx.get("to") or "").lower() for tx in self.transactions]  # "" for contract creation
+        return self._to_addresses
+
+    def rows_with(self, field):
+        """Sorted row indices whose transaction has a non-empty value for field."""
+        rows = self._rows_with.get(field)
+        if rows is None:
+            if field == "value":
+                column = self.values_wei
+            elif field == "from":
+                column = self.from_addresses
+            elif field == "to":
+                column = self.to_addresses
+            else:
+                column = [tx.get(field) not in (None, "", "0x") for tx in self.transactions]
+            rows = self._rows_with[field] = [i for i, present in enumerate(column) if present]
+        return rows
+
+    @classmethod
+    def from_blocks(cls, blocks):
+        """Builds one batch from (block_number, transactions) pairs, recording each tx's block."""
+        transactions = []
+        block_numbers = []
+        for block_number, block_transactions in blocks:
+            transactions.extend(block_transactions)
+            block_numbers.extend([block_number] * len(block_transactions))
+        return cls(transactions, block_numbers)
+
+
+# --- Detection rules ---
+# Each rule takes a TransactionBatch and the candidate row indices and returns
+# (row, finding) pairs; see rule_engine_service for how they are dispatched.
+# "value_eth" in finding details is the amount in the chain's native currency (the name
+# predates other chains), and "currency" names that currency.
+# Placeholder for other rules:
+# - Newly deployed tokens (rug pull/honeypot signs)
+# Drained wallets and unusual transaction patterns need state across blocks; see
+# address_activity_service, which the block tailer and ingestion pipeline feed per block.
+# - Solana specific rules
+
+@register_rule("large_transfer", chains=tuple(LARGE_TRANSFER_THRESHOLDS), fields=("value",), cost=1)
+def detect_large_transfers_batch(batch, rows):
+    """
+    Batch version of detect_large_transfer_ethereum for every chain in LARGE_TRANSFER_THRESHOLDS:
+    one integer comparison per transaction. On Bitcoin the value is the total output, change included.
+    """
+    currency, decimals = NATIVE_CURRENCIES[batch.chain]
+    unit = 10**decimals
+    threshold = int(LARGE_TRANSFER_THRESHOLDS[batch.chain] * unit)
     findings = []
-    if chain == "ethereum":
-        large_transfer = detect_large_transfer_ethereum(transaction)
-        if large_transfer:
-            findings.append(large_transfer)
-        
-        # Placeholder for other Ethereum detection rules:
-        # - Interactions with known scam contracts
-        # - Tornado Cash usage
-        # - Newly deployed tokens (rug pull/honeypot signs)
-        # - Drained wallets or unusual transaction patterns
-
-    # elif chain == "bitcoin":
-    #     # Bitcoin specific detection rules
-    # elif chain == "bsc":
-    #     # BSC specific detection rules
-    # elif chain == "solana":
-    #     # Solana specific detection rules
+    values = batch.values_wei
+    for i in [i for i in rows if values[i] >= threshold]:
+        tx = batch.transactions[i]
+        value = values[i] / unit
+        findings.append((i, {
+            "type": "large_transfer",
+            "message": f"Large {currency} transfer detected: {value:.2f} {currency}",
+            "details": {
+                "hash": batch.hashes[i],
+                "from": tx.get("from"),
+                "to": tx.get("to"),
+                "value_eth": value,
+                "currency": currency
+            }
+        }))
+    return findings
 
+@register_rule("mixer_interaction", chains=("ethereum",), fields=("to",), cost=2)
+def detect_mixer_interactions_batch(batch, rows):
+    """Flags transactions sent to a known mixer contract (e.g. Tornado Cash)."""
+    findings = []
+    to_addresses = batch.to_addresses
+    for i in [i for i in rows if to_addresses[i] in KNOWN_MIXER_ADDRESSES]:
+        tx = batch.transactions[i]
+        mixer_name = KNOWN_MIXER_ADDRESSES[to_addresses[i]]
+        findings.append((i, {
+            "type": "uses_mixer_service",
+            "message": f"Interaction with mixer service detected: {mixer_name}",
+            "details": {
+                "hash": batch.hashes[i],
+                "address": tx.get("from"),
+                "from": tx.get("from"),
+                "to": tx.get("to"),
+                "mixer_name": mixer_name,
+                "value_eth": batch.values_wei[i] / WEI_PER_ETH
+            }
+        }))
     return findings
 
+@register_rule("large_token_transfer", chains=("ethereum",), fields=("logs",), cost=3)
+def detect_large_token_transfers_batch(batch, rows):
+    """
+    Flags Transfer logs of watched tokens at or above the token's threshold. Logs come from
+    eth_getLogs (see fetch_ethereum_blocks_transactions) or a transaction receipt; all logs
+    of the candidate rows are decoded as one TokenTransferBatch.
+    """
+    logs = []
+    log_rows = []
+    for i in rows:
+        tx_logs = batch.transactions[i]["logs"]
+        logs.extend(tx_logs)
+        log_rows.extend(repeat(i, len(tx_logs)))
+    transfers = TokenTransferBatch(logs)
+    raw_thresholds = TOKEN_REGISTRY.raw_thresholds
+    findings = []
+    for k, (token, amount) in enumerate(zip(transfers.tokens, transfers.amounts)):
+        threshold = raw_thresholds.get(token)
+        if threshold is None or amount < threshold:
+            continue
+        log = logs[transfers.rows[k]]
+        i = log_rows[transfers.rows[k]]
+        symbol = TOKEN_REGISTRY.symbol(token)
+        amount_tokens = amount / 10**TOKEN_REGISTRY.decimals[token]
+        findings.append((i, {
+            "type": "large_token_transfer",
+            "message": f"Large {symbol} transfer detected: {amount_tokens:,.2f} {symbol}",
+            "details": {
+                "hash": batch.hashes[i],
+                "from": transfers.from_addresses[k],
+                "to": transfers.to_addresses[k],
+                "token_address": token,
+                "token_symbol": symbol,
+                "amount": amount_tokens,
+                "log_index": log.get("logIndex")
+            }
+        }))
+    return findings
+
+def _scam_prefilter(batch, rows):
+    """Cheap gate for the scam-address rule: keeps rows where a participant passes the Bloom filter."""
+    from_addresses, to_addresses = batch.from_addresses, batch.to_addresses
+    maybe = addresses_may_be_scam([from_addresses[i] for i in rows] + [to_addresses[i] for i in rows])
+    n = len(rows)
+    return [row for k, row in enumerate(rows) if maybe[k] or maybe[n + k]]
+
+@register_rule("known_scam_address", chains=EVM_CHAINS, fields=("from",), cost=5, gate=_scam_prefilter)
+def detect_scam_address_interactions_batch(batch, rows):
+    """Flags transactions whose sender or recipient is in the scam database."""
+    currency, _ = NATIVE_CURRENCIES[batch.chain]
+    participants = []
+    for i in rows:
+        participants.append(batch.from_addresses[i])
+        participants.append(batch.to_addresses[i])
+    verdicts = addresses_are_scam(participants)
+
+    findings = []
+    for k, i in enumerate(rows):
+        tx = batch.transactions[i]
+        for role, address, is_scam in (("from", tx.get("from"), verdicts[2 * k]), ("to", tx.get("to"), verdicts[2 * k + 1])):
+            if is_scam:
+                findings.append((i, {
+                    "type": "interacts_with_known_scam_address",
+                    "message": f"Transaction {role} known scam address {address}",
+                    "details": {
+                        "hash": batch.hashes[i],
+                        "address": address,
+                        "role": role,
+                        "from": tx.get("from"),
+                        "to": tx.get("to"),
+                        "value_eth": batch.values_wei[i] / WEI_PER_ETH,
+                        "currency": currency
+                    }
+                }))
+    return findings
+
+def _utxo_participants(batch, rows):
+    """(row, role, address) for every input and output address of the rows' UTXO transactions."""
+    return [(i, role, address) for i in rows
+            for role, key in (("input", "inputs"), ("output", "outputs"))
+            for address in batch.transactions[i].get(key) or ()]
+
+def _utxo_scam_prefilter(batch, rows):
+    """Bloom gate for UTXO chains: keeps rows with an input or output address that may be a scam address."""
+    participants = _utxo_participants(batch, rows)
+    maybe = addresses_may_be_scam([address for _, _, address in participants])
+    return sorted({i for (i, _, _), hit in zip(participants, maybe) if hit})
+
+@register_rule("known_scam_address_utxo", chains=("bitcoin",), cost=5, gate=_utxo_scam_prefilter)
+def detect_utxo_scam_address_interactions_batch(batch, rows):
+    """Flags Bitcoin transactions spending from or paying to an address in the scam database."""
+    currency, decimals = NATIVE_CURRENCIES[batch.chain]
+    participants = _utxo_participants(batch, rows)
+    verdicts = addresses_are_scam([address for _, _, address in participants])
+
+    findings = []
+    reported = set()
+    for (i, role, address), is_scam in zip(participants, verdicts):
+        if not is_scam or (i, address) in reported:
+            continue
+        reported.add((i, address))
+        tx = batch.transactions[i]
+        findings.append((i, {
+            "type": "interacts_with_known_scam_address",
+            "message": f"Transaction {'spends from' if role == 'input' else 'pays'} known scam address {address}",
+            "details": {
+                "hash": batch.hashes[i],
+                "address": address,
+                "role": role,
+                "from": tx.get("from"),
+                "to": tx.get("to"),
+                "value_eth": batch.values_wei[i] / 10**decimals,
+                "currency": currency
+            }
+        }))
+    return findings
+
+def analyze_batch(batch, chain):
+    """Evaluates the chain's registered rules over a TransactionBatch, findings in transaction order."""
+    findings = []
+    batch.chain = chain
+    started = time.perf_counter()
+    indexed_findings = evaluate_rules(batch, chain)
+    BLOCK_ANALYSIS_SECONDS.labels(chain).observe(time.perf_counter() - started)
+    TRANSACTIONS_ANALYZED.labels(chain).inc(len(batch))
+    for i, finding in indexed_findings:
+        if batch.block_numbers is not None:
+            finding["details"].setdefault("block_number", batch.block_numbers[i])
+        findings.append(finding)
+    return findings
+
+def analyze_transaction_for_suspicious_activity(transaction, chain):
+    """Analyzes a single transaction for various suspicious activities based on the chain."""
+    return analyze_batch(TransactionBatch([transaction], dedupe=False), chain)
+
+def analyze_transactions_batch(transactions, chain):
+    """Analyzes a whole block of transactions at once. Equivalent to calling
+    analyze_transaction_for_suspicious_activity on each unique transaction."""
+    return analyze_batch(TransactionBatch(transactions), chain)
+
+def analyze_blocks_batch(blocks, chain):
+    """Analyzes many blocks, given as (block_number, transactions) pairs, in a single pass."""
+    return analyze_batch(TransactionBatch.from_blocks(blocks), chain)
 
-# Example of how this might be used in a monitoring loop (conceptual)
-# def continuous_monitoring_ethereum():
-#     while True:
-#         result = fetch_ethereum_latest_block_transactions()
-#         if result["status"] == "success":
-#             for tx in result["data"]:
-#                 findings = analyze_transaction_for_suspicious_activity(tx, "ethereum")
-#                 if findings:
-#                     print(f"Suspicious activity found: {findings}") # Replace with actual alerting
-#         else:
-#             print(f"Error fetching transactions: {result["message"]}")
-#         time.sleep(15) # Poll every 15 seconds (adjust based on API limits and needs)
 
+# Continuous monitoring (tracking the last processed block and backfilling gaps)
+# lives in src/services/block_tailer_service.py.
@@ -0,0 +1,205 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import os
+import threading
+import time
+import uuid
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.services.monitoring_service import EVM_CHAINS, fetch_ethereum_blocks_transactions, analyze_transactions_batch
+from src.services.rule_engine_service import RuleError
+from src.services.token_transfer_service import token_transfers_enabled
+
+# --- Configuration for historical range scans ---
+RANGE_SCAN_CHUNK_SIZE = int(os.environ.get("RANGE_SCAN_CHUNK_SIZE", 500))  # Blocks per worker task
+RANGE_SCAN_FETCH_BATCH_SIZE = int(os.environ.get("RANGE_SCAN_FETCH_BATCH_SIZE", 100))  # Blocks held in memory at once per worker
+RANGE_SCAN_WORKERS = int(os.environ.get("RANGE_SCAN_WORKERS", os.cpu_count() or 2))  # Worker processes
+# "spawn" keeps worker processes safe to start from the threaded API server
+RANGE_SCAN_START_METHOD = os.environ.get("RANGE_SCAN_START_METHOD", "spawn")
+RANGE_SCAN_MAX_BLOCKS = int(os.environ.get("RANGE_SCAN_MAX_BLOCKS", 2_000_000))  # Upper bound on one job's range
+# Findings of the stateful detectors (address activity, taint) depend on blocks before the
+# scanned range, so a range scan cannot regenerate them; rescans keep the stored ones.
+RANGE_SCAN_KEPT_FINDING_TYPES = ("drained_wallet_activity", "unusual_transaction_pattern", "tainted_funds_transfer")
+
+
+def chunk_ranges(start_block, end_block, chunk_size=RANGE_SCAN_CHUNK_SIZE):
+    """Splits [start_block, end_block] into consecutive inclusive (start, end) chunks."""
+    chunk_size = max(1, int(chunk_size))
+    return [(start, min(start + chunk_size - 1, end_block)) for start in range(start_block, end_block + 1, chunk_size)]
+
+def scan_chunk(chain, rpc_url, start_block, end_block, fetch_batch_size=RANGE_SCAN_FETCH_BATCH_SIZE):
+    """
+    Fetches and analyzes blocks [start_block, end_block] in order. Runs in a worker process.
+    Stops at the first block that cannot be fetched or analyzed and reports it in
+    "failed_block", so the rest of the chunk can be retried. Returns the chunk result with findings per block.
+    """
+    result = {"start_block": start_block, "end_block": end_block, "blocks": [],
+              "transactions_analyzed": 0, "failed_block": None, "message": None}
+    for batch_start in range(start_block, end_block + 1, fetch_batch_size):
+        block_numbers = list(range(batch_start, min(batch_start + fetch_batch_size - 1, end_block) + 1))
+        blocks = fetch_ethereum_blocks_transactions(block_numbers, rpc_url, token_transfers=token_transfers_enabled(chain))
+        for block_number, block in zip(block_numbers, blocks):
+            if block["status"] != "success":
+                result["failed_block"] = block_number
+                result["message"] = block["message"]
+                return result
+            transactions = block["data"]
+            try:
+                findings = analyze_transactions_batch(transactions, chain)
+            except RuleError as e:
+                result["failed_block"] = block_number
+                result["message"] = str(e)
+                return result
+            for finding in findings:
+                finding.setdefault("details", {}).setdefault("block_number", block_number)
+            result["blocks"].append({"block_number": block_number, "tx_count": len(transactions),
+                                     "block_hash": block.get("block_hash"), "parent_hash": block.get("parent_hash"),
+                                     "findings": findings})
+            result["transactions_analyzed"] += len(transactions)
+    return result
+
+
+class RangeScanJob:
+    """
+    Scans a historical block range. The range is split into chunks that worker processes
+    fetch (with batched RPC) and analyze in parallel; results are merged back in block order,
+    so on_block callbacks and the findings store see blocks in sequence. Memory stays bounded
+    because only a window of chunks is in flight at a time.
+    """
+
+    def __init__(self, start_block, end_block, chain="ethereum", rpc_url=None, chunk_size=RANGE_SCAN_CHUNK_SIZE,
+                 workers=RANGE_SCAN_WORKERS, store=None, on_block=None):
+        if start_block < 0 or end_block < start_block:
+            raise ValueError("end_block must be greater than or equal to start_block, and both non-negative.")
+        if end_block - start_block + 1 > RANGE_SCAN_MAX_BLOCKS:
+            raise ValueError(f"Range exceeds the maximum of {RANGE_SCAN_MAX_BLOCKS} blocks per scan.")
+        if chain not in EVM_CHAINS:
+            raise ValueError(f"Range scans support EVM chains only ({', '.join(EVM_CHAINS)}), not {chain}.")
+        if chain != "ethereum":
+            # Without an endpoint of its own the scan would read Ethereum blocks from the default provider
+            rpc_url = rpc_url or os.environ.get(f"{chain.upper()}_RPC_URL")
+            if not rpc_url:
+                raise ValueError(f"No RPC endpoint configured for {chain} (set {chain.upper()}_RPC_URL or pass an RPC URL).")
+        self.id = uuid.uuid4().hex
+        self.chain = chain
+        self.rpc_url = rpc_url
+        self.start_block = start_block
+        self.end_block = end_block
+        self.chunks = chunk_ranges(start_block, end_block, chunk_size)
+        self.workers = max(1, int(workers))
+        self.store = store  # Optional FindingsStore; rescanned blocks replace stored rule findings (see RANGE_SCAN_KEPT_FINDING_TYPES)
+        self.on_block = on_block  # Optional callback(block_number, findings), called in block order
+
+        self.status_value = "pending"
+        self.blocks_processed = 0
+        self.transactions_analyzed = 0
+        self.findings_count = 0
+        self.last_block = None
+        self.failed_ranges = []
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._thread = None
+
+    def _iter_chunk_results(self, executor):
+        """Yields chunk results in block order, keeping at most 2 chunks per worker in flight."""
+        pending = deque()
+        chunks = iter(self.chunks)
+        for chunk in chunks:
+            pending.append(executor.submit(scan_chunk, self.chain, self.rpc_url, *chunk))
+            if len(pending) >= self.workers * 2:
+                break
+        while pending and not self._cancel_event.is_set():
+            result = pending.popleft().result()
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                pending.append(executor.submit(scan_chunk, self.chain, self.rpc_url, *next_chunk))
+            yield result
+        for future in pending:
+            future.cancel()
+
+    def _merge(self, result):
+        for block in result["blocks"]:
+            findings = block["findings"]
+            if self.store is not None:
+                self.store.record_block(self.chain, block["block_number"], findings, block["tx_count"],
+                                        block["block_hash"], block["parent_hash"], advance_checkpoint=False, replace=True,
+                                        keep_types=RANGE_SCAN_KEPT_FINDING_TYPES)
+            if self.on_block:
+                self.on_block(block["block_number"], findings)
+            self.blocks_processed += 1
+            self.findings_count += len(findings)
+            self.last_block = block["block_number"]
+        self.transactions_analyzed += result["transactions_analyzed"]
+        if result["failed_block"] is not None:
+            self.failed_ranges.append({"start_block": result["failed_block"], "end_block": result["end_block"],
+                                       "message": result["message"]})
+
+    def run(self):
+        """Runs the scan to completion in the calling thread and returns the final status."""
+        self.status_value = "running"
+        self.started_at = time.time()
+        try:
+            context = multiprocessing.get_context(RANGE_SCAN_START_METHOD)
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(self.chunks)), mp_context=context) as executor:
+                for result in self._iter_chunk_results(executor):
+                    self._merge(result)
+            if self._cancel_event.is_set():
+                self.status_value = "cancelled"
+            else:
+                self.status_value = "partial" if self.failed_ranges else "completed"
+        except Exception as e:
+            self.error = str(e)
+            self.status_value = "failed"
+            print(f"Range scan {self.id} ({self.chain} {self.start_block}-{self.end_block}) failed: {e}")
+        self.finished_at = time.time()
+        return self.status()
+
+    def start(self):
+        """Runs the scan in a background thread."""
+        self._thread = threading.Thread(target=self.run, name=f"range-scan-{self.id[:8]}", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def status(self):
+        total_blocks = self.end_block - self.start_block + 1
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0
+        return {
+            "id": self.id,
+            "chain": self.chain,
+            "status": self.status_value,
+            "start_block": self.start_block,
+            "end_block": self.end_block,
+            "chunks": len(self.chunks),
+            "workers": self.workers,
+            "blocks_processed": self.blocks_processed,
+            "progress": round(self.blocks_processed / total_blocks, 4),
+            "last_block": self.last_block,
+            "transactions_analyzed": self.transactions_analyzed,
+            "findings_count": self.findings_count,
+            "blocks_per_second": round(self.blocks_processed / elapsed, 2) if elapsed else None,
+            "failed_ranges": self.failed_ranges,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+RANGE_SCAN_JOBS = {}
+_RANGE_SCAN_JOBS_LOCK = threading.Lock()
+
+def start_range_scan(start_block, end_block, **kwargs):
+    """Creates a RangeScanJob, starts it in the background and registers it for status lookups."""
+    job = RangeScanJob(start_block, end_block, **kwargs)
+    with _RANGE_SCAN_JOBS_LOCK:
+        RANGE_SCAN_JOBS[job.id] = job
+    job.start()
+    return job
+
+def get_range_scan(job_id):
+    with _RANGE_SCAN_JOBS_LOCK:
+        return RANGE_SCAN_JOBS.get(job_id)
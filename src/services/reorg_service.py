@@ -0,0 +1,55 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+# --- Chain reorganization detection ---
+# Shared by the block tailer and the ingestion pipeline: both keep the hashes of the blocks
+# they recently took from a chain, notice when a new block does not build on the last one,
+# and walk back to the last block still on the canonical chain before unwinding their state.
+import os
+from collections import deque
+
+# Recent block hashes kept to detect chain reorganizations; bounds the deepest reorg that can be unwound
+REORG_BUFFER_SIZE = int(os.environ.get("REORG_BUFFER_SIZE", 64))
+
+
+class ReorgDetector:
+    """Ring buffer of (block_number, block_hash) of recently processed blocks of one chain, oldest first."""
+
+    def __init__(self, adapter, size=REORG_BUFFER_SIZE):
+        self.adapter = adapter
+        self.block_hashes = deque(maxlen=size)
+
+    def reset(self, block_hashes=()):
+        """Replaces the buffer, e.g. with FindingsStore.recent_block_hashes after resuming from a checkpoint."""
+        self.block_hashes.clear()
+        self.block_hashes.extend(block_hashes)
+
+    def record(self, block_number, block_hash):
+        self.block_hashes.append((block_number, block_hash))
+
+    def is_reorg(self, block_number, result):
+        """True if the block (a fetch result) does not build on the last block we hold a hash for."""
+        if not self.block_hashes:
+            return False
+        last_number, last_hash = self.block_hashes[-1]
+        parent_hash = result.get("parent_hash")
+        return last_number == block_number - 1 and bool(last_hash) and bool(parent_hash) and parent_hash != last_hash
+
+    def find_fork_block(self):
+        """
+        Returns (block_number, block_hash) of the highest buffered block that is still canonical,
+        or the block below the buffer (hash None) if none is. Raises RuntimeError if the canonical
+        hashes cannot be fetched.
+        """
+        buffered = list(self.block_hashes)
+        canonical = self.adapter.fetch_block_hashes([number for number, _ in buffered])
+        for (number, block_hash), canonical_hash in zip(reversed(buffered), reversed(canonical)):
+            if canonical_hash is None:
+                raise RuntimeError(f"Could not fetch block {number} while resolving a reorg.")
+            if canonical_hash == block_hash:
+                return number, block_hash
+        print(f"Reorg on {self.adapter.chain} deeper than the {len(buffered)}-block buffer; unwinding all of it.")
+        return buffered[0][0] - 1, None
+
+    def rewind(self, fork_block):
+        """Drops the buffered blocks after fork_block."""
+        while self.block_hashes and self.block_hashes[-1][0] > fork_block:
+            self.block_hashes.pop()
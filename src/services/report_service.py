@@ -0,0 +1,233 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from src.config import ETHERSCAN_API_KEY, ETHERSCAN_API_URL
+from src.services.monitoring_service import eth_rpc_call, analyze_transactions_batch, WEI_PER_ETH
+from src.services.rule_engine_service import RuleError
+from src.services.scam_db_service import is_address_scam
+from src.services.risk_assessment_service import generate_overall_summary_and_risk
+
+# --- Configuration for on-demand reports ---
+REPORT_CACHE_TTL_SECONDS = float(os.environ.get("REPORT_CACHE_TTL_SECONDS", 300))
+REPORT_CACHE_MAX_ENTRIES = int(os.environ.get("REPORT_CACHE_MAX_ENTRIES", 5000))
+REPORT_FANOUT_WORKERS = int(os.environ.get("REPORT_FANOUT_WORKERS", 8))  # Upstream lookups in flight at once
+REPORT_TX_PAGES = int(os.environ.get("REPORT_TX_PAGES", 3))  # Transaction history pages fetched per report
+REPORT_TX_PAGE_SIZE = int(os.environ.get("REPORT_TX_PAGE_SIZE", 100))
+REPORT_HTTP_TIMEOUT_SECONDS = float(os.environ.get("REPORT_HTTP_TIMEOUT_SECONDS", 15))
+SUPPORTED_REPORT_CHAINS = ("ethereum",)
+UPSTREAM_LOOKUPS = ("balance", "token_transfers")  # With the first history page; the scam database check is local
+
+
+class SingleFlightCache:
+    """
+    TTL cache where concurrent requests for a missing key share one computation: the first
+    caller computes the value, later callers wait for its result instead of repeating the
+    upstream calls. Only values accepted by `cacheable` are kept after the computation.
+    """
+
+    def __init__(self, ttl=REPORT_CACHE_TTL_SECONDS, max_entries=REPORT_CACHE_MAX_ENTRIES, cacheable=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cacheable = cacheable or (lambda value: True)
+        self._entries = {}  # key -> (expires_at, value)
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, compute):
+        """Returns (value, how) where how is "cache", "coalesced" or "computed"."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1], "cache"
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.result(), "coalesced"
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            flight.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            if self.cacheable(value):
+                if len(self._entries) >= self.max_entries:
+                    self._prune(now)
+                self._entries[key] = (time.time() + self.ttl, value)
+        flight.set_result(value)
+        return value, "computed"
+
+    def _prune(self, now):
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired or list(self._entries)[:max(1, len(self._entries) // 10)]:  # Oldest inserted first
+            del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def status(self):
+        return {"entries": len(self._entries), "in_flight": len(self._in_flight), "hits": self.hits,
+                "misses": self.misses, "coalesced": self.coalesced, "ttl_seconds": self.ttl}
+
+
+# --- Upstream lookups ---
+# Each returns {"status": "success", "data": ..., "source": ...} or an error dict like the monitoring service.
+
+_ETHERSCAN_SESSION = requests.Session()
+
+def etherscan_call(params):
+    """Calls the Etherscan API. An empty result list ("No transactions found") is a success."""
+    try:
+        response = _ETHERSCAN_SESSION.get(ETHERSCAN_API_URL, params=dict(params, apikey=ETHERSCAN_API_KEY),
+                                          timeout=REPORT_HTTP_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        data = response.json()
+    except requests.exceptions.RequestException as e:
+        return {"status": "error", "message": str(e), "source": "Etherscan"}
+    except ValueError:
+        return {"status": "error", "message": "Invalid JSON response from Etherscan.", "source": "Etherscan"}
+    result = data.get("result")
+    if data.get("status") == "1" or (isinstance(result, list) and not result):
+        return {"status": "success", "data": result, "source": "Etherscan"}
+    message = result if isinstance(result, str) else data.get("message", "Etherscan request failed.")
+    return {"status": "error", "message": message, "source": "Etherscan"}
+
+def fetch_balance(address):
+    result = eth_rpc_call("eth_getBalance", [address, "latest"])
+    if result["status"] != "success":
+        return result
+    try:
+        return dict(result, data=int(result["data"], 16) / WEI_PER_ETH)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": f"Invalid balance received: {result['data']}", "source": result["source"]}
+
+def fetch_transaction_page(address, page):
+    return etherscan_call({"module": "account", "action": "txlist", "address": address, "startblock": 0,
+                           "endblock": 99999999, "page": page, "offset": REPORT_TX_PAGE_SIZE, "sort": "desc"})
+
+def fetch_token_transfers(address):
+    return etherscan_call({"module": "account", "action": "tokentx", "address": address, "page": 1,
+                           "offset": REPORT_TX_PAGE_SIZE, "sort": "desc"})
+
+def check_scam_database(address):
+    return {"status": "success", "data": is_address_scam(address), "source": "Scam database"}
+
+def _as_rpc_transaction(tx):
+    """Converts an Etherscan txlist entry (decimal strings) to the JSON-RPC shape the detection rules read."""
+    converted = dict(tx)
+    for field in ("value", "blockNumber"):
+        try:
+            converted[field] = hex(int(tx.get(field) or 0))
+        except (TypeError, ValueError):
+            converted[field] = "0x0"
+    return converted
+
+
+_FANOUT_EXECUTOR = None
+_FANOUT_LOCK = threading.Lock()
+
+def _fanout_executor():
+    global _FANOUT_EXECUTOR
+    with _FANOUT_LOCK:
+        if _FANOUT_EXECUTOR is None:
+            _FANOUT_EXECUTOR = ThreadPoolExecutor(max_workers=REPORT_FANOUT_WORKERS, thread_name_prefix="report-fanout")
+        return _FANOUT_EXECUTOR
+
+def build_wallet_report(address, chain="ethereum"):
+    """
+    Builds a wallet report: balance, transaction history pages, token transfers and a
+    scam-database check are looked up concurrently, then the history is run through the
+    detection rules and scored. Failed lookups are listed in "errors" instead of failing
+    the whole report, unless every lookup failed.
+    """
+    executor = _fanout_executor()
+    lookups = {
+        "balance": executor.submit(fetch_balance, address),
+        "token_transfers": executor.submit(fetch_token_transfers, address),
+        "scam_database": executor.submit(check_scam_database, address),
+    }
+    pages = [executor.submit(fetch_transaction_page, address, page) for page in range(1, REPORT_TX_PAGES + 1)]
+    results = {name: future.result() for name, future in lookups.items()}
+    page_results = [future.result() for future in pages]
+
+    errors = [{"lookup": name, "message": result["message"], "source": result.get("source")}
+              for name, result in results.items() if result["status"] != "success"]
+    transactions = []
+    for page, result in enumerate(page_results, start=1):
+        if result["status"] != "success":
+            errors.append({"lookup": f"transactions_page_{page}", "message": result["message"], "source": result.get("source")})
+            break
+        transactions.extend(result["data"])
+        if len(result["data"]) < REPORT_TX_PAGE_SIZE:
+            break  # Last page reached; later pages are empty
+    upstream_failed = [results[name]["status"] != "success" for name in UPSTREAM_LOOKUPS] + [page_results[0]["status"] != "success"]
+    if all(upstream_failed):
+        return {"status": "error", "message": "All upstream lookups failed.", "errors": errors,
+                "source": ", ".join(sorted({error["source"] or "Unknown" for error in errors}))}
+
+    try:
+        findings = analyze_transactions_batch([_as_rpc_transaction(tx) for tx in transactions], chain)
+    except RuleError as e:
+        print(f"Wallet report analysis error for {address}: {e}")
+        return {"status": "error", "message": f"Analysis failed: {e}", "errors": errors, "source": "Rule engine"}
+    is_scam = results["scam_database"]["data"]
+    if is_scam:
+        findings.insert(0, {
+            "type": "interacts_with_known_scam_address",
+            "message": f"Address {address} is in the scam database",
+            "details": {"address": address},
+        })
+    for finding in findings:
+        finding.setdefault("details", {}).setdefault("chain", chain)
+    summary, risk_score = generate_overall_summary_and_risk(findings)
+
+    token_transfers = results["token_transfers"].get("data") or []
+    return {
+        "status": "success",
+        "message": f"Analyzed {len(transactions)} transactions for {address}.",
+        "source": "Etherscan + JSON-RPC",
+        "details": {
+            "address": address,
+            "chain": chain,
+            "balance_eth": results["balance"].get("data"),
+            "is_known_scam": is_scam,
+            "transactions_analyzed": len(transactions),
+            "token_transfer_count": len(token_transfers),
+            "tokens": sorted({tx.get("tokenSymbol") for tx in token_transfers if tx.get("tokenSymbol")}),
+            "risk_score": risk_score,
+            "summary": summary,
+            "findings": findings,
+            "errors": errors,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        },
+    }
+
+
+# Reports with failed lookups are not cached, so the next request retries them
+REPORT_CACHE = SingleFlightCache(cacheable=lambda report: report["status"] == "success" and not report["details"]["errors"])
+
+def get_wallet_report(address, chain="ethereum"):
+    """Returns the (possibly cached) wallet report, with "cache" set to cache, coalesced or computed."""
+    address = address.strip().lower()
+    report, how = REPORT_CACHE.get_or_compute((chain, address), lambda: build_wallet_report(address, chain))
+    return dict(report, cache=how)
@@ -1,17 +1,20 @@
 #!/home/ubuntu/crypto_investigator_app/venv/bin/python
 import os
+from bisect import bisect_right
 
 # --- Risk Scoring Configuration ---
 # Base scores for different types of suspicious activities
 RISK_SCORE_FACTORS = {
     "large_transfer": 20,  # Base score for any large transfer
+    "large_token_transfer": 20,  # Large ERC-20 transfer of a watched token (token_transfer_service)
     "interacts_with_known_scam_address": 70, # High risk
     "uses_mixer_service": 60, # e.g., Tornado Cash (detection logic to be added)
     "potential_rug_pull_token": 80, # (detection logic to be added)
     "honeypot_contract": 75, # (detection logic to be added)
-    "drained_wallet_activity": 50, # (detection logic to be added)
-    "unusual_transaction_pattern": 30, # (detection logic to be added)
+    "drained_wallet_activity": 50, # Rolling-window outflow tracking (address_activity_service)
+    "unusual_transaction_pattern": 30, # Transaction bursts / fan-out (address_activity_service)
     "newly_deployed_high_volume_token": 40, # Suspicious but needs more context
+    "tainted_funds_transfer": 45, # Funds traced from a known scam address (transaction_graph_service)
     # Add more factors as detection capabilities are built
 }
 
@@ -22,51 +25,124 @@ VALUE_MULTIPLIER_ETH = {
     1000: 1.5,   # 1000 ETH
     5000: 2.0    # 5000+ ETH
 }
+# Value multiplier tiers per currency. Amounts in other currencies (BNB, POL, BTC) are not
+# comparable to ETH tiers and are not scaled until tiers are added for them here.
+VALUE_MULTIPLIERS_BY_CURRENCY = {
+    "ETH": VALUE_MULTIPLIER_ETH,
+}
 
 # --- Summary Generation Templates ---
 SUMMARY_TEMPLATES = {
     "large_transfer": "A significantly large transfer of {value_eth:.2f} {currency} from {from_address} to {to_address} was detected on the {chain} blockchain. Transaction hash: {tx_hash}.",
+    "large_token_transfer": "A large transfer of {amount:,.2f} {token_symbol} from {from_address} to {to_address} was detected on the {chain} blockchain. Transaction hash: {tx_hash}.",
     "interacts_with_known_scam_address": "A transaction involving address {involved_address} (which is on a known scam list) was detected on the {chain} blockchain. Transaction hash: {tx_hash}. This is a high-risk activity.",
     "uses_mixer_service": "Address {address} appears to have interacted with a known mixer service ({mixer_name}) on the {chain} blockchain. Transaction hash: {tx_hash}. This could be an attempt to obscure transaction origins.",
-    "default_finding": "Suspicious activity of type 
-{finding_type}
- was detected on the {chain} blockchain. Details: {details_str}"
+    "drained_wallet_activity": "Address {address} sent {outflow_eth:.2f} {currency} in {tx_count} transactions to {distinct_counterparties} address(es) within {window_blocks} blocks on the {chain} blockchain, a pattern consistent with a drained wallet. Transaction hash: {tx_hash}.",
+    "unusual_transaction_pattern": "Address {address} sent {tx_count} transactions to {distinct_counterparties} distinct addresses within {window_blocks} blocks on the {chain} blockchain, which is unusual activity. Transaction hash: {tx_hash}.",
+    "tainted_funds_transfer": "Address {address} moved {value_eth:.2f} {currency} on the {chain} blockchain after receiving funds {hops} hop(s) away from known scam address {source_scam_address}. Transaction hash: {tx_hash}.",
+    "default_finding": "Suspicious activity of type '{finding_type}' was detected on the {chain} blockchain. Details: {details_str}"
 }
 
-def calculate_risk_score(findings):
+# Finding types whose score is scaled by the transferred value (VALUE_MULTIPLIERS_BY_CURRENCY)
+VALUE_SCALED_FINDING_TYPES = {"large_transfer"}
+# Finding types whose score decays with the distance ("hops") from the flagged source
+HOP_DECAYED_FINDING_TYPES = {"tainted_funds_transfer"}
+HOP_DECAY = 0.7  # Score multiplier per hop beyond the first
+DEFAULT_RISK_SCORE = 10 # Default score for unknown types
+MAX_RISK_SCORE = 100
+
+
+class RiskScorer:
     """
-    Calculates a risk score based on a list of findings.
-    Each finding is a dictionary with at least a 
-'type'
- and 
-'details'
- key.
+    Risk scoring compiled from RISK_SCORE_FACTORS and VALUE_MULTIPLIERS_BY_CURRENCY. The
+    multiplier tiers are sorted once, so each value-scaled finding costs one bisect instead
+    of a sort. `value_multipliers` maps a currency to its {threshold: multiplier} tiers.
     """
-    total_risk_score = 0
-    if not findings:
-        return 0
 
-    for finding in findings:
+    def __init__(self, factors=None, value_multipliers=None, value_scaled_types=None, default_score=DEFAULT_RISK_SCORE,
+                 hop_decayed_types=None, hop_decay=HOP_DECAY):
+        self.factors = dict(RISK_SCORE_FACTORS if factors is None else factors)
+        self.tiers = {}  # currency -> (sorted thresholds, multipliers)
+        for currency, multipliers in (VALUE_MULTIPLIERS_BY_CURRENCY if value_multipliers is None else value_multipliers).items():
+            tiers = sorted(multipliers.items())
+            self.tiers[currency] = ([threshold for threshold, _ in tiers], [multiplier for _, multiplier in tiers])
+        self.value_scaled_types = frozenset(VALUE_SCALED_FINDING_TYPES if value_scaled_types is None else value_scaled_types)
+        self.default_score = default_score
+        self.hop_decayed_types = frozenset(HOP_DECAYED_FINDING_TYPES if hop_decayed_types is None else hop_decayed_types)
+        self.hop_decay = hop_decay
+
+    def value_multiplier(self, value, currency="ETH"):
+        """
+        Multiplier of the highest tier of `currency` whose threshold `value` reaches
+        (1.0 below all tiers, or for a currency without tiers).
+        """
+        tiers = self.tiers.get(currency)
+        if tiers is None:
+            return 1.0
+        thresholds, multipliers = tiers
+        i = bisect_right(thresholds, value or 0) - 1
+        return multipliers[i] if i >= 0 else 1.0
+
+    def finding_score(self, finding):
+        """Uncapped score of a single finding."""
         finding_type = finding.get("type")
-        details = finding.get("details", {})
-        base_score = RISK_SCORE_FACTORS.get(finding_type, 10) # Default score for unknown types
-
-        # Apply multipliers or adjustments based on details
-        if finding_type == "large_transfer":
-            value_eth = details.get("value_eth", 0)
-            multiplier = 1.0
-            for threshold, mult in sorted(VALUE_MULTIPLIER_ETH.items(), reverse=True):
-                if value_eth >= threshold:
-                    multiplier = mult
-                    break
-            base_score *= multiplier
-        
+        base_score = self.factors.get(finding_type, self.default_score)
+        if finding_type in self.value_scaled_types:
+            details = finding.get("details", {})
+            # value_eth is in the chain's native currency; findings without a currency predate other chains
+            base_score *= self.value_multiplier(details.get("value_eth", 0), details.get("currency") or "ETH")
+        if finding_type in self.hop_decayed_types:
+            base_score *= self.hop_decay ** max(0, (finding.get("details", {}).get("hops") or 1) - 1)
         # Add other specific adjustments here
+        return base_score
 
-        total_risk_score += base_score
-    
-    # Cap score at 100
-    return min(int(total_risk_score), 100)
+    def score(self, findings):
+        """Total score of the findings, capped at MAX_RISK_SCORE."""
+        if not findings:
+            return 0
+        finding_score = self.finding_score
+        return min(int(sum(finding_score(finding) for finding in findings)), MAX_RISK_SCORE)
+
+    def score_batch(self, findings, group_by="transaction"):
+        """
+        Scores many findings in one pass and returns {group key: capped score}. group_by is
+        "transaction" (tx hash) or "address" (every address a finding involves).
+        """
+        totals = {}
+        finding_score = self.finding_score
+        for finding in findings:
+            details = finding.get("details", {})
+            if group_by == "transaction":
+                keys = (details.get("hash") or details.get("transaction_hash"),)
+            elif group_by == "address":
+                keys = {address.lower() for address in (details.get("address"), details.get("interacting_address"),
+                                                        details.get("from"), details.get("to")) if address}
+            else:
+                raise ValueError(f"Unsupported group_by: {group_by}")
+            score = finding_score(finding)
+            for key in keys:
+                totals[key] = totals.get(key, 0) + score
+        return {key: min(int(total), MAX_RISK_SCORE) for key, total in totals.items()}
+
+
+RISK_SCORER = RiskScorer()
+
+def compile_risk_scoring():
+    """Recompiles the scorer after RISK_SCORE_FACTORS or VALUE_MULTIPLIERS_BY_CURRENCY are changed at runtime."""
+    global RISK_SCORER
+    RISK_SCORER = RiskScorer()
+    return RISK_SCORER
+
+def calculate_risk_score(findings):
+    """
+    Calculates a risk score based on a list of findings.
+    Each finding is a dictionary with at least a 'type' and 'details' key.
+    """
+    return RISK_SCORER.score(findings)
+
+def calculate_risk_scores_batch(findings, group_by="transaction"):
+    """Scores many findings at once, grouped per transaction or per address. See RiskScorer.score_batch."""
+    return RISK_SCORER.score_batch(findings, group_by)
 
 def generate_summary_for_finding(finding):
     """
@@ -75,14 +151,14 @@ def generate_summary_for_finding(finding):
     finding_type = finding.get("type")
     details = finding.get("details", {})
     chain = details.get("chain", "UnknownChain").upper()
-    currency = "ETH" if chain == "ETHEREUM" else "tokens/native currency" # Basic currency assumption
+    currency = details.get("currency") or ("ETH" if chain == "ETHEREUM" else "tokens/native currency")
 
     template = SUMMARY_TEMPLATES.get(finding_type, SUMMARY_TEMPLATES["default_finding"])
     
-    # Prepare details for formatting
+    # Prepare details for formatting (str(details) is only built for templates that show it)
     format_params = {
         "finding_type": finding_type,
-        "details_str": str(details),
+        "details_str": str(details) if "{details_str}" in template else "",
         "chain": chain,
         "currency": currency,
         "value_eth": details.get("value_eth"),
@@ -91,7 +167,15 @@ def generate_summary_for_finding(finding):
         "tx_hash": details.get("hash", details.get("transaction_hash")),
         "involved_address": details.get("address", details.get("interacting_address")),
         "mixer_name": details.get("mixer_name", "Unknown Mixer"),
-        "address": details.get("address")
+        "address": details.get("address"),
+        "outflow_eth": details.get("outflow_eth"),
+        "tx_count": details.get("tx_count"),
+        "distinct_counterparties": details.get("distinct_counterparties"),
+        "window_blocks": details.get("window_blocks"),
+        "hops": details.get("hops"),
+        "source_scam_address": details.get("source_scam_address"),
+        "amount": details.get("amount"),
+        "token_symbol": details.get("token_symbol")
     }
 
     try:
@@ -103,6 +187,28 @@ def generate_summary_for_finding(finding):
         print(f"Error generating summary: {e}")
         return f"Error generating summary for finding type {finding_type}."
 
+SUMMARY_SEPARATOR = "\n\n---\n\n"
+
+def iter_overall_summary(all_findings, score=None):
+    """
+    Generator version of generate_overall_summary_and_risk: yields the report piece by piece
+    (risk score header first, then one summary per finding) so large reports can be streamed
+    without building the whole string. `all_findings` must be a sequence, since the header
+    needs the risk score before any summary is produced. Pass `score` if it is already known.
+    """
+    if not all_findings:
+        yield "No suspicious activities detected by current rules."
+        return
+
+    # Add a header with the overall risk score
+    if score is None:
+        score = calculate_risk_score(all_findings)
+    yield f"**Overall Risk Score: {score}/100**\n\n"
+    for i, finding in enumerate(all_findings):
+        if i:
+            yield SUMMARY_SEPARATOR
+        yield generate_summary_for_finding(finding)
+
 def generate_overall_summary_and_risk(all_findings):
     """
     Generates an overall summary and calculates a final risk score for a list of findings 
@@ -112,18 +218,7 @@ def generate_overall_summary_and_risk(all_findings):
         return "No suspicious activities detected by current rules.", 0
 
     overall_risk_score = calculate_risk_score(all_findings)
-    
-    summaries = []
-    for finding in all_findings:
-        summaries.append(generate_summary_for_finding(finding))
-    
-    # Combine summaries into a single report
-    # For now, just join them. Could be more sophisticated.
-    combined_summary = "\n\n---\n\n".join(summaries)
-    
-    # Add a header with the overall risk score
-    final_report_summary = f"**Overall Risk Score: {overall_risk_score}/100**\n\n{combined_summary}"
-    
+    final_report_summary = "".join(iter_overall_summary(all_findings, overall_risk_score))
     return final_report_summary, overall_risk_score
 
 # Example Usage (can be called from monitoring_service.py or report_routes.py):
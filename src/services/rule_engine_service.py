@@ -0,0 +1,134 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+# --- Pluggable detection rule engine ---
+# Rules register for the chains they apply to and declare the transaction fields they need.
+# The registry is compiled once into a per-chain dispatch table ordered by cost, so each
+# batch of transactions only runs the rules for its chain, each rule only sees the rows
+# that carry its fields, and cheap rules run (and can short-circuit) before expensive ones.
+import time
+
+from src.services.metrics_service import register_collector
+
+class RuleError(RuntimeError):
+    """
+    Raised when a rule fails on a batch. The batch's findings are incomplete, so callers must
+    not treat its transactions as analyzed (e.g. must not checkpoint the block).
+    """
+
+    def __init__(self, rule_name, error):
+        super().__init__(f"Rule {rule_name} failed: {error}")
+        self.rule_name = rule_name
+
+
+class Rule:
+    """
+    A detection rule evaluated over a batch of transactions.
+
+    evaluate(batch, rows) returns (row, finding) pairs for the given row indices.
+    fields:        transaction fields the rule reads; rows missing any of them are skipped.
+    cost:          relative evaluation cost; rules run cheapest first.
+    gate:          optional cheap prefilter gate(batch, rows) -> rows, run before evaluate.
+    short_circuit: if True, rows this rule matched are not passed to costlier rules.
+    """
+
+    def __init__(self, name, evaluate, chains=None, fields=(), cost=10, gate=None, short_circuit=False):
+        self.name = name
+        self.evaluate = evaluate
+        self.chains = tuple(chains) if chains else None  # None = every chain
+        self.fields = tuple(fields)
+        self.cost = cost
+        self.gate = gate
+        self.short_circuit = short_circuit
+        # Counters exported by _rule_metrics. Plain attributes rather than histograms: they are
+        # updated per rule per batch, and for single transactions that is the hot path.
+        self.evaluations = 0
+        self.rows_evaluated = 0
+        self.findings_count = 0
+        self.errors = 0
+        self.seconds_total = 0.0
+
+    def applies_to(self, chain):
+        return self.chains is None or chain in self.chains
+
+
+RULES = []
+_DISPATCH_TABLE = {}
+
+def register_rule(name, chains=None, fields=(), cost=10, gate=None, short_circuit=False):
+    """Decorator registering a batch rule function with the engine."""
+    def decorator(evaluate):
+        RULES[:] = [rule for rule in RULES if rule.name != name]  # Re-registering replaces a rule
+        RULES.append(Rule(name, evaluate, chains, fields, cost, gate, short_circuit))
+        _DISPATCH_TABLE.clear()
+        return evaluate
+    return decorator
+
+@register_collector
+def _rule_metrics():
+    rules = list(RULES)
+    yield "rule_evaluations_total", "counter", "Batches a rule was evaluated on.", [({"rule": rule.name}, rule.evaluations) for rule in rules]
+    yield "rule_evaluation_seconds_total", "counter", "Time spent in a rule's gate and evaluation.", [
+        ({"rule": rule.name}, rule.seconds_total) for rule in rules]
+    yield "rule_rows_total", "counter", "Transactions passed to a rule's gate or evaluation.", [
+        ({"rule": rule.name}, rule.rows_evaluated) for rule in rules]
+    yield "rule_findings_total", "counter", "Findings produced by a rule.", [({"rule": rule.name}, rule.findings_count) for rule in rules]
+    yield "rule_errors_total", "counter", "Rule evaluations that raised.", [({"rule": rule.name}, rule.errors) for rule in rules]
+
+def unregister_rule(name):
+    RULES[:] = [rule for rule in RULES if rule.name != name]
+    _DISPATCH_TABLE.clear()
+
+def rules_for_chain(chain):
+    """Returns the compiled, cost-ordered rules for a chain (built once per chain)."""
+    rules = _DISPATCH_TABLE.get(chain)
+    if rules is None:
+        # sorted() is stable, so rules of equal cost keep their registration order
+        rules = _DISPATCH_TABLE[chain] = sorted((rule for rule in RULES if rule.applies_to(chain)), key=lambda rule: rule.cost)
+    return rules
+
+def evaluate_rules(batch, chain):
+    """
+    Runs the chain's rules over a batch. The batch must provide len() and rows_with(field),
+    the sorted row indices whose transaction carries that field. Returns (row, finding)
+    pairs ordered by row, then by rule cost. Raises RuleError if a rule raises.
+    """
+    rules = rules_for_chain(chain)
+    if not rules or not len(batch):
+        return []
+
+    all_rows = range(len(batch))
+    settled = set()  # Rows matched by a short-circuiting rule
+    candidates_by_fields = {}
+    indexed_findings = []
+    for rule in rules:
+        rows = candidates_by_fields.get(rule.fields)
+        if rows is None:
+            rows = all_rows
+            for field in rule.fields:
+                present = batch.rows_with(field)
+                rows = present if rows is all_rows else sorted(set(rows).intersection(present))
+            rows = candidates_by_fields[rule.fields] = list(rows)
+        if settled:
+            rows = [row for row in rows if row not in settled]
+        if not rows:
+            continue
+        rule.evaluations += 1
+        rule.rows_evaluated += len(rows)
+        started = time.perf_counter()
+        try:
+            if rule.gate is not None:
+                rows = rule.gate(batch, rows)
+            matches = rule.evaluate(batch, rows) if rows else []
+        except Exception as e:
+            rule.errors += 1
+            raise RuleError(rule.name, e) from e
+        finally:
+            rule.seconds_total += time.perf_counter() - started
+        if not matches:
+            continue
+        rule.findings_count += len(matches)
+        indexed_findings.extend(matches)
+        if rule.short_circuit:
+            settled.update(row for row, _ in matches)
+
+    indexed_findings.sort(key=lambda item: item[0])  # Stable: cost order is kept within a transaction
+    return indexed_findings
@@ -1,107 +1,590 @@
 #!/home/ubuntu/crypto_investigator_app/venv/bin/python
 import os
 import csv
+import hashlib
+import math
+import mmap
+import struct
+import threading
+import time
+from bisect import bisect_left
+
+from src.services.metrics_service import counter, histogram, register_collector
 
 # Path to the local scam database file (e.g., a CSV)
 # This file would need to be created and maintained, possibly through scraping or manual updates.
 SCAM_DB_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "scam_database.csv") # Assuming a data directory at the root
+# Compact binary index built from the CSV (see build_scam_index / src/import_scam_database.py)
+SCAM_INDEX_FILE_PATH = os.environ.get("SCAM_INDEX_FILE_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "scam_index.bin"))
+# Bloom filter over every indexed address; negative lookups are answered from it alone
+SCAM_BLOOM_FILE_PATH = os.environ.get("SCAM_BLOOM_FILE_PATH", os.path.join(os.path.dirname(SCAM_INDEX_FILE_PATH), "scam_bloom.bin"))
+BLOOM_FALSE_POSITIVE_RATE = float(os.environ.get("BLOOM_FALSE_POSITIVE_RATE", 0.01))
+# The CSV is an append-only log: rows with action "delete" are tombstones for an address
+CSV_HEADER = ["address", "chain", "category", "source_url", "action"]
+TOMBSTONE_ACTION = "delete"
 
-# In-memory cache of scam addresses for faster lookups
-SCAM_ADDRESSES_CACHE = set()
+# Current database state (see ScamDbState); replaced as a whole so readers never see a partial update
+SCAM_DB = None
 LAST_LOAD_TIME = 0
-CACHE_TTL = 3600 # Reload cache every hour, for example
+CACHE_TTL = float(os.environ.get("SCAM_DB_REFRESH_INTERVAL", 2)) # Seconds between checks for rows appended by other processes
+# Failed loads in a row; while no database is loaded, lookups retry after a doubling delay capped at this many seconds
+LOAD_FAILURES = 0
+LOAD_RETRY_MAX_INTERVAL = float(os.environ.get("SCAM_DB_RETRY_MAX_INTERVAL", 300))
+_REFRESH_LOCK = threading.Lock()
+
+LOOKUP_STATS = {"hit": 0, "miss": 0, "bloom_positive": 0, "bloom_negative": 0}  # Exported by _scam_database_metrics
+SCAM_DB_RELOADS = counter("scam_db_reloads_total", "Scam database loads and incremental refreshes.", ("kind", "result"))
+SCAM_DB_RELOAD_SECONDS = histogram("scam_db_reload_duration_seconds", "Duration of successful scam database reloads.", ("kind",))
+
+# --- Index file format ---
+# header:  magic (8 bytes) | record count (uint64) | extras length (uint64)
+#          | CSV bytes covered (uint64) | CSV inode (uint64)
+# fanout:  65537 uint32, fanout[p] = index of the first record whose 2-byte prefix is >= p
+# records: count sorted, unique 20-byte binary EVM addresses
+# extras:  newline-separated lowercase addresses that are not 20-byte hex (e.g. Bitcoin)
+INDEX_MAGIC = b"SCAMIDX1"
+INDEX_HEADER = struct.Struct("<8sQQQQ")
+FANOUT_SIZE = 65536
+FANOUT = struct.Struct(f"<{FANOUT_SIZE + 1}I")
+RECORD_SIZE = 20
+
+def address_key(address):
+    """
+    Normalizes an address for lookups: 20 raw bytes for 0x-prefixed EVM addresses,
+    otherwise the stripped, lowercased string. Returns None for empty input.
+    """
+    if not address:
+        return None
+    address = address.strip()
+    if len(address) == 42 and address[:2] in ("0x", "0X"):
+        try:
+            key = bytes.fromhex(address[2:])
+            if len(key) == RECORD_SIZE:  # fromhex skips whitespace, so a shorter result is not an address
+                return key
+        except ValueError:
+            pass
+    return address.lower() or None
+
+
+def _csv_columns(header_row):
+    header = [column.strip().lower() for column in header_row]
+    address_column = header.index("address") if "address" in header else 0
+    # Files created before the action column existed may still carry it as a trailing field
+    action_column = header.index("action") if "action" in header else len(header)
+    return address_column, action_column
+
+
+class CsvLogReader:
+    """
+    Reads scam database rows from a byte offset onwards. Only complete lines are consumed, so
+    a row that is still being appended is picked up on the next read; `offset` is the position
+    after the last consumed line.
+    """
+
+    def __init__(self, path, start_offset=0):
+        self.path = path
+        self.offset = start_offset
+        self.inode = None
+
+    def _lines(self, f):
+        while True:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break
+            self.offset += len(line)
+            yield line.decode("utf-8", "replace")
+
+    def entries(self):
+        """Yields (address_key, is_tombstone) for each row with an address."""
+        with open(self.path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            header_line = f.readline()
+            if not header_line.endswith(b"\n"):
+                return
+            address_column, action_column = _csv_columns(next(csv.reader([header_line.decode("utf-8", "replace")])))
+            self.offset = max(self.offset, len(header_line))
+            f.seek(self.offset)
+            for row in csv.reader(self._lines(f)):
+                key = address_key(row[address_column]) if len(row) > address_column else None
+                if key is None:
+                    continue
+                action = row[action_column].strip().lower() if len(row) > action_column else ""
+                yield key, action == TOMBSTONE_ACTION
+
+
+class _RecordView:
+    """Sequence view over the sorted records so bisect can search the mmap in place."""
+
+    __slots__ = ("buffer", "offset")
+
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        self.offset = offset
+
+    def __getitem__(self, i):
+        start = self.offset + i * RECORD_SIZE
+        return self.buffer[start:start + RECORD_SIZE]
+
+
+class ScamAddressIndex:
+    """
+    Read-only, memory-mapped scam address index. EVM addresses are stored as sorted 20-byte
+    records with a 2-byte prefix fanout table, so a lookup is a binary search within one small
+    bucket and the records themselves stay in the (shared) page cache rather than as str objects.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, extras_length, self.csv_offset, self.csv_inode = INDEX_HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a scam address index.")
+        self._fanout = FANOUT.unpack_from(self._mmap, INDEX_HEADER.size)
+        self._records_offset = INDEX_HEADER.size + FANOUT.size
+        self._records = _RecordView(self._mmap, self._records_offset)
+        extras_offset = self._records_offset + self.count * RECORD_SIZE
+        extras = self._mmap[extras_offset:extras_offset + extras_length].decode("utf-8")
+        self.extras = frozenset(extras.split("\n")) if extras else frozenset()
+
+    def __len__(self):
+        return self.count + len(self.extras)
+
+    def __contains__(self, key):
+        if not isinstance(key, bytes):
+            return key in self.extras
+        prefix = (key[0] << 8) | key[1]
+        lo, hi = self._fanout[prefix], self._fanout[prefix + 1]
+        if lo == hi:
+            return False
+        i = bisect_left(self._records, key, lo, hi)
+        return i < hi and self._records[i] == key
+
+    def close(self):
+        self._mmap.close()
+
+
+BLOOM_MAGIC = b"SCAMBLM1"
+# header: magic | bit count | hash count | entry count | index record count | index mtime
+BLOOM_HEADER = struct.Struct("<8sQIQQd")
+
+def _bloom_hashes(key):
+    if isinstance(key, bytes):
+        # EVM addresses are already the tail of a keccak hash, so their bytes are used directly
+        return int.from_bytes(key[4:12], "little"), int.from_bytes(key[12:20], "little") | 1
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    """
+    Bloom filter over address keys (see address_key). The bit count is a power of two and
+    bit positions come from double hashing, so a negative check usually stops after one or
+    two bit tests.
+    """
+
+    def __init__(self, num_bits, num_hashes, bits=None, count=0):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.mask = num_bits - 1
+        self.bits = bits if bits is not None else bytearray(num_bits // 8)
+        self.count = count
+
+    @classmethod
+    def for_capacity(cls, capacity, false_positive_rate=BLOOM_FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1000)
+        optimal_bits = -capacity * math.log(false_positive_rate) / (math.log(2) ** 2)
+        num_bits = 1 << max(13, math.ceil(math.log2(optimal_bits)))
+        num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+        return cls(num_bits, num_hashes)
+
+    def add(self, key):
+        h1, h2 = _bloom_hashes(key)
+        bits, mask = self.bits, self.mask
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) & mask
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        h1, h2 = _bloom_hashes(key)
+        bits, mask = self.bits, self.mask
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) & mask
+            if not (bits[position >> 3] >> (position & 7)) & 1:
+                return False
+        return True
+
+    def contains_many(self, keys):
+        """Membership test for many keys (None -> False) with the loop state kept local."""
+        bits, mask, num_hashes = self.bits, self.mask, self.num_hashes
+        from_bytes = int.from_bytes
+        results = []
+        for key in keys:
+            if key is None:
+                results.append(False)
+                continue
+            if isinstance(key, bytes):
+                h1, h2 = from_bytes(key[4:12], "little"), from_bytes(key[12:20], "little") | 1
+            else:
+                h1, h2 = _bloom_hashes(key)
+            found = True
+            for i in range(num_hashes):
+                position = (h1 + i * h2) & mask
+                if not (bits[position >> 3] >> (position & 7)) & 1:
+                    found = False
+                    break
+            results.append(found)
+        return results
+
+    @classmethod
+    def from_index(cls, index, extra_keys=()):
+        bloom = cls.for_capacity(len(index) + len(extra_keys))
+        records = index._records
+        for i in range(index.count):
+            bloom.add(records[i])
+        for key in index.extras:
+            bloom.add(key)
+        for key in extra_keys:
+            bloom.add(key)
+        return bloom
+
+    def save(self, path, index):
+        """Atomically writes the filter, tagged with the index it was built from."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.num_bits, self.num_hashes, self.count, index.count, index.mtime))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, index):
+        """Loads a saved filter, or returns None if it is missing or was built from another index."""
+        try:
+            with open(path, "rb") as f:
+                header = f.read(BLOOM_HEADER.size)
+                magic, num_bits, num_hashes, count, index_count, index_mtime = BLOOM_HEADER.unpack(header)
+                if magic != BLOOM_MAGIC or index_count != index.count or index_mtime != index.mtime:
+                    return None
+                bits = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+        if num_bits & (num_bits - 1) or len(bits) != num_bits // 8:
+            return None
+        return cls(num_bits, num_hashes, bits, count)
+
+
+def build_scam_index(csv_path=None, index_path=None):
+    """
+    Builds the binary scam address index from the CSV database and atomically replaces
+    index_path. Records are bucketed by prefix while reading, so peak memory stays close
+    to 20 bytes per address even for multi-million-entry lists. Tombstoned addresses are
+    left out. Returns the entry count.
+    """
+    csv_path = csv_path or SCAM_DB_FILE_PATH
+    index_path = index_path or SCAM_INDEX_FILE_PATH
+    buckets = [bytearray() for _ in range(FANOUT_SIZE)]
+    extras = set()
+    deleted = set()  # EVM keys whose latest row is a tombstone
+    reader = CsvLogReader(csv_path)
+    for key, is_tombstone in reader.entries():
+        if not isinstance(key, bytes):
+            if is_tombstone:
+                extras.discard(key)
+            else:
+                extras.add(key)
+        elif is_tombstone:
+            deleted.add(key)
+        else:
+            deleted.discard(key)
+            buckets[(key[0] << 8) | key[1]] += key
+
+    fanout = [0] * (FANOUT_SIZE + 1)
+    records = []
+    count = 0
+    for prefix, bucket in enumerate(buckets):
+        fanout[prefix] = count
+        if bucket:
+            unique = {bytes(bucket[i:i + RECORD_SIZE]) for i in range(0, len(bucket), RECORD_SIZE)}
+            unique = sorted(unique - deleted if deleted else unique)
+            records.append(b"".join(unique))
+            count += len(unique)
+            buckets[prefix] = None  # Free each bucket as soon as it is written out
+    fanout[FANOUT_SIZE] = count
+    extras_blob = "\n".join(sorted(extras)).encode("utf-8")
+
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, count, len(extras_blob), reader.offset, reader.inode or 0))
+        f.write(FANOUT.pack(*fanout))
+        for chunk in records:
+            f.write(chunk)
+        f.write(extras_blob)
+    os.replace(tmp_path, index_path)
+    return count + len(extras)
+
+
+class ScamDbState:
+    """
+    Snapshot of the scam database: the mapped index and its Bloom filter, plus the adds and
+    tombstones from CSV rows appended after the index was built (up to csv_offset).
+    """
+
+    __slots__ = ("index", "bloom", "added", "deleted", "csv_offset", "csv_inode")
+
+    def __init__(self, index, bloom, added, deleted, csv_offset, csv_inode):
+        self.index = index
+        self.bloom = bloom
+        self.added = added
+        self.deleted = deleted
+        self.csv_offset = csv_offset
+        self.csv_inode = csv_inode
+
+    def __len__(self):
+        new_keys = sum(1 for key in self.added if key not in self.index)
+        removed_keys = sum(1 for key in self.deleted if key in self.index)
+        return len(self.index) + new_keys - removed_keys
+
+    def contains(self, key):
+        # The Bloom filter also covers the appended adds, so a miss there is final
+        if key is None or key not in self.bloom or key in self.deleted:
+            return False
+        return key in self.added or key in self.index
+
+    def apply_appended_rows(self, csv_path):
+        """Returns a new state with the rows appended since csv_offset applied."""
+        reader = CsvLogReader(csv_path, self.csv_offset)
+        added, deleted = set(self.added), set(self.deleted)
+        new_rows = 0
+        for key, is_tombstone in reader.entries():
+            new_rows += 1
+            if is_tombstone:
+                deleted.add(key)
+                added.discard(key)
+            else:
+                added.add(key)
+                deleted.discard(key)
+                self.bloom.add(key)  # A superset is harmless, so the shared filter is updated in place
+        if not new_rows:
+            return self
+        return ScamDbState(self.index, self.bloom, added, deleted, reader.offset, self.csv_inode)
+
+
+def _create_empty_database():
+    # Ensure the /data directory exists and create scam_database.csv with headers
+    data_dir = os.path.dirname(SCAM_DB_FILE_PATH)
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+        print(f"Created data directory: {data_dir}")
+    with open(SCAM_DB_FILE_PATH, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+    print(f"Created empty scam database file: {SCAM_DB_FILE_PATH}")
+
+def _swap_state(new_state):
+    # The old index is not closed here: lookups on other threads may still hold the old state.
+    # Its mmap is unmapped once the last of them drops it.
+    global SCAM_DB
+    SCAM_DB = new_state
 
 def load_scam_database():
-    """Loads scam addresses from the local CSV file into an in-memory set."""
-    global SCAM_ADDRESSES_CACHE, LAST_LOAD_TIME
-    current_time = time.time()
+    """
+    Maps the binary scam address index and replays CSV rows appended after it was built.
+    The index is rebuilt from the CSV only when it is missing or the CSV was rewritten
+    (a different file or shorter than the index covers); otherwise loading is an mmap
+    plus the appended tail.
+    """
+    global LAST_LOAD_TIME, LOAD_FAILURES
+    LAST_LOAD_TIME = time.time()
+    started = time.perf_counter()
 
     if not os.path.exists(SCAM_DB_FILE_PATH):
         print(f"Warning: Scam database file not found at {SCAM_DB_FILE_PATH}")
-        SCAM_ADDRESSES_CACHE = set() # Ensure cache is empty if file doesn't exist
-        LAST_LOAD_TIME = current_time
-        return
-
-    # Reload if cache is empty or TTL has expired
-    if not SCAM_ADDRESSES_CACHE or (current_time - LAST_LOAD_TIME > CACHE_TTL):
-        print(f"Loading scam database from {SCAM_DB_FILE_PATH}...")
-        temp_cache = set()
         try:
-            # Ensure the /data directory exists
-            data_dir = os.path.dirname(SCAM_DB_FILE_PATH)
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir)
-                print(f"Created data directory: {data_dir}")
-                # Create an empty scam_database.csv if it doesn't exist after creating the directory
-                with open(SCAM_DB_FILE_PATH, "w", newline=
-"" ) as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["address", "chain", "category", "source_url"])
-                print(f"Created empty scam database file: {SCAM_DB_FILE_PATH}")
-
-            with open(SCAM_DB_FILE_PATH, "r", newline=
-"" ) as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    address = row.get("address")
-                    if address:
-                        temp_cache.add(address.lower()) # Store addresses in lowercase for consistent matching
-            SCAM_ADDRESSES_CACHE = temp_cache
-            LAST_LOAD_TIME = current_time
-            print(f"Scam database loaded: {len(SCAM_ADDRESSES_CACHE)} entries.")
-        except FileNotFoundError:
-            print(f"Error: Scam database file not found at {SCAM_DB_FILE_PATH}. Creating an empty one.")
-            SCAM_ADDRESSES_CACHE = set()
-            # Create an empty file with headers if it was not found
+            _create_empty_database()
+        except Exception as e_create:
+            print(f"Could not create empty scam database file: {e_create}")
+            LOAD_FAILURES += 1
+            return
+
+    try:
+        csv_stat = os.stat(SCAM_DB_FILE_PATH)
+        index = ScamAddressIndex(SCAM_INDEX_FILE_PATH) if os.path.exists(SCAM_INDEX_FILE_PATH) else None
+        if index is None or index.csv_inode != csv_stat.st_ino or index.csv_offset > csv_stat.st_size:
+            if index is not None:
+                index.close()
+            print(f"Building scam address index from {SCAM_DB_FILE_PATH}...")
+            build_scam_index()
+            index = ScamAddressIndex(SCAM_INDEX_FILE_PATH)
+
+        bloom = BloomFilter.load(SCAM_BLOOM_FILE_PATH, index)
+        if bloom is None:
+            print("Building scam address Bloom filter...")
+            bloom = BloomFilter.from_index(index)
+            bloom.save(SCAM_BLOOM_FILE_PATH, index)
+
+        state = ScamDbState(index, bloom, set(), set(), index.csv_offset, index.csv_inode)
+        _swap_state(state.apply_appended_rows(SCAM_DB_FILE_PATH))
+        LOAD_FAILURES = 0
+        print(f"Scam database loaded: {len(SCAM_DB)} entries.")
+        SCAM_DB_RELOADS.labels("full", "success").inc()
+        SCAM_DB_RELOAD_SECONDS.labels("full").observe(time.perf_counter() - started)
+    except Exception as e:
+        print(f"Error loading scam database: {e}")
+        LOAD_FAILURES += 1
+        SCAM_DB_RELOADS.labels("full", "error").inc()
+        # Keep serving lookups from the previously loaded state, if any
+
+def refresh_scam_database(blocking=False):
+    """
+    Brings the loaded database up to date: applies only the CSV rows appended since the last
+    refresh, and falls back to a full load if the index was rebuilt or the CSV rewritten.
+    """
+    global LAST_LOAD_TIME
+    if not _REFRESH_LOCK.acquire(blocking=blocking):
+        return  # Another thread is already refreshing; keep using the current state
+    try:
+        LAST_LOAD_TIME = time.time()
+        state = SCAM_DB
+        if state is None:
+            load_scam_database()
+            return
+        try:
+            csv_stat = os.stat(SCAM_DB_FILE_PATH)
+            index_mtime = os.path.getmtime(SCAM_INDEX_FILE_PATH)
+        except OSError as e:
+            print(f"Error checking scam database for updates: {e}")
+            return
+        if index_mtime != state.index.mtime or csv_stat.st_ino != state.csv_inode or csv_stat.st_size < state.csv_offset:
+            load_scam_database()
+        elif csv_stat.st_size > state.csv_offset:
+            started = time.perf_counter()
             try:
-                with open(SCAM_DB_FILE_PATH, "w", newline=
-"" ) as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["address", "chain", "category", "source_url"])
-            except Exception as e_create:
-                print(f"Could not create empty scam database file: {e_create}")
-        except Exception as e:
-            print(f"Error loading scam database: {e}")
-            # Potentially clear cache or use stale data based on policy
-            # SCAM_ADDRESSES_CACHE = set() # Clearing cache on error
+                _swap_state(state.apply_appended_rows(SCAM_DB_FILE_PATH))
+            except Exception as e:
+                print(f"Error applying scam database updates: {e}")
+                SCAM_DB_RELOADS.labels("incremental", "error").inc()
+                return
+            SCAM_DB_RELOADS.labels("incremental", "success").inc()
+            SCAM_DB_RELOAD_SECONDS.labels("incremental").observe(time.perf_counter() - started)
+    finally:
+        _REFRESH_LOCK.release()
+
+def ensure_scam_database_loaded():
+    """
+    Loads the database unless it already is. Importing this module does no I/O; the first
+    lookup (or the app's warm-up) loads it, and concurrent first lookups share one load.
+    Returns True if a database is loaded.
+    """
+    if SCAM_DB is None:
+        with _REFRESH_LOCK:
+            if SCAM_DB is None:
+                load_scam_database()
+    return SCAM_DB is not None
+
+def scam_database_status():
+    state = SCAM_DB
+    return {"loaded": state is not None, "entries": len(state) if state is not None else 0}
+
+@register_collector
+def _scam_database_metrics():
+    state = SCAM_DB
+    yield "scam_db_entries", "gauge", "Addresses in the loaded scam database.", [({}, len(state) if state is not None else None)]
+    yield "scam_lookups_total", "counter", "Exact scam database lookups (distinct addresses per batch).", [
+        ({"result": "hit"}, LOOKUP_STATS["hit"]), ({"result": "miss"}, LOOKUP_STATS["miss"])]
+    yield "scam_bloom_checks_total", "counter", "Bloom filter prefilter checks.", [
+        ({"result": "positive"}, LOOKUP_STATS["bloom_positive"]), ({"result": "negative"}, LOOKUP_STATS["bloom_negative"])]
+
+def _current_state():
+    if SCAM_DB is None:
+        if LOAD_FAILURES:
+            retry_interval = min(CACHE_TTL * 2 ** (LOAD_FAILURES - 1), LOAD_RETRY_MAX_INTERVAL)
+            if time.time() - LAST_LOAD_TIME < retry_interval:
+                return None  # The last load failed; don't retry it on every lookup
+        ensure_scam_database_loaded()
+    elif time.time() - LAST_LOAD_TIME > CACHE_TTL:
+        refresh_scam_database() # Pick up rows appended by other processes
+    return SCAM_DB
 
 def is_address_scam(address, chain=None):
     """
     Checks if a given address is in the loaded scam database.
     Optionally, chain can be used in the future if the DB stores chain-specific scams.
     """
-    load_scam_database() # Ensure DB is loaded/updated
-    return address.lower() in SCAM_ADDRESSES_CACHE
+    state = _current_state()
+    if state is None:
+        return False
+    found = state.contains(address_key(address))
+    LOOKUP_STATS["hit" if found else "miss"] += 1
+    return found
+
+def addresses_are_scam(addresses, chain=None):
+    """
+    Batch version of is_address_scam: returns one bool per address, in order. Each distinct
+    address is checked once, and only Bloom filter hits reach the index.
+    """
+    state = _current_state()
+    addresses = list(addresses)
+    if state is None:
+        return [False] * len(addresses)
+    verdicts = {}
+    for address in addresses:
+        if address not in verdicts:
+            verdicts[address] = state.contains(address_key(address))
+    hits = sum(verdicts.values())
+    LOOKUP_STATS["hit"] += hits
+    LOOKUP_STATS["miss"] += len(verdicts) - hits
+    return [verdicts[address] for address in addresses]
+
+def addresses_may_be_scam(addresses):
+    """
+    Bloom-filter-only check for many addresses: False is definite, True means "possibly".
+    Lets batch callers discard most rows before doing exact lookups.
+    """
+    state = _current_state()
+    if state is None:
+        return [False] * len(addresses)
+    verdicts = state.bloom.contains_many(map(address_key, addresses))
+    positives = sum(verdicts)
+    LOOKUP_STATS["bloom_positive"] += positives
+    LOOKUP_STATS["bloom_negative"] += len(verdicts) - positives
+    return verdicts
 
 # --- Functions for managing the scam database (e.g., adding entries) ---
 # These would typically be admin functions or part of an update script.
 
-def add_scam_entry(address, chain, category, source_url):
-    """Adds a new entry to the scam database CSV file and updates the cache."""
+def _append_row(row):
     if not os.path.exists(SCAM_DB_FILE_PATH):
         # Create the file with headers if it doesn't exist
-        data_dir = os.path.dirname(SCAM_DB_FILE_PATH)
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
-        with open(SCAM_DB_FILE_PATH, "w", newline=
-"" ) as f:
-            writer = csv.writer(f)
-            writer.writerow(["address", "chain", "category", "source_url"])
-    
+        _create_empty_database()
+    with open(SCAM_DB_FILE_PATH, "a", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(row)
+    # Apply our own row now; other processes pick it up on their next refresh
+    refresh_scam_database(blocking=True)
+
+def add_scam_entry(address, chain, category, source_url):
+    """Adds a new entry to the scam database CSV file and updates the cache."""
     try:
-        with open(SCAM_DB_FILE_PATH, "a", newline=
-"" ) as f:
-            writer = csv.writer(f)
-            writer.writerow([address, chain, category, source_url])
-        SCAM_ADDRESSES_CACHE.add(address.lower()) # Update cache immediately
+        _append_row([address, chain, category, source_url, ""])
+        state = SCAM_DB
+        if state is not None:
+            state.bloom.save(SCAM_BLOOM_FILE_PATH, state.index)
         print(f"Added scam entry: {address}")
         return True
     except Exception as e:
         print(f"Error adding scam entry {address}: {e}")
         return False
 
-# Initialize by loading the database when the module is first imported
-# This ensures the /data directory and the scam_database.csv file are created if they don't exist.
-import time # ensure time is imported for LAST_LOAD_TIME
-load_scam_database()
-
+def remove_scam_entry(address, chain=None, source_url=""):
+    """Appends a tombstone row so the address stops matching in every process."""
+    try:
+        _append_row([address, chain or "", "", source_url, TOMBSTONE_ACTION])
+        print(f"Removed scam entry: {address}")
+        return True
+    except Exception as e:
+        print(f"Error removing scam entry {address}: {e}")
+        return False
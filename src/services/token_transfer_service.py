@@ -0,0 +1,143 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import os
+import json
+import threading
+
+# --- Configuration for ERC-20 token transfer ingestion ---
+TOKEN_TRANSFER_LOGS_ENABLED = os.environ.get("TOKEN_TRANSFER_LOGS_ENABLED", "1") not in ("0", "false", "no")
+# Chains the watched tokens live on: KNOWN_TOKENS are Ethereum mainnet contracts, so other
+# chains' endpoints are never sent their eth_getLogs or decimals() calls
+TOKEN_TRANSFER_CHAINS = ("ethereum",)
+# Blocks per eth_getLogs call; a range the provider rejects (too many results) is split in half and retried
+TOKEN_LOGS_MAX_BLOCK_RANGE = int(os.environ.get("TOKEN_LOGS_MAX_BLOCK_RANGE", 20))
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_EVENT_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+DECIMALS_SELECTOR = "0x313ce567"  # decimals()
+
+# Watched tokens (lowercase address) -> (symbol, decimals, large-transfer threshold in whole tokens)
+KNOWN_TOKENS = {
+    "0xdac17f958d2ee523a2206206994597c13d831ec7": ("USDT", 6, 1_000_000),
+    "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48": ("USDC", 6, 1_000_000),
+    "0x6b175474e89094c44da98b954eedeac495271d0f": ("DAI", 18, 1_000_000),
+    "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2": ("WETH", 18, 500),
+    "0x2260fac5e5542a773aa44fbcfedf7c193bc2c599": ("WBTC", 8, 25),
+}
+# Extra tokens to watch as a JSON object {"<token address>": <threshold in whole tokens>};
+# their decimals are looked up on chain once and cached
+LARGE_TOKEN_TRANSFER_THRESHOLDS = os.environ.get("LARGE_TOKEN_TRANSFER_THRESHOLDS", "")
+
+
+class TokenRegistry:
+    """
+    The watched tokens with their symbols, decimals and large-transfer thresholds. Thresholds
+    are kept in raw token units (threshold * 10**decimals) so detection compares integers.
+    Decimals of tokens added without them are fetched with one batched eth_call and cached.
+    """
+
+    def __init__(self, known_tokens=KNOWN_TOKENS, extra_thresholds=None):
+        self.symbols = {}
+        self.decimals = {}  # token -> decimals (None: the token has no usable decimals())
+        self.thresholds = {}  # token -> threshold in whole tokens
+        self.raw_thresholds = {}  # token -> threshold in raw units, once decimals are known
+        self._lock = threading.Lock()
+        for token, (symbol, decimals, threshold) in known_tokens.items():
+            self.symbols[token] = symbol
+            self.decimals[token] = decimals
+            self.thresholds[token] = threshold
+        for token, threshold in (extra_thresholds or {}).items():
+            self.thresholds[token.lower()] = threshold
+        self._update_raw_thresholds()
+
+    def _update_raw_thresholds(self):
+        for token, threshold in self.thresholds.items():
+            decimals = self.decimals.get(token)
+            if decimals is not None:
+                self.raw_thresholds[token] = int(threshold * 10**decimals)
+
+    def watched_tokens(self):
+        return sorted(self.thresholds)
+
+    def symbol(self, token):
+        return self.symbols.get(token) or token
+
+    def resolve_decimals(self, client):
+        """Looks up decimals() for watched tokens that have none yet. Transport errors are retried next time."""
+        with self._lock:
+            unknown = [token for token in self.thresholds if token not in self.decimals]
+            if not unknown:
+                return
+            results = client.batch_call(("eth_call", [{"to": token, "data": DECIMALS_SELECTOR}, "latest"]) for token in unknown)
+            for token, result in zip(unknown, results):
+                if result["status"] != "success":
+                    continue
+                try:
+                    decimals = int(result["data"], 16)
+                except (TypeError, ValueError):
+                    decimals = None
+                self.decimals[token] = decimals if decimals is not None and decimals <= 77 else None
+                if self.decimals[token] is None:
+                    print(f"Token {token} has no usable decimals(); large transfers of it are not detected.")
+            self._update_raw_thresholds()
+
+    def status(self):
+        return {"watched_tokens": len(self.thresholds), "tokens_with_decimals": len(self.raw_thresholds)}
+
+
+def _parse_extra_thresholds(value):
+    if not value:
+        return {}
+    try:
+        return {token: float(threshold) for token, threshold in json.loads(value).items()}
+    except (ValueError, AttributeError) as e:
+        print(f"Ignoring invalid LARGE_TOKEN_TRANSFER_THRESHOLDS: {e}")
+        return {}
+
+TOKEN_REGISTRY = TokenRegistry(extra_thresholds=_parse_extra_thresholds(LARGE_TOKEN_TRANSFER_THRESHOLDS))
+
+
+def token_transfers_enabled(chain):
+    """True if watched token transfers are fetched for blocks of the chain."""
+    return TOKEN_TRANSFER_LOGS_ENABLED and chain in TOKEN_TRANSFER_CHAINS
+
+def block_ranges(block_numbers, max_range=TOKEN_LOGS_MAX_BLOCK_RANGE):
+    """Splits block numbers into contiguous (first, last) ranges of at most max_range blocks."""
+    ranges = []
+    for n in sorted(set(block_numbers)):
+        if ranges and n == ranges[-1][1] + 1 and n - ranges[-1][0] < max_range:
+            ranges[-1][1] = n
+        else:
+            ranges.append([n, n])
+    return [tuple(r) for r in ranges]
+
+def fetch_transfer_logs(client, block_numbers, registry=TOKEN_REGISTRY):
+    """
+    Fetches the Transfer logs of the watched tokens for the given blocks with one eth_getLogs
+    call per contiguous block range (all ranges go out as one JSON-RPC batch). A range the
+    provider rejects is split in half and retried. Returns ({block_number: [log, ...]},
+    failed (first, last) ranges).
+    """
+    registry.resolve_decimals(client)
+    tokens = registry.watched_tokens()
+    logs_by_block = {}
+    failed = []
+    pending = block_ranges(block_numbers)
+    while pending:
+        results = client.batch_call(
+            ("eth_getLogs", [{"fromBlock": hex(first), "toBlock": hex(last), "address": tokens, "topics": [TRANSFER_EVENT_TOPIC]}])
+            for first, last in pending)
+        retry = []
+        for (first, last), result in zip(pending, results):
+            if result["status"] == "success" and isinstance(result["data"], list):
+                for log in result["data"]:
+                    try:
+                        logs_by_block.setdefault(int(log["blockNumber"], 16), []).append(log)
+                    except (KeyError, TypeError, ValueError):
+                        continue
+            elif first < last:
+                middle = (first + last) // 2
+                retry.extend([(first, middle), (middle + 1, last)])
+            else:
+                print(f"Could not fetch token transfer logs for block {first}: {result.get('message')}")
+                failed.append((first, last))
+        pending = retry
+    return logs_by_block, failed
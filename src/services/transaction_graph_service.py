@@ -0,0 +1,421 @@
+#!/home/ubuntu/crypto_investigator_app/venv/bin/python
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import accumulate, chain, compress, repeat
+from operator import add, and_, lshift, or_, rshift, sub
+
+from src.services.scam_db_service import addresses_are_scam, addresses_may_be_scam
+from src.services.reorg_service import REORG_BUFFER_SIZE
+
+# --- Configuration for the transaction graph and taint tracing ---
+GRAPH_WINDOW_BLOCKS = int(os.environ.get("GRAPH_WINDOW_BLOCKS", 7200))  # Blocks whose transfers stay in the graph (~1 day of mainnet)
+GRAPH_MAX_PENDING_EDGES = int(os.environ.get("GRAPH_MAX_PENDING_EDGES", 500_000))  # New and removed edges buffered before compaction
+GRAPH_COMPACT_RATIO = 0.25  # ...or once they reach this share of the compacted edges
+TAINT_MAX_HOPS = int(os.environ.get("TAINT_MAX_HOPS", 3))  # Hops from a scam address still considered tainted
+TAINT_QUERY_MAX_NODES = int(os.environ.get("TAINT_QUERY_MAX_NODES", 10_000))  # Bound on addresses one trace visits
+TAINT_MAX_TRACKED = int(os.environ.get("TAINT_MAX_TRACKED", 1_000_000))  # Bound on live-tainted addresses
+TAINT_MIN_VALUE_ETH = float(os.environ.get("TAINT_MIN_VALUE_ETH", 0.1))  # Ignore dust when propagating taint
+# Recent blocks whose edges and taint changes are kept so a reorg can roll them back (matches the reorg buffer)
+TAINT_UNDO_BLOCKS = REORG_BUFFER_SIZE
+MIN_EDGE_VALUE_ETH = 1e-12  # Edges reduced to this by removals are treated as gone
+
+WEI_PER_ETH = 10**18
+
+
+class TransactionGraph:
+    """
+    Directed value-transfer graph (sender -> recipient, ETH) over the transfers of the last
+    `window_blocks` ingested blocks. Addresses are interned to integer ids. Edges are kept
+    in CSR form (an offsets array indexed by sender id into flat target/value arrays); new
+    edges are buffered and merged into the CSR arrays in bulk once the buffer grows, so
+    compaction is amortized and traversals only touch flat arrays plus a small buffer.
+
+    Each block's edges are kept until the block leaves the window or is unwound after a
+    reorg; then they are removed, and compaction drops them from the CSR arrays together
+    with the addresses left without edges, so memory stays bounded by the window.
+    """
+
+    def __init__(self, window_blocks=GRAPH_WINDOW_BLOCKS, max_pending_edges=GRAPH_MAX_PENDING_EDGES):
+        self.window_blocks = max(1, int(window_blocks))
+        self.max_pending_edges = max_pending_edges
+        self.ids = {}  # address -> id
+        self.addresses = []  # id -> address
+        self.offsets = array("Q", [0])  # CSR: edges of node u are [offsets[u], offsets[u + 1])
+        self.targets = array("I")
+        self.values = array("d")
+        self.pending = {}  # (src << 32) | dst -> ETH, merged into the CSR arrays on compaction
+        self.pending_by_source = {}  # src -> [dst, ...] for traversal before compaction
+        self.removed = {}  # (src << 32) | dst -> ETH removed from the CSR arrays, dropped on compaction
+        self.blocks = deque()  # (block_number, edges) of the blocks in the window, oldest first
+        self.compactions = 0
+        self.lock = threading.RLock()
+
+    def intern(self, address):
+        node = self.ids.get(address)
+        if node is None:
+            node = self.ids[address] = len(self.addresses)
+            self.addresses.append(address)
+        return node
+
+    def edge_count(self):
+        return len(self.targets) + len(self.pending)
+
+    def add_block(self, block_number, edges):
+        """
+        Adds a block's (sender, recipient, value_eth) edges; repeated sender/recipient pairs
+        are summed. Blocks that fall out of the window are removed.
+        """
+        with self.lock:
+            edges = list(edges)
+            self.blocks.append((block_number, edges))
+            self._add_edges(edges)
+            cutoff = block_number - self.window_blocks
+            while self.blocks and self.blocks[0][0] <= cutoff:
+                self._remove_edges(self.blocks.popleft()[1])
+            self._maybe_compact()
+
+    def unwind(self, fork_block):
+        """Removes the edges of the blocks after fork_block (replaced by a reorg). Returns the number of blocks removed."""
+        with self.lock:
+            removed = 0
+            while self.blocks and self.blocks[-1][0] > fork_block:
+                self._remove_edges(self.blocks.pop()[1])
+                removed += 1
+            self._maybe_compact()
+            return removed
+
+    def _add_edges(self, edges):
+        pending, by_source = self.pending, self.pending_by_source
+        for sender, recipient, value in edges:
+            src, dst = self.intern(sender), self.intern(recipient)
+            key = (src << 32) | dst
+            if key in pending:
+                pending[key] += value
+            else:
+                pending[key] = value
+                by_source.setdefault(src, []).append(dst)
+
+    def _remove_edges(self, edges):
+        pending, by_source, removed = self.pending, self.pending_by_source, self.removed
+        for sender, recipient, value in edges:
+            src, dst = self.ids.get(sender), self.ids.get(recipient)
+            if src is None or dst is None:
+                continue
+            key = (src << 32) | dst
+            if key in pending:
+                remaining = pending[key] - value
+                if remaining > MIN_EDGE_VALUE_ETH:
+                    pending[key] = remaining
+                    continue
+                del pending[key]
+                dsts = by_source[src]
+                dsts.remove(dst)
+                if not dsts:
+                    del by_source[src]
+                value = -remaining  # Whatever the buffer did not hold comes out of the CSR arrays
+                if value <= MIN_EDGE_VALUE_ETH:
+                    continue
+            removed[key] = removed.get(key, 0.0) + value
+
+    def _maybe_compact(self):
+        threshold = min(self.max_pending_edges, max(10_000, len(self.targets) * GRAPH_COMPACT_RATIO))
+        if len(self.removed) >= threshold:
+            self._rebuild()
+        elif len(self.pending) >= threshold:
+            self.compact()
+
+    def compact(self):
+        """
+        Merges pending edges into the CSR arrays. Runs of nodes without new edges are copied
+        as whole slices, so the cost is a bulk copy plus work proportional to the new edges.
+        Removed edges stay until enough have piled up for _rebuild() to drop them.
+        """
+        with self.lock:
+            if not self.pending:
+                return
+            node_count = len(self.addresses)
+            old_offsets, old_targets, old_values = self.offsets, self.targets, self.values
+            old_nodes = len(old_offsets) - 1
+
+            added = array("Q", bytes(8 * node_count))
+            for src, dsts in self.pending_by_source.items():
+                added[src] = len(dsts)
+            padded_offsets = chain(old_offsets[1:], repeat(old_offsets[-1], node_count - old_nodes))
+            offsets = array("Q", [0])
+            offsets.extend(map(add, padded_offsets, accumulate(added)))
+
+            targets = array("I")
+            values = array("d")
+            pending = self.pending
+            copied_until = 0  # Old edges before this index are already copied
+            for src in sorted(self.pending_by_source):
+                old_end = old_offsets[min(src + 1, old_nodes)]
+                targets.extend(old_targets[copied_until:old_end])
+                values.extend(old_values[copied_until:old_end])
+                copied_until = old_end
+                dsts = self.pending_by_source[src]
+                targets.extend(dsts)
+                values.extend([pending[(src << 32) | dst] for dst in dsts])
+            targets.extend(old_targets[copied_until:])
+            values.extend(old_values[copied_until:])
+
+            self.offsets, self.targets, self.values = offsets, targets, values
+            self.pending = {}
+            self.pending_by_source = {}
+            self.compactions += 1
+
+    def _rebuild(self):
+        """
+        Rebuilds the CSR arrays from the live edges, dropping the removed ones and renumbering
+        the addresses that still have edges. Costs a pass over all edges, so it only runs once
+        the removals reach the compaction threshold.
+        """
+        offsets, targets, values = self.offsets, self.targets, self.values
+        sources = array("Q")
+        for src, count in enumerate(map(sub, offsets[1:], offsets[:-1])):
+            sources.extend(repeat(src, count))
+        keys = list(map(or_, map(lshift, sources, repeat(32)), targets))
+        totals = dict(zip(keys, values))
+        if len(totals) != len(keys):  # Some pairs are stored more than once (compacted, then pending again)
+            totals = {}
+            for key, value in zip(keys, values):
+                totals[key] = totals.get(key, 0.0) + value
+        for key, value in self.pending.items():
+            totals[key] = totals.get(key, 0.0) + value
+        for key, value in self.removed.items():
+            totals[key] = totals.get(key, 0.0) - value
+        live = sorted(compress(totals, map(MIN_EDGE_VALUE_ETH.__lt__, totals.values())))
+
+        # Ids keep their relative order, so the sorted keys stay grouped by sender after renumbering
+        live_sources = list(map(rshift, live, repeat(32)))
+        live_targets = list(map(and_, live, repeat(0xFFFFFFFF)))
+        nodes = sorted(set(live_sources).union(live_targets))
+        new_id = dict(zip(nodes, range(len(nodes))))
+        live_sources = list(map(new_id.__getitem__, live_sources))
+
+        self.addresses = list(map(self.addresses.__getitem__, nodes))
+        self.ids = dict(zip(self.addresses, range(len(nodes))))
+        self.offsets = array("Q", map(bisect_left, repeat(live_sources), range(len(nodes) + 1)))
+        self.targets = array("I", map(new_id.__getitem__, live_targets))
+        self.values = array("d", map(totals.__getitem__, live))
+        self.pending = {}
+        self.pending_by_source = {}
+        self.removed = {}
+        self.compactions += 1
+
+    def neighbors(self, node):
+        """
+        Yields (recipient id, value_eth) for the node's outgoing edges. A recipient can appear
+        more than once (compacted and pending parts of the same pair); see outflows().
+        """
+        if node + 1 < len(self.offsets):
+            start, end = self.offsets[node], self.offsets[node + 1]
+            yield from zip(self.targets[start:end], self.values[start:end])
+            removed = self.removed
+            if removed:
+                for dst in dict.fromkeys(self.targets[start:end]):  # A pair can be stored more than once
+                    value = removed.get((node << 32) | dst)
+                    if value is not None:
+                        yield dst, -value
+        for dst in self.pending_by_source.get(node, ()):
+            yield dst, self.pending[(node << 32) | dst]
+
+    def outflows(self, node):
+        """Total value_eth sent from the node per recipient id, without removed edges."""
+        totals = {}
+        for dst, value in self.neighbors(node):
+            totals[dst] = totals.get(dst, 0.0) + value
+        return [(dst, value) for dst, value in totals.items() if value > MIN_EDGE_VALUE_ETH]
+
+    def trace_taint(self, address, max_hops=TAINT_MAX_HOPS, max_nodes=TAINT_QUERY_MAX_NODES):
+        """
+        Bounded breadth-first search from `address` along outgoing transfers. Returns the
+        addresses reached within max_hops with their hop distance and the value that could
+        have flowed from the source (each edge passes at most what reached its sender).
+        Stops after max_nodes addresses and reports "truncated".
+        """
+        with self.lock:
+            source = self.ids.get(address.lower())
+            if source is None:
+                return {"address": address.lower(), "reached": [], "truncated": False}
+            hops = {source: 0}
+            flow = {source: float("inf")}
+            frontier = [source]
+            truncated = False
+            for hop in range(1, max_hops + 1):
+                next_frontier = []
+                for node in frontier:
+                    available = flow[node]
+                    for dst, value in self.outflows(node):
+                        seen_at = hops.get(dst)
+                        if seen_at is None:
+                            if len(hops) > max_nodes:
+                                truncated = True
+                                continue
+                            hops[dst] = hop
+                            flow[dst] = 0.0
+                            next_frontier.append(dst)
+                        elif seen_at != hop:
+                            continue  # Already reached by a shorter path
+                        flow[dst] += min(value, available)
+                frontier = next_frontier
+                if not frontier:
+                    break
+            reached = sorted((hop, -flow[node], node) for node, hop in hops.items() if node != source)
+            return {
+                "address": address.lower(),
+                "reached": [{"address": self.addresses[node], "hops": hop, "value_eth": round(-negative_flow, 6)}
+                            for hop, negative_flow, node in reached],
+                "truncated": truncated,
+            }
+
+    def status(self):
+        return {"addresses": len(self.addresses), "edges": len(self.targets), "pending_edges": len(self.pending),
+                "removed_edges": len(self.removed), "window_blocks": self.window_blocks,
+                "blocks_in_window": len(self.blocks), "compactions": self.compactions}
+
+
+class TaintMonitor:
+    """
+    Follows funds leaving known scam addresses as blocks are ingested. A transfer from a
+    scam address taints its recipient at hop 1; a transfer from an address tainted at hop
+    h < max_hops taints its recipient at hop h + 1, carrying at most the tainted value the
+    sender received. Because propagation follows ingestion order, only funds moved after
+    being tainted are followed. When a tainted address moves the funds on, a
+    tainted_funds_transfer finding is raised for it, at most once per graph window.
+
+    All transfers also go into a TransactionGraph for ad-hoc trace_taint queries.
+
+    Blocks at or below the last observed one are ignored. The taint changes and flags of
+    the last `undo_blocks` blocks are kept, so unwind(fork_block) can take the blocks
+    replaced by a reorg back out (together with their graph edges) before the canonical
+    ones are observed.
+    """
+
+    def __init__(self, graph=None, max_hops=TAINT_MAX_HOPS, max_tracked=TAINT_MAX_TRACKED, undo_blocks=TAINT_UNDO_BLOCKS):
+        self.graph = graph if graph is not None else TransactionGraph()
+        self.max_hops = max_hops
+        self.max_tracked = max_tracked
+        self.tainted = {}  # address -> (hops, tainted_value_eth, scam source address)
+        self.flagged = {}  # address -> block it was flagged in; dropped once that block leaves the graph window
+        self._flag_order = deque()  # (block_number, address) in the order addresses were flagged
+        self.untracked = 0
+        self.last_block = None
+        # (block_number, {address: taint before the block or None}, addresses flagged in the block)
+        self.history = deque(maxlen=max(1, int(undo_blocks)))
+        self._undo = None
+
+    def _taint(self, address, hops, value, source):
+        current = self.tainted.get(address)
+        if self._undo is not None and address not in self._undo:
+            self._undo[address] = current
+        if current is None:
+            if len(self.tainted) >= self.max_tracked:
+                self.untracked += 1
+                return
+            self.tainted[address] = (hops, value, source)
+        elif hops < current[0]:
+            self.tainted[address] = (hops, value, source)
+        elif hops == current[0]:
+            self.tainted[address] = (hops, current[1] + value, current[2])
+
+    def observe_block(self, block_number, batch):
+        """Adds a block's value transfers (a TransactionBatch) to the graph and returns taint findings."""
+        if self.last_block is not None and block_number <= self.last_block:
+            return []  # Already observed
+        self.last_block = block_number
+        self._expire_flags(block_number)
+        values_wei = batch.values_wei
+        from_addresses, to_addresses = batch.from_addresses, batch.to_addresses
+        rows = [row for row in batch.rows_with("value") if from_addresses[row] and to_addresses[row]]
+        if not rows:
+            return []
+        senders = [from_addresses[row] for row in rows]
+
+        # Scam senders seed the taint; the Bloom filter keeps the exact lookup to a few candidates
+        maybe = addresses_may_be_scam(senders)
+        candidates = [sender for sender, flag in zip(senders, maybe) if flag]
+        scam_senders = {sender for sender, is_scam in zip(candidates, addresses_are_scam(candidates)) if is_scam}
+
+        findings = []
+        edges = []
+        flagged = []
+        self._undo = {}
+        for row, sender in zip(rows, senders):
+            recipient = to_addresses[row]
+            value = values_wei[row] / WEI_PER_ETH
+            edges.append((sender, recipient, value))
+            if value < TAINT_MIN_VALUE_ETH:
+                continue
+            if sender in scam_senders:
+                self._taint(recipient, 1, value, sender)
+                continue
+            taint = self.tainted.get(sender)
+            if taint is None:
+                continue
+            hops, tainted_value, source = taint
+            if sender not in self.flagged:
+                self.flagged[sender] = block_number
+                self._flag_order.append((block_number, sender))
+                flagged.append(sender)
+                findings.append(self._finding(batch, row, sender, hops, tainted_value, source, value, block_number))
+            if hops < self.max_hops:
+                self._taint(recipient, hops + 1, min(value, tainted_value), source)
+        self.graph.add_block(block_number, edges)
+        self.history.append((block_number, self._undo, flagged))
+        self._undo = None
+        return findings
+
+    def unwind(self, fork_block):
+        """
+        Rolls back the blocks after fork_block: their edges leave the graph, taint they
+        propagated is restored to its previous state and the addresses they flagged can be
+        flagged again. Returns the number of blocks rolled back.
+        """
+        removed = 0
+        while self.history and self.history[-1][0] > fork_block:
+            _, undo, flagged = self.history.pop()
+            for address, previous in undo.items():
+                if previous is None:
+                    self.tainted.pop(address, None)
+                else:
+                    self.tainted[address] = previous
+            for address in flagged:
+                self.flagged.pop(address, None)
+            removed += 1
+        self.graph.unwind(fork_block)
+        if self.last_block is not None and self.last_block > fork_block:
+            self.last_block = fork_block
+        return removed
+
+    def _expire_flags(self, block_number):
+        cutoff = block_number - self.graph.window_blocks
+        order = self._flag_order
+        while order and order[0][0] <= cutoff:
+            flagged_at, address = order.popleft()
+            if self.flagged.get(address) == flagged_at:  # Not unwound and flagged again since
+                del self.flagged[address]
+
+    def _finding(self, batch, row, address, hops, tainted_value, source, value, block_number):
+        return {
+            "type": "tainted_funds_transfer",
+            "message": f"Address {address} is moving funds received {hops} hop(s) from known scam address {source}",
+            "details": {
+                "hash": batch.hashes[row],
+                "address": address,
+                "from": batch.transactions[row].get("from"),
+                "to": batch.transactions[row].get("to"),
+                "value_eth": value,
+                "hops": hops,
+                "source_scam_address": source,
+                "tainted_value_eth": round(tainted_value, 6),
+                "block_number": block_number,
+            }
+        }
+
+    def status(self):
+        return dict(self.graph.status(), tainted_addresses=len(self.tainted), flagged_addresses=len(self.flagged),
+                    untracked=self.untracked, max_hops=self.max_hops)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Standalone monitoring worker. Runs the fetch -> analyze -> alert ingestion pipeline
+for the chains in MONITORED_CHAINS (e.g. "ethereum,bsc,polygon,bitcoin") outside the
+Flask process and periodically writes per-chain and per-stage statistics to
+PIPELINE_STATS_FILE, which the API serves at /api/monitoring/pipeline/stats. With
+WORKER_METRICS_PORT set, the worker's own metrics are served in the Prometheus text
+format at http://<host>:<port>/metrics.
+
+Usage: python src/worker.py
+"""
+import sys
+import os
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import asyncio
+import json
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.services.ingestion_pipeline_service import IngestionPipeline, PIPELINE_STATS_FILE
+from src.services.chain_adapter_service import MONITORED_CHAINS
+from src.services.alert_service import get_alert_dispatcher
+from src.services.findings_store_service import get_findings_store
+from src.services.metrics_service import PROFILER_ENABLED, get_profiler, render_prometheus
+
+PIPELINE_STATS_INTERVAL = float(os.environ.get("PIPELINE_STATS_INTERVAL", 10))  # Seconds between stats reports
+WORKER_METRICS_PORT = os.environ.get("WORKER_METRICS_PORT")  # Unset = no metrics endpoint
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_metrics_server(port):
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="worker-metrics", daemon=True).start()
+    print(f"Worker metrics served on port {port} at /metrics")
+    return server
+
+def write_stats(stats):
+    """Atomically replaces the stats file so readers never see a partial write."""
+    os.makedirs(os.path.dirname(PIPELINE_STATS_FILE), exist_ok=True)
+    tmp_path = f"{PIPELINE_STATS_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(stats, f)
+    os.replace(tmp_path, PIPELINE_STATS_FILE)
+
+async def report_stats(pipeline):
+    while True:
+        await asyncio.sleep(PIPELINE_STATS_INTERVAL)
+        stats = pipeline.stats()
+        try:
+            write_stats(stats)
+        except OSError as e:
+            print(f"Could not write pipeline stats to {PIPELINE_STATS_FILE}: {e}")
+        chain_summary = ", ".join(
+            f"{chain}: head={c['head_block']} analyzed={c['last_analyzed_block']} lag={c['lag_blocks']} "
+            f"fetch={c['fetch']['throughput_per_second']}/s" for chain, c in stats["chains"].items()
+        )
+        stage_summary = ", ".join(
+            f"{name}: {s['throughput_per_second']}/s q={s.get('queue_depth', '-')}" for name, s in stats["stages"].items()
+        )
+        print(f"Pipeline {chain_summary} | {stage_summary}")
+
+def start_blocks_from_env(chains):
+    """First block per chain from <CHAIN>_START_BLOCK (PIPELINE_START_BLOCK for Ethereum)."""
+    start_blocks = {}
+    for chain in chains:
+        value = os.environ.get(f"{chain.upper()}_START_BLOCK")
+        if chain == "ethereum":
+            value = os.environ.get("PIPELINE_START_BLOCK") or value
+        if value:
+            start_blocks[chain] = int(value, 0)
+    return start_blocks
+
+async def main():
+    if WORKER_METRICS_PORT:
+        start_metrics_server(int(WORKER_METRICS_PORT))
+    if PROFILER_ENABLED:
+        get_profiler().start()
+    # Chains without a start block resume from their stored checkpoint (or the head on first run)
+    pipeline = IngestionPipeline(MONITORED_CHAINS, start_blocks=start_blocks_from_env(MONITORED_CHAINS),
+                                 store=get_findings_store())
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, pipeline.stop)
+
+    reporter = asyncio.create_task(report_stats(pipeline))
+    try:
+        await pipeline.run()
+    finally:
+        reporter.cancel()
+        get_alert_dispatcher().stop()  # Flush queued alerts before exiting
+        write_stats(pipeline.stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Keep the tests off the network, the disk cache and the rate limiters
+os.environ.setdefault("BLOCK_CACHE_ENABLED", "0")
+os.environ.setdefault("ETHEREUM_RATE_PER_SECOND", "100000")
+
+import pytest
+
+from benchmarks.fake_rpc import FakeRpcServer
+from src.services import scam_db_service
+from src.services.rule_engine_service import register_rule, unregister_rule
+from src.services.findings_store_service import FindingsStore
+
+WEI_PER_ETH = 10**18
+
+
+class ScriptedChain:
+    """
+    Chain for FakeRpcServer whose blocks are given explicitly as (from, to, value_eth)
+    transfers. set_block() with a new branch name replaces a block, e.g. to simulate a reorg.
+    """
+
+    def __init__(self, head=0):
+        self.head = head
+        self.transfers = {}  # block number -> [(from, to, value_eth), ...]
+        self.branches = {}  # block number -> branch name, part of the block hash
+        self.failing_logs = set()  # Blocks whose eth_getLogs fails
+        self.log_queries = []  # (first, last) of every eth_getLogs call
+
+    def set_block(self, n, transfers=(), branch=""):
+        self.transfers[n] = list(transfers)
+        self.branches[n] = branch
+        self.head = max(self.head, n)
+
+    def block_hash(self, n):
+        return "0x" + hashlib.sha256(f"{n}:{self.branches.get(n, '')}".encode()).hexdigest()
+
+    def block(self, n, with_logs=False):
+        block_hash = self.block_hash(n)
+        transactions = [{
+            "hash": "0x" + hashlib.sha256(f"{block_hash}:{i}".encode()).hexdigest(),
+            "from": sender, "to": recipient, "value": hex(int(value * WEI_PER_ETH)),
+            "blockNumber": hex(n), "blockHash": block_hash, "transactionIndex": hex(i),
+        } for i, (sender, recipient, value) in enumerate(self.transfers.get(n, ()))]
+        return {"number": hex(n), "hash": block_hash, "parentHash": self.block_hash(n - 1),
+                "timestamp": hex(1_700_000_000 + 12 * n), "transactions": transactions}
+
+    def logs(self, first, last, addresses=None):
+        self.log_queries.append((first, last))
+        if self.failing_logs.intersection(range(first, last + 1)):
+            return None  # Rejected by the provider
+        return []
+
+
+class StubHttpServer:
+    """
+    Local HTTP server for outbound integrations (webhooks, explorer APIs). Every request is
+    recorded with its arrival time; `respond(method, path, query, body)` returns
+    (status, headers, body), where a dict or list body is sent as JSON.
+    """
+
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda method, path, query, body: (200, {}, {"ok": True}))
+        self.requests = []  # (time.monotonic(), method, path, query, body)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self, method):
+                path, _, query = self.path.partition("?")
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                server.requests.append((time.monotonic(), method, path, query, body))
+                status, headers, payload = server.respond(method, path, query, body)
+                data = json.dumps(payload).encode() if isinstance(payload, (dict, list)) else str(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, name="stub-http", daemon=True).start()
+
+    def request_times(self):
+        return [t for t, *_ in self.requests]
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(respond=None):
+        server = StubHttpServer(respond)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def scripted_chain():
+    return ScriptedChain()
+
+
+@pytest.fixture
+def rpc_server(scripted_chain):
+    server = FakeRpcServer(scripted_chain).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def scam_db(tmp_path, monkeypatch):
+    """An empty scam database in tmp_path; call the fixture's value with addresses to list them."""
+    monkeypatch.setattr(scam_db_service, "SCAM_DB_FILE_PATH", str(tmp_path / "scam_database.csv"))
+    monkeypatch.setattr(scam_db_service, "SCAM_INDEX_FILE_PATH", str(tmp_path / "scam_index.bin"))
+    monkeypatch.setattr(scam_db_service, "SCAM_BLOOM_FILE_PATH", str(tmp_path / "scam_bloom.bin"))
+    monkeypatch.setattr(scam_db_service, "SCAM_DB", None)
+    monkeypatch.setattr(scam_db_service, "LOAD_FAILURES", 0)
+    scam_db_service.ensure_scam_database_loaded()
+
+    def add(*addresses):
+        for address in addresses:
+            scam_db_service.add_scam_entry(address, "ethereum", "test", "")
+
+    yield add
+    if scam_db_service.SCAM_DB is not None:
+        scam_db_service.SCAM_DB.index.close()
+
+
+@pytest.fixture
+def failing_rule():
+    """
+    Registers an Ethereum rule that raises on transfers of exactly the given ETH values; call
+    the fixture's value with the values (none = the rule never fails).
+    """
+    failing_values = set()
+
+    @register_rule("test_failing_rule", chains=("ethereum",), fields=("value",), cost=0)
+    def evaluate(batch, rows):
+        if any(batch.values_wei[row] in failing_values for row in rows):
+            raise RuntimeError("detector bug")
+        return []
+
+    def fail_on(*values_eth):
+        failing_values.clear()
+        failing_values.update(int(value * WEI_PER_ETH) for value in values_eth)
+
+    yield fail_on
+    unregister_rule("test_failing_rule")
+
+
+@pytest.fixture
+def findings_store(tmp_path):
+    return FindingsStore(str(tmp_path / "findings.db"))
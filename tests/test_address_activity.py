@@ -0,0 +1,34 @@
+from src.services.address_activity_service import AddressActivityAggregator
+from src.services.monitoring_service import TransactionBatch
+
+SENDER = "0x" + "5e" * 20
+
+
+def transfers(block_number, recipients):
+    return TransactionBatch([{"hash": f"0x{block_number:032x}{i:032x}", "from": SENDER, "to": recipient, "value": "0x1"}
+                             for i, recipient in enumerate(recipients)])
+
+
+def colliding_addresses():
+    """Two addresses whose str hashes share their low 32 bits in this process."""
+    seen = {}
+    i = 0
+    while True:
+        address = f"0x{i:040x}"
+        previous = seen.setdefault(hash(address) & 0xFFFFFFFF, address)
+        if previous != address:
+            return previous, address
+        i += 1
+
+
+def test_distinct_counterparties_are_counted_exactly():
+    first, second = colliding_addresses()
+    activity = AddressActivityAggregator(window_blocks=2)
+    activity.observe_block(1, transfers(1, [first, second, first]))
+
+    assert activity.stats(SENDER)["distinct_counterparties"] == 2
+
+    activity.observe_block(2, transfers(2, [second]))
+    activity.observe_block(3, transfers(3, []))  # Block 1 leaves the window
+    assert activity.stats(SENDER)["distinct_counterparties"] == 1
+    assert activity.stats(SENDER)["tx_count"] == 1
@@ -0,0 +1,165 @@
+import json
+import time
+from urllib.parse import parse_qs
+
+import pytest
+
+from src.services import alert_service
+from src.services.alert_service import AlertChannel, AlertDispatcher
+
+
+@pytest.fixture(autouse=True)
+def clear_dedup_cache():
+    alert_service.ALERT_DEDUP_CACHE.clear()
+    yield
+    alert_service.ALERT_DEDUP_CACHE.clear()
+
+
+def scripted(*responses):
+    """Responder returning the given (status, headers, body) in order, then 200s."""
+    pending = list(responses)
+    return lambda method, path, query, body: pending.pop(0) if pending else (200, {}, {"ok": True})
+
+
+def make_channel(server, rate_per_second=0, **kwargs):
+    return AlertChannel("Stub", server.url + "/hook", alert_service._discord_payload, 2000, rate_per_second, **kwargs)
+
+
+def gaps(times):
+    return [later - earlier for earlier, later in zip(times, times[1:])]
+
+
+def test_sends_are_spaced_to_the_channel_rate(stub_server):
+    server = stub_server()
+    channel = make_channel(server, rate_per_second=20)
+
+    assert channel.send("warm-up")  # The first request also opens the connection, which skews its arrival time
+    for i in range(4):
+        assert channel.send(f"message {i}")
+
+    assert len(server.requests) == 5
+    assert min(gaps(server.request_times()[1:])) >= 0.045
+    assert [json.loads(body)["content"] for *_, body in server.requests[1:]] == [f"message {i}" for i in range(4)]
+
+
+def test_429_waits_for_retry_after(stub_server):
+    server = stub_server(scripted((429, {"Retry-After": "0.3"}, {"message": "slow down"})))
+    channel = make_channel(server, backoff_seconds=5)
+
+    assert channel.send("hello")
+
+    assert len(server.requests) == 2
+    assert 0.28 <= gaps(server.request_times())[0] < 2  # Retry-After, not the 5s backoff
+    assert channel.stats["rate_limited"] == 1
+    assert channel.stats["retries"] == 1
+
+
+def test_429_retry_after_from_json_body(stub_server):
+    server = stub_server(scripted((429, {}, {"retry_after": 0.2})))  # Discord style
+    channel = make_channel(server, backoff_seconds=5)
+
+    assert channel.send("hello")
+    assert 0.18 <= gaps(server.request_times())[0] < 2
+
+
+def test_server_errors_are_retried_with_exponential_backoff(stub_server):
+    server = stub_server(scripted((500, {}, {}), (502, {}, {}), (503, {}, {})))
+    channel = make_channel(server, backoff_seconds=0.1, max_retries=5)
+
+    assert channel.send("hello")
+
+    first, second, third = gaps(server.request_times())
+    assert 0.075 <= first < 0.2  # 0.1s +-20% jitter
+    assert 0.155 <= second < 0.35  # 0.2s
+    assert 0.315 <= third < 0.6  # 0.4s
+    assert channel.stats == dict(channel.stats, sent=1, retries=3, failed=0)
+
+
+def test_gives_up_after_max_retries(stub_server):
+    server = stub_server(lambda *args: (500, {}, {}))
+    channel = make_channel(server, backoff_seconds=0.01, max_retries=2)
+
+    assert not channel.send("hello")
+    assert len(server.requests) == 3
+    assert channel.stats["failed"] == 1
+
+
+def test_client_errors_are_not_retried(stub_server):
+    server = stub_server(lambda *args: (400, {}, {"message": "bad request"}))
+    channel = make_channel(server, backoff_seconds=0.01)
+
+    assert not channel.send("hello")
+    assert len(server.requests) == 1
+
+
+def test_stop_does_not_wait_out_a_backoff(stub_server):
+    server = stub_server(lambda *args: (500, {}, {}))
+    channel = make_channel(server, backoff_seconds=5, max_retries=5)
+    channel.start()
+    channel.enqueue("hello")
+    deadline = time.monotonic() + 5
+    while not server.requests and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    started = time.monotonic()
+    channel.stop(timeout=10)
+
+    assert time.monotonic() - started < 2
+    assert not channel._thread.is_alive()
+    assert channel.stats["failed"] == 1
+
+
+def test_findings_of_a_block_are_coalesced_into_one_digest(stub_server):
+    server = stub_server()
+    dispatcher = AlertDispatcher(channels=[make_channel(server)], coalesce_seconds=0.3)
+
+    for i in range(3):
+        assert dispatcher.submit("large_transfer", {"hash": f"0x{i:064x}", "from": f"0xfrom{i}", "to": "0xto",
+                                                    "value_eth": 150 + i, "chain": "ethereum"}, block_number=100)
+    assert dispatcher.submit("uses_mixer_service", {"hash": "0x" + "f" * 64, "address": "0xmixeduser", "chain": "ethereum"},
+                             block_number=101)
+    dispatcher.stop()
+
+    messages = sorted(json.loads(body)["content"] for *_, body in server.requests)
+    assert len(messages) == 2
+    digest, single = messages
+    assert digest.startswith("🚨 3 suspicious activities detected in ETHEREUM block 100 🚨")
+    assert digest.count("- large_transfer: ") == 3
+    assert "Type: uses_mixer_service" in single
+    assert dispatcher.stats["digests_sent"] == 2
+
+
+def test_duplicate_findings_are_suppressed(stub_server):
+    server = stub_server()
+    dispatcher = AlertDispatcher(channels=[make_channel(server)], coalesce_seconds=0.05)
+    details = {"hash": "0x" + "1" * 64, "address": "0xabc", "chain": "ethereum"}
+
+    assert dispatcher.submit("known_scam", details)
+    assert not dispatcher.submit("known_scam", dict(details))
+    dispatcher.stop()
+
+    assert len(server.requests) == 1
+    assert dispatcher.stats["findings_suppressed"] == 1
+
+
+def test_telegram_payload_is_form_encoded(stub_server, monkeypatch):
+    server = stub_server()
+    monkeypatch.setattr(alert_service, "TELEGRAM_CHAT_ID", "42")
+    channel = AlertChannel("Telegram", server.url + "/botTOKEN/sendMessage", alert_service._telegram_payload, 4096, 0)
+
+    assert channel.send("hi")
+    assert parse_qs(server.requests[0][-1]) == {"chat_id": ["42"], "text": ["hi"]}
+
+
+def test_findings_dropped_on_a_full_queue_are_not_remembered(stub_server):
+    dispatcher = AlertDispatcher(channels=[make_channel(stub_server())], queue_size=1)
+    dispatcher.start = lambda: None  # No worker: the queue stays full
+    dispatcher.queue.put_nowait(("ethereum", 1, "large_transfer", {}))
+    details = {"hash": "0x" + "2" * 64, "address": "0xabc", "chain": "ethereum"}
+
+    assert not dispatcher.submit("known_scam", details)
+    assert dispatcher.stats["findings_dropped"] == 1
+
+    dispatcher.queue.get_nowait()
+    assert dispatcher.submit("known_scam", dict(details))  # Not suppressed as a duplicate of the dropped one
+    assert dispatcher.stats["findings_suppressed"] == 0
@@ -0,0 +1,200 @@
+import threading
+
+from src.services.block_tailer_service import BlockTailer
+
+SCAM = "0x" + "5c" * 20
+DRAINED = "0x" + "d1" * 20
+THIEF = "0x" + "7f" * 20
+
+
+def make_tailer(rpc_server, **kwargs):
+    return BlockTailer("ethereum", rpc_url=rpc_server.url, **kwargs)
+
+def taint_findings(findings):
+    return [(f["details"]["address"], f["details"]["block_number"]) for f in findings if f["type"] == "tainted_funds_transfer"]
+
+
+def test_catch_up_fetches_the_gap_in_batches(scripted_chain, rpc_server, scam_db):
+    for n in range(1, 12):
+        scripted_chain.set_block(n, [("0x" + "aa" * 20, "0x" + "bb" * 20, 1)])
+    tailer = make_tailer(rpc_server, start_block=1, batch_size=4, track_activity=False, track_taint=False)
+    fetched = []
+    fetch_blocks = tailer.adapter.fetch_blocks
+    tailer.adapter.fetch_blocks = lambda block_numbers: fetched.append(list(block_numbers)) or fetch_blocks(block_numbers)
+
+    summary = {}
+    processed = [block_number for block_number, _, _ in tailer.iter_poll(summary)]
+
+    assert processed == list(range(1, 12))
+    assert fetched == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11]]
+    assert summary["status"] == "success"
+    assert (summary["from_block"], summary["to_block"]) == (1, 11)
+    assert summary["transactions_analyzed"] == 11
+    assert tailer.status()["lag_blocks"] == 0
+
+
+def test_max_blocks_bounds_one_poll(scripted_chain, rpc_server, scam_db):
+    for n in range(1, 11):
+        scripted_chain.set_block(n)
+    tailer = make_tailer(rpc_server, start_block=1, track_activity=False, track_taint=False)
+
+    first = tailer.poll_once(max_blocks=3)
+    second = tailer.poll_once()
+
+    assert (first["from_block"], first["to_block"]) == (1, 3)
+    assert (second["from_block"], second["to_block"]) == (4, 10)
+    assert tailer.poll_once()["blocks_processed"] == 0
+
+
+def test_a_paused_consumer_does_not_block_other_polls(scripted_chain, rpc_server, scam_db):
+    for n in range(1, 7):
+        scripted_chain.set_block(n)
+    tailer = make_tailer(rpc_server, start_block=1, batch_size=2, track_activity=False, track_taint=False)
+    stream = tailer.iter_poll({})
+    assert next(stream)[0] == 1  # The consumer stops reading after the first block, like a slow HTTP client
+
+    poller = threading.Thread(target=tailer.poll_once, daemon=True)
+    poller.start()
+    poller.join(timeout=5)
+
+    assert not poller.is_alive()
+    assert tailer.last_processed_block == 6
+    assert [block_number for block_number, _, _ in stream] == [2]  # The rest of its batch; the other poll did the remainder
+
+
+def test_a_failing_rule_stops_the_poll_before_the_block(scripted_chain, rpc_server, scam_db, findings_store,
+                                                       failing_rule):
+    for n in range(1, 4):
+        scripted_chain.set_block(n, [(DRAINED, THIEF, 200 + n)])
+    failing_rule(202)  # Block 2's transfer
+    tailer = make_tailer(rpc_server, start_block=1, store=findings_store, track_taint=False)
+
+    summary = tailer.poll_once()
+
+    assert summary["status"] == "partial"
+    assert "test_failing_rule" in summary["message"]
+    assert (summary["to_block"], tailer.last_processed_block) == (1, 1)
+    assert findings_store.get_checkpoint("ethereum") == 1
+    assert findings_store.get_block("ethereum", 2) is None
+    assert tailer.activity.last_block == 1  # The failed block is not half-observed
+
+    failing_rule()
+    assert tailer.poll_once()["blocks_processed"] == 2
+    assert {f["details"]["block_number"] for f in findings_store.query_findings(chain="ethereum", finding_type="large_transfer")} == {1, 2, 3}
+
+
+def test_blocks_whose_token_logs_fail_are_retried(scripted_chain, rpc_server, scam_db, findings_store):
+    for n in range(1, 5):
+        scripted_chain.set_block(n)
+    scripted_chain.failing_logs = {3}
+    tailer = make_tailer(rpc_server, start_block=1, store=findings_store, track_activity=False, track_taint=False)
+
+    summary = tailer.poll_once()
+
+    assert summary["status"] == "partial"
+    assert "Token transfer logs of block 3" in summary["message"]
+    assert findings_store.get_checkpoint("ethereum") == 2
+    assert findings_store.get_block("ethereum", 3) is None
+
+    scripted_chain.failing_logs = set()
+    assert (tailer.poll_once()["from_block"], findings_store.get_checkpoint("ethereum")) == (3, 4)
+
+
+def test_blocks_rescanned_ahead_of_the_tailer_are_still_recorded_live(scripted_chain, rpc_server, scam_db,
+                                                                       findings_store):
+    scripted_chain.set_block(1)
+    scripted_chain.set_block(2, [(DRAINED, THIEF, 20)] * 3)
+    # A range scan got to block 2 first: it stored the rule findings only
+    findings_store.record_block("ethereum", 2, [], 3, scripted_chain.block_hash(2), advance_checkpoint=False, replace=True)
+    alerted = []
+    tailer = make_tailer(rpc_server, start_block=1, store=findings_store, track_taint=False,
+                         on_findings=lambda block_number, findings: alerted.extend(f["type"] for f in findings))
+
+    tailer.poll_once()
+
+    assert alerted == ["drained_wallet_activity"]
+    stored = findings_store.query_findings(chain="ethereum", finding_type="drained_wallet_activity")
+    assert [f["details"]["block_number"] for f in stored] == [2]
+
+
+def test_checkpoint_is_resumed_from_the_store(scripted_chain, rpc_server, scam_db, findings_store):
+    for n in range(1, 6):
+        scripted_chain.set_block(n)
+    make_tailer(rpc_server, start_block=1, store=findings_store).poll_once()
+    assert findings_store.get_checkpoint("ethereum") == 5
+
+    for n in range(6, 9):
+        scripted_chain.set_block(n)
+    restarted = make_tailer(rpc_server, store=findings_store)
+    summary = restarted.poll_once()
+
+    assert (summary["from_block"], summary["to_block"]) == (6, 8)
+    assert findings_store.get_checkpoint("ethereum") == 8
+
+
+def test_reorg_retracts_replaced_blocks(scripted_chain, rpc_server, scam_db, findings_store):
+    for n in range(1, 6):
+        scripted_chain.set_block(n, [("0x" + "aa" * 20, "0x" + "bb" * 20, 200)])  # Large transfers
+    tailer = make_tailer(rpc_server, start_block=1, store=findings_store, track_activity=False, track_taint=False)
+    tailer.poll_once()
+    orphaned_hashes = {n: scripted_chain.block_hash(n) for n in (4, 5)}
+
+    for n in (4, 5, 6):
+        scripted_chain.set_block(n, branch="fork")  # Canonical blocks without transfers
+    summary = tailer.poll_once()
+
+    assert summary["reorgs"] == 1
+    assert tailer.last_reorg["fork_block"] == 3
+    assert tailer.last_reorg["replaced_blocks"] == 2
+    assert tailer.last_processed_block == 6
+    assert findings_store.get_block("ethereum", 4)["block_hash"] == scripted_chain.block_hash(4) != orphaned_hashes[4]
+    assert {f["details"]["block_number"] for f in findings_store.query_findings(chain="ethereum")} == {1, 2, 3}
+    assert {f["details"]["block_number"] for f in tailer.recent_findings} == {1, 2, 3}
+    assert {f["details"]["chain"] for f in tailer.recent_findings} == {"ethereum"}
+
+
+def test_reorg_rolls_back_address_activity(scripted_chain, rpc_server, scam_db, findings_store):
+    scripted_chain.set_block(1)
+    scripted_chain.set_block(2, [(DRAINED, THIEF, 20)] * 3)  # 60 ETH to one address: a drain
+    tailer = make_tailer(rpc_server, start_block=1, store=findings_store, track_taint=False)
+    assert [f["type"] for f in tailer.poll_once()["findings"]] == ["drained_wallet_activity"]
+
+    # The drain moves to block 3 on the canonical chain; block 2 becomes empty
+    scripted_chain.set_block(2, branch="fork")
+    scripted_chain.set_block(3, [(DRAINED, THIEF, 20)] * 3)
+    summary = tailer.poll_once()
+
+    assert summary["reorgs"] == 1
+    assert [(f["type"], f["details"]["block_number"]) for f in summary["findings"]] == [("drained_wallet_activity", 3)]
+    assert tailer.activity.stats(DRAINED)["outflow_eth"] == 60
+    assert tailer.activity.stats(DRAINED)["tx_count"] == 3
+    stored = findings_store.query_findings(chain="ethereum", finding_type="drained_wallet_activity")
+    assert [f["details"]["block_number"] for f in stored] == [3]
+
+
+def test_reorg_rolls_back_taint(scripted_chain, rpc_server, scam_db, findings_store):
+    victim, mule, other = "0x" + "a1" * 20, "0x" + "a2" * 20, "0x" + "a3" * 20
+    scam_db(SCAM)
+    scripted_chain.set_block(1)
+    scripted_chain.set_block(2, [(SCAM, victim, 10)])
+    scripted_chain.set_block(3, [(victim, mule, 5)])
+    tailer = make_tailer(rpc_server, start_block=1, store=findings_store, track_activity=False)
+    assert taint_findings(tailer.poll_once()["findings"]) == [(victim, 3)]
+
+    # On the canonical chain the scam address paid someone else and nothing moved on
+    scripted_chain.set_block(2, [(SCAM, other, 10)], branch="fork")
+    scripted_chain.set_block(3, branch="fork")
+    scripted_chain.set_block(4, branch="fork")
+    summary = tailer.poll_once()
+
+    assert summary["reorgs"] == 1
+    assert taint_findings(summary["findings"]) == []
+    assert set(tailer.taint.tainted) == {other}
+    assert tailer.taint.flagged == {}
+    reached = tailer.taint.graph.trace_taint(SCAM)["reached"]
+    assert [(r["address"], r["value_eth"]) for r in reached] == [(other, 10)]
+    assert findings_store.query_findings(chain="ethereum", finding_type="tainted_funds_transfer") == []
+
+    # The retracted finding is raised again when the funds do move on the canonical chain
+    scripted_chain.set_block(5, [(other, mule, 5)])
+    assert taint_findings(tailer.poll_once()["findings"]) == [(other, 5)]
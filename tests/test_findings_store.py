@@ -0,0 +1,55 @@
+import sqlite3
+
+from src.services.findings_store_service import FindingsStore
+
+
+def finding(finding_type, tx="0x" + "1" * 64):
+    return {"type": finding_type, "message": finding_type, "details": {"hash": tx, "address": "0xabc"}}
+
+
+def stored_types(store, block_number):
+    return sorted(f["type"] for f in store.query_findings(chain="ethereum", block_number=block_number))
+
+
+def test_live_recording_takes_over_a_rescanned_block(findings_store):
+    findings_store.record_block("ethereum", 7, [finding("large_transfer")], 1, "0x07",
+                                advance_checkpoint=False, replace=True)
+    assert findings_store.get_block("ethereum", 7)["rescan"] == 1
+
+    live = [finding("large_transfer"), finding("drained_wallet_activity")]
+    assert findings_store.record_block("ethereum", 7, live, 1, "0x07")
+
+    assert stored_types(findings_store, 7) == ["drained_wallet_activity", "large_transfer"]
+    assert findings_store.get_block("ethereum", 7)["rescan"] == 0
+    assert not findings_store.record_block("ethereum", 7, live, 1, "0x07")  # Now a live block: recorded once
+    assert stored_types(findings_store, 7) == ["drained_wallet_activity", "large_transfer"]
+
+
+def test_rescanning_a_live_block_keeps_it_live(findings_store):
+    findings_store.record_block("ethereum", 7, [finding("drained_wallet_activity")], 1, "0x07")
+    findings_store.record_block("ethereum", 7, [finding("large_transfer")], 1, "0x07", advance_checkpoint=False,
+                                replace=True, keep_types=("drained_wallet_activity",))
+
+    assert findings_store.get_block("ethereum", 7)["rescan"] == 0
+    assert stored_types(findings_store, 7) == ["drained_wallet_activity", "large_transfer"]
+
+
+def test_rescanned_blocks_are_not_used_for_reorg_detection(findings_store):
+    findings_store.record_block("ethereum", 5, [], 0, "0x05")
+    findings_store.record_block("ethereum", 9, [], 0, "0x09", advance_checkpoint=False, replace=True)
+
+    assert findings_store.recent_block_hashes("ethereum", 10) == [(5, "0x05")]
+
+
+def test_stores_without_the_rescan_column_are_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE processed_blocks (chain TEXT NOT NULL, block_number INTEGER NOT NULL, block_hash TEXT, "
+                     "parent_hash TEXT, tx_count INTEGER NOT NULL, findings_count INTEGER NOT NULL, "
+                     "processed_at REAL NOT NULL, PRIMARY KEY (chain, block_number))")
+        conn.execute("INSERT INTO processed_blocks VALUES ('ethereum', 1, '0x01', NULL, 0, 0, 0)")
+
+    store = FindingsStore(path)
+
+    assert store.get_block("ethereum", 1)["rescan"] == 0
+    assert store.record_block("ethereum", 2, [], 0, "0x02")
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+from src.services.chain_adapter_service import create_chain_adapter
+from src.services.ingestion_pipeline_service import IngestionPipeline
+
+
+def run_until(pipeline, done, timeout=10):
+    """Runs the pipeline until done() is true, then stops it and waits for it to drain."""
+    async def main():
+        task = asyncio.create_task(pipeline.run())
+        deadline = time.monotonic() + timeout
+        while not done() and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        pipeline.stop()
+        await task
+
+    asyncio.run(main())
+
+
+def make_pipeline(rpc_server, **kwargs):
+    adapter = create_chain_adapter("ethereum", rpc_server.url)
+    adapter.poll_interval = 0.05
+    return IngestionPipeline([adapter], alert_handler=lambda finding_type, details: None, **kwargs)
+
+
+def test_blocks_are_analyzed_and_checkpointed(scripted_chain, rpc_server, scam_db, findings_store):
+    for n in range(1, 6):
+        scripted_chain.set_block(n, [("0x" + "aa" * 20, "0x" + "bb" * 20, 200)])
+    pipeline = make_pipeline(rpc_server, start_blocks={"ethereum": 1}, store=findings_store)
+    feed = pipeline.feeds[0]
+
+    run_until(pipeline, lambda: feed.last_analyzed_block == 5)
+
+    assert findings_store.get_checkpoint("ethereum") == 5
+    assert len(findings_store.query_findings(chain="ethereum", finding_type="large_transfer")) == 5
+    assert feed.first_failed_block is None
+
+
+def test_failed_analysis_holds_the_checkpoint(scripted_chain, rpc_server, scam_db, findings_store, failing_rule):
+    for n in range(1, 6):
+        scripted_chain.set_block(n, [("0x" + "aa" * 20, "0x" + "bb" * 20, n)])
+    failing_rule(3)  # A rule raises on block 3's transfer
+    pipeline = make_pipeline(rpc_server, start_blocks={"ethereum": 1}, store=findings_store)
+    feed = pipeline.feeds[0]
+
+    run_until(pipeline, lambda: feed.last_analyzed_block == 5)
+
+    assert feed.first_failed_block == 3
+    assert feed.failed_blocks == 1
+    assert pipeline.analyze_stats.errors == 1
+    assert findings_store.get_block("ethereum", 3) is None  # Not recorded as a clean block
+    assert findings_store.get_block("ethereum", 4) is not None
+    assert findings_store.get_checkpoint("ethereum") == 2
+
+    # After a restart the failed block is analyzed again; blocks stored since are skipped
+    failing_rule()
+    restarted = make_pipeline(rpc_server, store=findings_store)
+    run_until(restarted, lambda: restarted.feeds[0].last_analyzed_block == 5)
+
+    assert findings_store.get_block("ethereum", 3) is not None
+    assert findings_store.get_checkpoint("ethereum") == 5
+
+
+def test_reorg_retracts_replaced_blocks(scripted_chain, rpc_server, scam_db, findings_store):
+    drained, thief = "0x" + "d1" * 20, "0x" + "d2" * 20
+    for n in range(1, 4):
+        scripted_chain.set_block(n, [("0x" + "aa" * 20, "0x" + "bb" * 20, 200)])
+    scripted_chain.set_block(4, [(drained, thief, 20)] * 3)  # A drain, only on the orphaned branch
+    scripted_chain.set_block(5, [("0x" + "aa" * 20, "0x" + "bb" * 20, 200)])
+    pipeline = make_pipeline(rpc_server, start_blocks={"ethereum": 1}, store=findings_store)
+    feed = pipeline.feeds[0]
+    forked = []
+
+    def done():
+        if feed.last_analyzed_block == 5 and not forked:
+            forked.append(scripted_chain.block_hash(4))
+            for n in (4, 5, 6):
+                scripted_chain.set_block(n, branch="fork")  # Canonical blocks without transfers
+        return feed.reorgs_detected == 1 and feed.last_analyzed_block == 6
+
+    run_until(pipeline, done)
+
+    assert feed.last_reorg["fork_block"] == 3
+    assert feed.last_reorg["replaced_blocks"] == 2
+    assert findings_store.get_checkpoint("ethereum") == 6
+    assert findings_store.get_block("ethereum", 4)["block_hash"] == scripted_chain.block_hash(4) != forked[0]
+    assert {f["details"]["block_number"] for f in findings_store.query_findings(chain="ethereum")} == {1, 2, 3}
+    assert feed.activity.stats(drained)["tx_count"] == 0
+
+
+def test_reorg_is_detected_after_a_restart(scripted_chain, rpc_server, scam_db, findings_store):
+    for n in range(1, 6):
+        scripted_chain.set_block(n, [("0x" + "aa" * 20, "0x" + "bb" * 20, 200)])
+    pipeline = make_pipeline(rpc_server, start_blocks={"ethereum": 1}, store=findings_store)
+    run_until(pipeline, lambda: pipeline.feeds[0].last_analyzed_block == 5)
+
+    for n in (5, 6):
+        scripted_chain.set_block(n, branch="fork")
+    restarted = make_pipeline(rpc_server, store=findings_store)  # Resumes from the stored checkpoint and hashes
+    feed = restarted.feeds[0]
+    run_until(restarted, lambda: feed.last_analyzed_block == 6)
+
+    assert feed.last_reorg["fork_block"] == 4
+    assert {f["details"]["block_number"] for f in findings_store.query_findings(chain="ethereum")} == {1, 2, 3, 4}
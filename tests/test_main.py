@@ -0,0 +1,30 @@
+import pytest
+
+from src import main
+
+
+@pytest.fixture
+def lazy_app(monkeypatch):
+    """Yields src.main with no warm-up steps and no app created yet; drops the created app afterwards."""
+    monkeypatch.setattr(main, "WARMUP_STEPS", [])
+    monkeypatch.delitem(main.__dict__, "app", raising=False)
+    yield main
+    main.__dict__.pop("app", None)
+
+
+def test_module_level_app_is_created_on_first_access(lazy_app):
+    assert "app" not in vars(lazy_app)  # Importing does not create the app
+
+    app = lazy_app.app
+
+    assert lazy_app.app is app
+    assert app.test_client().get("/api/health").status_code == 200
+    with pytest.raises(AttributeError):
+        lazy_app.application
+
+
+def test_debug_is_off_unless_enabled(lazy_app, monkeypatch):
+    assert lazy_app.create_app(warmup="off").config["DEBUG"] is False
+
+    monkeypatch.setattr(lazy_app, "APP_DEBUG", True)
+    assert lazy_app.create_app(warmup="off").config["DEBUG"] is True
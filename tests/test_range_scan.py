@@ -0,0 +1,62 @@
+import pytest
+
+from src.services import range_scan_service
+from src.services.range_scan_service import RangeScanJob, scan_chunk
+
+SENDER, RECIPIENT = "0x" + "aa" * 20, "0x" + "bb" * 20
+
+
+def stored_types(store, block_number):
+    return sorted(f["type"] for f in store.query_findings(chain="ethereum", block_number=block_number))
+
+
+def test_rescan_replaces_rule_findings_and_keeps_stateful_ones(scripted_chain, rpc_server, scam_db, findings_store,
+                                                               monkeypatch):
+    monkeypatch.setattr(range_scan_service, "RANGE_SCAN_START_METHOD", "fork")  # Workers inherit the test scam database
+    for n in range(1, 4):
+        scripted_chain.set_block(n, [(SENDER, RECIPIENT, 200)])
+    stale = {"type": "large_transfer", "message": "stale", "details": {"hash": "0x" + "1" * 64, "value_eth": 1}}
+    drain = {"type": "drained_wallet_activity", "message": "drain", "details": {"address": SENDER, "outflow_eth": 600}}
+    findings_store.record_block("ethereum", 2, [stale, drain], 1, advance_checkpoint=False)
+
+    status = RangeScanJob(1, 3, rpc_url=rpc_server.url, workers=1, store=findings_store).run()
+
+    assert status["status"] == "completed"
+    assert stored_types(findings_store, 2) == ["drained_wallet_activity", "large_transfer"]
+    [large] = findings_store.query_findings(chain="ethereum", block_number=2, finding_type="large_transfer")
+    assert large["details"]["value_eth"] == 200
+    assert findings_store.get_block("ethereum", 2)["findings_count"] == 2
+    assert findings_store.get_checkpoint("ethereum") is None  # Rescans leave the live checkpoint alone
+
+
+def test_token_logs_are_only_requested_on_ethereum(scripted_chain, rpc_server, scam_db):
+    for n in range(1, 4):
+        scripted_chain.set_block(n)
+
+    bsc = scan_chunk("bsc", rpc_server.url, 1, 3)
+    assert [block["block_number"] for block in bsc["blocks"]] == [1, 2, 3]
+    assert scripted_chain.log_queries == []
+
+    scan_chunk("ethereum", rpc_server.url, 1, 3)
+    assert scripted_chain.log_queries == [(1, 3)]
+
+
+def test_a_failed_log_fetch_fails_the_block(scripted_chain, rpc_server, scam_db):
+    for n in range(1, 4):
+        scripted_chain.set_block(n)
+    scripted_chain.failing_logs = {2}
+
+    result = scan_chunk("ethereum", rpc_server.url, 1, 3)
+
+    assert [block["block_number"] for block in result["blocks"]] == [1]
+    assert result["failed_block"] == 2
+
+
+@pytest.mark.parametrize("chain, message", [
+    ("bitcoin", "EVM chains only"),
+    ("bsc", "No RPC endpoint configured for bsc"),
+])
+def test_unsupported_chains_are_rejected(chain, message, monkeypatch):
+    monkeypatch.delenv("BSC_RPC_URL", raising=False)
+    with pytest.raises(ValueError, match=message):
+        RangeScanJob(1, 3, chain=chain)
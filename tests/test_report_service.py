@@ -0,0 +1,214 @@
+import threading
+import time
+from urllib.parse import parse_qs
+
+import pytest
+from flask import Flask
+
+from src.routes import report_routes
+from src.routes.report_routes import report_bp
+from src.services import monitoring_service, report_service
+from src.services.report_service import SingleFlightCache, get_wallet_report
+
+WALLET = "0x" + "ab" * 20
+WEI_PER_ETH = 10**18
+
+
+def etherscan_tx(i, value_eth, to="0x" + "cd" * 20):
+    return {"hash": f"0x{i:064x}", "from": WALLET, "to": to, "value": str(int(value_eth * WEI_PER_ETH)),
+            "blockNumber": str(19_000_000 + i)}
+
+
+class FakeEtherscan:
+    """Etherscan responder: txlist pages, tokentx, and optional per-action failures or delays."""
+
+    def __init__(self, transactions=(), token_transfers=(), delay=0.0):
+        self.transactions = list(transactions)
+        self.token_transfers = list(token_transfers)
+        self.delay = delay
+        self.failures = {}  # action -> (status, body)
+
+    def __call__(self, method, path, query, body):
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        action = params.get("action")
+        if self.delay:
+            time.sleep(self.delay)
+        if action in self.failures:
+            status, payload = self.failures[action]
+            return status, {}, payload
+        if action == "txlist":
+            page, size = int(params["page"]), int(params["offset"])
+            result = self.transactions[(page - 1) * size:page * size]
+        elif action == "tokentx":
+            result = self.token_transfers
+        else:
+            return 200, {}, {"status": "0", "message": "NOTOK", "result": f"Unknown action {action}"}
+        if not result:
+            return 200, {}, {"status": "0", "message": "No transactions found", "result": []}
+        return 200, {}, {"status": "1", "message": "OK", "result": result}
+
+
+@pytest.fixture
+def upstreams(stub_server, rpc_server, scam_db, monkeypatch):
+    """Points reports at a stub Etherscan and the fake JSON-RPC server, with a fresh report cache."""
+    etherscan = FakeEtherscan(
+        transactions=[etherscan_tx(1, 250), etherscan_tx(2, 0.5), etherscan_tx(3, 1.5)],
+        token_transfers=[{"tokenSymbol": "USDT"}, {"tokenSymbol": "WETH"}, {"tokenSymbol": "USDT"}],
+    )
+    server = stub_server(etherscan)
+    monkeypatch.setattr(report_service, "ETHERSCAN_API_URL", server.url + "/api")
+    monkeypatch.setattr(monitoring_service, "ETH_RPC_URL", rpc_server.url)
+    cache = SingleFlightCache(ttl=300, cacheable=report_service.REPORT_CACHE.cacheable)
+    monkeypatch.setattr(report_service, "REPORT_CACHE", cache)
+    monkeypatch.setattr(report_routes, "REPORT_CACHE", cache)
+    etherscan.server = server
+    return etherscan
+
+
+def report_builds(etherscan):
+    """Number of reports built against the stub: each build requests the first history page once."""
+    return sum(1 for *_, query, _ in etherscan.server.requests if "action=txlist" in query and "page=1&" in query)
+
+
+def test_report_combines_all_lookups(upstreams):
+    report = get_wallet_report(WALLET.upper().replace("0X", "0x"))
+
+    assert report["status"] == "success"
+    assert report["cache"] == "computed"
+    details = report["details"]
+    assert details["address"] == WALLET
+    assert details["balance_eth"] == 1.0  # The fake node reports 1 ETH for every address
+    assert details["transactions_analyzed"] == 3
+    assert details["tokens"] == ["USDT", "WETH"]
+    assert details["token_transfer_count"] == 3
+    assert details["is_known_scam"] is False
+    assert details["errors"] == []
+    assert [f["type"] for f in details["findings"]] == ["large_transfer"]
+    assert details["findings"][0]["details"]["chain"] == "ethereum"
+    assert details["risk_score"] > 0
+    assert report_builds(upstreams) == 1
+
+
+def test_known_scam_address_is_reported(upstreams, scam_db):
+    scam_db(WALLET)
+    details = get_wallet_report(WALLET)["details"]
+
+    assert details["is_known_scam"] is True
+    assert details["findings"][0]["type"] == "interacts_with_known_scam_address"
+
+
+def test_reports_are_cached_until_the_ttl_expires(upstreams, monkeypatch):
+    monkeypatch.setattr(report_service.REPORT_CACHE, "ttl", 0.3)
+
+    assert get_wallet_report(WALLET)["cache"] == "computed"
+    assert get_wallet_report(WALLET)["cache"] == "cache"
+    assert report_builds(upstreams) == 1
+    time.sleep(0.35)
+    assert get_wallet_report(WALLET)["cache"] == "computed"
+    assert report_builds(upstreams) == 2
+
+
+def test_concurrent_requests_share_one_build(upstreams):
+    upstreams.delay = 0.3
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_wallet_report(WALLET))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(report["cache"] for report in results) == ["coalesced"] * 4 + ["computed"]
+    assert report_builds(upstreams) == 1
+    assert {report["details"]["transactions_analyzed"] for report in results} == {3}
+    assert report_service.REPORT_CACHE.status()["coalesced"] == 4
+
+
+def test_failed_lookups_are_listed_and_not_cached(upstreams):
+    upstreams.failures["tokentx"] = (500, {"message": "Internal error"})
+
+    report = get_wallet_report(WALLET)
+    assert report["status"] == "success"
+    assert [error["lookup"] for error in report["details"]["errors"]] == ["token_transfers"]
+    assert report["details"]["transactions_analyzed"] == 3
+    assert report["details"]["tokens"] == []
+
+    del upstreams.failures["tokentx"]
+    retried = get_wallet_report(WALLET)
+    assert retried["cache"] == "computed"
+    assert retried["details"]["errors"] == []
+
+
+def test_etherscan_error_message_is_reported(upstreams):
+    upstreams.failures["txlist"] = (200, {"status": "0", "message": "NOTOK", "result": "Invalid API Key"})
+
+    report = get_wallet_report(WALLET)
+    assert report["status"] == "success"
+    assert report["details"]["errors"] == [
+        {"lookup": "transactions_page_1", "message": "Invalid API Key", "source": "Etherscan"}]
+
+
+def test_report_fails_when_every_upstream_lookup_fails(upstreams, monkeypatch):
+    for action in ("txlist", "tokentx"):
+        upstreams.failures[action] = (200, {"status": "0", "message": "NOTOK", "result": "Invalid API Key"})
+    monkeypatch.setattr(monitoring_service, "ETH_RPC_URL", "http://127.0.0.1:9")  # Nothing listens here
+
+    report = get_wallet_report(WALLET)
+
+    assert report["status"] == "error"
+    assert report["message"] == "All upstream lookups failed."
+    assert {error["lookup"] for error in report["errors"]} == {"balance", "token_transfers", "transactions_page_1"}
+    assert get_wallet_report(WALLET)["cache"] == "computed"  # Errors are never cached
+
+
+def test_single_flight_errors_reach_every_waiter():
+    cache = SingleFlightCache(ttl=60)
+    started = threading.Event()
+    outcomes = []
+
+    def compute():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError("upstream down")
+
+    def waiter():
+        started.wait()
+        try:
+            cache.get_or_compute("key", lambda: "unused")
+        except RuntimeError as e:
+            outcomes.append(str(e))
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("key", compute)
+    thread.join()
+
+    assert outcomes == ["upstream down"]
+    assert cache.get_or_compute("key", lambda: "recovered") == ("recovered", "computed")
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(report_bp, url_prefix="/api/reports")
+    return app.test_client()
+
+
+def test_on_demand_route(upstreams, client):
+    response = client.post("/api/reports/on-demand", json={"identifier": WALLET})
+    assert response.status_code == 200
+    assert response.json["details"]["transactions_analyzed"] == 3
+
+    assert client.post("/api/reports/on-demand", json={"identifier": "0x1234"}).status_code == 400
+    assert client.post("/api/reports/on-demand", json={"identifier": WALLET, "chain": "bitcoin"}).status_code == 400
+    assert client.get("/api/reports/cache").json["cache"]["misses"] == 1
+
+
+def test_on_demand_route_returns_502_when_upstreams_fail(upstreams, client, monkeypatch):
+    for action in ("txlist", "tokentx"):
+        upstreams.failures[action] = (503, {"message": "unavailable"})
+    monkeypatch.setattr(monitoring_service, "ETH_RPC_URL", "http://127.0.0.1:9")
+
+    response = client.post("/api/reports/on-demand", json={"identifier": WALLET})
+    assert response.status_code == 502
+    assert response.json["status"] == "error"
@@ -0,0 +1,42 @@
+from src.services import risk_assessment_service
+from src.services.risk_assessment_service import RISK_SCORE_FACTORS, RiskScorer
+
+BASE = RISK_SCORE_FACTORS["large_transfer"]
+
+
+def large_transfer(value, currency):
+    return {"type": "large_transfer", "details": {"value_eth": value, "currency": currency}}
+
+
+def test_value_tiers_apply_to_eth_amounts():
+    scorer = RiskScorer()
+
+    assert scorer.finding_score(large_transfer(150, "ETH")) == BASE * 1.0
+    assert scorer.finding_score(large_transfer(1500, "ETH")) == BASE * 1.5
+    assert scorer.finding_score(large_transfer(9000, "ETH")) == BASE * 2.0
+
+
+def test_findings_without_a_currency_are_scored_as_eth():
+    assert RiskScorer().finding_score({"type": "large_transfer", "details": {"value_eth": 600}}) == BASE * 1.2
+
+
+def test_other_currencies_use_their_own_tiers():
+    scorer = RiskScorer(value_multipliers={"ETH": {100: 1.0, 5000: 2.0}, "BNB": {50_000: 1.5}})
+
+    assert scorer.finding_score(large_transfer(900_000, "POL")) == BASE  # No POL tiers: not scaled
+    assert scorer.finding_score(large_transfer(6000, "BNB")) == BASE
+    assert scorer.finding_score(large_transfer(60_000, "BNB")) == BASE * 1.5
+    assert scorer.finding_score(large_transfer(6000, "ETH")) == BASE * 2.0
+
+
+def test_overall_summary_scores_the_findings_once(monkeypatch):
+    calls = []
+    score = risk_assessment_service.calculate_risk_score
+    monkeypatch.setattr(risk_assessment_service, "calculate_risk_score", lambda findings: calls.append(1) or score(findings))
+    findings = [large_transfer(150, "ETH")]
+    findings[0]["details"].update({"hash": "0x1", "from": "0xa", "to": "0xb", "chain": "ethereum"})
+
+    summary, risk = risk_assessment_service.generate_overall_summary_and_risk(findings)
+
+    assert calls == [1]
+    assert summary.startswith(f"**Overall Risk Score: {risk}/100**")
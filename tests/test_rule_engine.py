@@ -0,0 +1,43 @@
+import pytest
+
+from src.services.monitoring_service import TransactionBatch, analyze_batch
+from src.services.rule_engine_service import RuleError, evaluate_rules, register_rule, rules_for_chain, unregister_rule
+
+SENDER, RECIPIENT = "0x" + "aa" * 20, "0x" + "bb" * 20
+WEI_PER_ETH = 10**18
+
+
+def transfer(i, value_eth, sender=SENDER, recipient=RECIPIENT):
+    return {"hash": f"0x{i:064x}", "from": sender, "to": recipient, "value": hex(int(value_eth * WEI_PER_ETH))}
+
+
+def test_rule_errors_propagate(failing_rule, scam_db):
+    failing_rule(5)
+    batch = TransactionBatch([transfer(1, 200), transfer(2, 5)])
+
+    with pytest.raises(RuleError, match="test_failing_rule"):
+        analyze_batch(batch, "ethereum")
+    assert next(rule for rule in rules_for_chain("ethereum") if rule.name == "test_failing_rule").errors == 1
+
+
+def test_short_circuit_withholds_matched_rows_from_costlier_rules():
+    seen_by_costly_rule = []
+
+    @register_rule("test_cheap_rule", chains=("test_chain",), fields=("value",), cost=1, short_circuit=True)
+    def cheap(batch, rows):
+        return [(row, {"type": "cheap"}) for row in rows if batch.values_wei[row] >= 100 * WEI_PER_ETH]
+
+    @register_rule("test_costly_rule", chains=("test_chain",), fields=("value",), cost=9)
+    def costly(batch, rows):
+        seen_by_costly_rule.extend(rows)
+        return [(row, {"type": "costly"}) for row in rows]
+
+    try:
+        batch = TransactionBatch([transfer(1, 200), transfer(2, 5), transfer(3, 150), transfer(4, 1)])
+        findings = evaluate_rules(batch, "test_chain")
+    finally:
+        unregister_rule("test_cheap_rule")
+        unregister_rule("test_costly_rule")
+
+    assert seen_by_costly_rule == [1, 3]
+    assert [(row, finding["type"]) for row, finding in findings] == [(0, "cheap"), (1, "costly"), (2, "cheap"), (3, "costly")]
@@ -0,0 +1,35 @@
+from src.services import scam_db_service
+from src.services.scam_db_service import address_key, build_scam_index, is_address_scam, load_scam_database
+
+SCAM = "0x" + "5c" * 20
+
+
+def test_reload_keeps_the_old_state_readable(scam_db):
+    scam_db(SCAM)
+    build_scam_index()
+    load_scam_database()  # SCAM is now looked up in the mapped index
+    old_state = scam_db_service.SCAM_DB
+
+    load_scam_database()  # Swaps in a new state while a reader still holds the old one
+
+    assert scam_db_service.SCAM_DB is not old_state
+    assert old_state.contains(address_key(SCAM))
+
+
+def test_failed_first_load_is_retried_with_backoff(scam_db, monkeypatch):
+    with open(scam_db_service.SCAM_INDEX_FILE_PATH, "wb") as f:
+        f.write(b"not an index" * 100)
+    monkeypatch.setattr(scam_db_service, "SCAM_DB", None)
+    loads = []
+    monkeypatch.setattr(scam_db_service, "load_scam_database", lambda: loads.append(1) or load_scam_database())
+
+    assert not any(is_address_scam(SCAM) for _ in range(5))
+    assert len(loads) == 1
+    assert scam_db_service.LOAD_FAILURES == 1
+
+    build_scam_index()  # Repaired; picked up once the retry delay has passed
+    monkeypatch.setattr(scam_db_service, "LAST_LOAD_TIME", scam_db_service.LAST_LOAD_TIME - 60)
+    is_address_scam(SCAM)
+    assert len(loads) == 2
+    assert scam_db_service.SCAM_DB is not None
+    assert scam_db_service.LOAD_FAILURES == 0
@@ -0,0 +1,52 @@
+from src.services.monitoring_service import TransactionBatch
+from src.services.transaction_graph_service import TaintMonitor, TransactionGraph
+
+WEI_PER_ETH = 10**18
+SCAM = "0x" + "5c" * 20
+
+
+def address(n):
+    return f"0x{n:040x}"
+
+
+def transfers(block_number, *edges):
+    return TransactionBatch([{"hash": f"0x{block_number:032x}{i:032x}", "from": sender, "to": recipient,
+                              "value": hex(int(value * WEI_PER_ETH))}
+                             for i, (sender, recipient, value) in enumerate(edges)])
+
+
+def test_blocks_leave_the_graph_window():
+    graph = TransactionGraph(window_blocks=3, max_pending_edges=1)  # Compacts on every block
+    for n in range(1, 7):
+        graph.add_block(n, [(address(2 * n), address(2 * n + 1), 1.0)])
+
+    assert graph.status()["blocks_in_window"] == 3
+    assert graph.edge_count() == 3
+    assert sorted(graph.addresses) == [address(i) for i in range(8, 14)]  # Addresses of expired blocks are dropped
+    assert graph.trace_taint(address(2))["reached"] == []
+    assert [r["address"] for r in graph.trace_taint(address(12))["reached"]] == [address(13)]
+
+
+def test_unwound_edges_are_removed():
+    sender, recipient = address(1), address(2)
+    graph = TransactionGraph(max_pending_edges=1)
+    graph.add_block(1, [(sender, recipient, 1.0)])
+    graph.add_block(2, [(sender, recipient, 2.0), (recipient, address(3), 2.0)])
+
+    assert graph.unwind(1) == 1
+    assert list(graph.values) == [1.0]  # Removed rather than offset by negative edges
+    assert graph.addresses == [sender, recipient]
+    assert graph.trace_taint(sender)["reached"] == [{"address": recipient, "hops": 1, "value_eth": 1.0}]
+
+
+def test_flags_age_out_with_the_window(scam_db):
+    victim = address(1)
+    scam_db(SCAM)
+    monitor = TaintMonitor(graph=TransactionGraph(window_blocks=5))
+    monitor.observe_block(1, transfers(1, (SCAM, victim, 10)))
+
+    assert len(monitor.observe_block(2, transfers(2, (victim, address(2), 1)))) == 1
+    assert monitor.observe_block(3, transfers(3, (victim, address(3), 1))) == []  # Flagged once per window
+    monitor.observe_block(7, transfers(7))
+    assert monitor.flagged == {}
+    assert len(monitor.observe_block(8, transfers(8, (victim, address(4), 1)))) == 1